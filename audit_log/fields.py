@@ -0,0 +1,89 @@
+from django.apps import apps
+from django.db import models
+
+
+class CodedCharField(models.SmallIntegerField):
+    """Stores a string from a fixed set of strings as a small integer code.
+
+    The codes are given as a mapping from the strings to the codes. Existing codes
+    must never be changed, only new ones can be added.
+    """
+
+    def __init__(self, *args, codes=None, **kwargs):
+        self.codes = dict(codes or {})
+        self.values = {code: value for value, code in self.codes.items()}
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["codes"] = self.codes
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.values[value]
+
+    def to_python(self, value):
+        if isinstance(value, int):
+            return self.values[value]
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        try:
+            return self.codes[value]
+        except KeyError:
+            raise ValueError(f"Field '{self.name}' has no code for {value!r}.")
+
+
+class LogValueField(models.SmallIntegerField):
+    """Stores a string as the id of a row in the LogValue table.
+
+    Empty strings are stored as nulls. The rows are created as new values are saved,
+    and the value ids are cached by the LogValue manager.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs["null"] = True
+        kwargs["blank"] = True
+        kwargs.setdefault("default", "")
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs["null"]
+        del kwargs["blank"]
+        if kwargs.get("default") == "":
+            del kwargs["default"]
+        return name, path, args, kwargs
+
+    @staticmethod
+    def _log_values():
+        return apps.get_model("audit_log", "LogValue").objects
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return ""
+        return self._log_values().get_value(value)
+
+    def to_python(self, value):
+        if value is None:
+            return ""
+        if isinstance(value, int):
+            return self._log_values().get_value(value)
+        return value
+
+    def get_prep_value(self, value):
+        if not value:
+            return None
+        # Used in lookups, so unknown values don't get created. No row has id 0.
+        return self._log_values().get_id(value, create=False) or 0
+
+    def get_db_prep_save(self, value, connection):
+        if hasattr(value, "as_sql"):
+            return value
+        if not value:
+            return None
+        return self._log_values().get_id(value, create=True)
@@ -0,0 +1,180 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from audit_log.models import ACTOR_ROLE_CODES, OPERATION_CODES
+
+SERVICE_NAMES = [
+    "berth",
+    "youth_membership",
+    "godchildren_of_culture",
+    "helsinki_my_data",
+    "kukkuu",
+    "venepaikka",
+    "palvelukartta",
+    "asukaspysakointi",
+]
+TARGET_TYPES = [
+    "base profile",
+    "email",
+    "phone",
+    "address",
+    "sensitive data",
+    "verified personal information",
+    "verified personal information permanent address",
+    "service connection",
+]
+OPERATIONS = ["READ"] * 8 + ["UPDATE", "CREATE", "DELETE"]
+ACTOR_ROLES = ["OWNER"] * 6 + ["ADMIN", "ADMIN", "SYSTEM", "ANONYMOUS"]
+
+
+def _array(values):
+    return "ARRAY[" + ", ".join(f"'{value}'" for value in values) + "]"
+
+
+def _pick(values, seed):
+    return f"({_array(values)})[1 + ({seed}) % {len(values)}]"
+
+
+def _code_case(column, codes):
+    whens = " ".join(f"WHEN '{value}' THEN {code}" for value, code in codes.items())
+    return f"CASE {column} {whens} END"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the storage size of the audit log entries in the original text "
+        "columns and in the compact columns. The test data is created in "
+        "temporary tables in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000000)
+
+    @staticmethod
+    def _create_text_table(cursor, rows):
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE benchmark_text (
+                id bigint PRIMARY KEY,
+                "timestamp" timestamp with time zone NOT NULL,
+                service_name varchar(1024) NOT NULL,
+                client_id varchar(1024) NOT NULL,
+                ip_address varchar(128) NOT NULL,
+                actor_user_id uuid NULL,
+                actor_role varchar(1024) NOT NULL,
+                target_user_id uuid NULL,
+                target_profile_id uuid NULL,
+                target_type varchar(1024) NOT NULL,
+                operation varchar(1024) NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO benchmark_text
+            SELECT
+                i,
+                now() - i * interval '1 second',
+                {_pick(SERVICE_NAMES, "i / 7")},
+                'https://api.hel.fi/auth/' || {_pick(SERVICE_NAMES, "i / 7")},
+                '10.' || (i % 250) || '.' || (i / 250 % 250) || '.' || (i % 251),
+                md5((i / 11)::text)::uuid,
+                {_pick(ACTOR_ROLES, "i / 11")},
+                md5((i / 13)::text)::uuid,
+                md5((i / 13 + 1)::text)::uuid,
+                {_pick(TARGET_TYPES, "i")},
+                {_pick(OPERATIONS, "i / 3")}
+            FROM generate_series(1, {int(rows)}) AS i
+            """
+        )
+
+    @staticmethod
+    def _create_compact_table(cursor):
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE benchmark_value (
+                id smallint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                value varchar(1024) UNIQUE NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO benchmark_value (value)
+            SELECT DISTINCT value
+            FROM benchmark_text,
+                unnest(ARRAY[service_name, client_id, target_type]) AS value
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE benchmark_compact (
+                id bigint PRIMARY KEY,
+                "timestamp" timestamp with time zone NOT NULL,
+                service_name smallint NULL,
+                client_id smallint NULL,
+                ip_address inet NULL,
+                actor_user_id uuid NULL,
+                actor_role smallint NOT NULL,
+                target_user_id uuid NULL,
+                target_profile_id uuid NULL,
+                target_type smallint NULL,
+                operation smallint NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO benchmark_compact
+            SELECT
+                entry.id,
+                entry."timestamp",
+                service_name.id,
+                client_id.id,
+                entry.ip_address::inet,
+                entry.actor_user_id,
+                {_code_case("entry.actor_role", ACTOR_ROLE_CODES)},
+                entry.target_user_id,
+                entry.target_profile_id,
+                target_type.id,
+                {_code_case("entry.operation", OPERATION_CODES)}
+            FROM benchmark_text entry
+            JOIN benchmark_value service_name ON service_name.value = entry.service_name
+            JOIN benchmark_value client_id ON client_id.value = entry.client_id
+            JOIN benchmark_value target_type ON target_type.value = entry.target_type
+            """
+        )
+
+    @staticmethod
+    def _measure(cursor, table):
+        # An index on a coded column, like one used for per-service queries
+        cursor.execute(f'CREATE INDEX ON {table} ("timestamp")')
+        cursor.execute(f'CREATE INDEX ON {table} (service_name, "timestamp")')
+        cursor.execute(
+            f"""
+            SELECT
+                avg(pg_column_size({table}.*)),
+                pg_relation_size('{table}'),
+                pg_indexes_size('{table}')
+            FROM {table}
+            """
+        )
+        return cursor.fetchone()
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._create_text_table(cursor, options["rows"])
+            self._create_compact_table(cursor)
+            text = self._measure(cursor, "benchmark_text")
+            compact = self._measure(cursor, "benchmark_compact")
+            transaction.set_rollback(True)
+
+        for label, (text_value, compact_value), unit in [
+            ("Average row size", (text[0], compact[0]), "B"),
+            ("Table size", (text[1] / 2**20, compact[1] / 2**20), "MiB"),
+            ("Index size", (text[2] / 2**20, compact[2] / 2**20), "MiB"),
+        ]:
+            self.stdout.write(
+                f"{label}: {text_value:.1f} {unit} -> {compact_value:.1f} {unit} "
+                f"({(1 - compact_value / text_value) * 100:.1f} % smaller)"
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from audit_log.partitions import create_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the monthly partitions of the audit log table for the current "
+        "month and the given number of months ahead. Should be run regularly, "
+        "for example daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of future months to create partitions for. Default is 3.",
+        )
+
+    def handle(self, *args, **options):
+        if options["months_ahead"] < 0:
+            raise CommandError("--months-ahead can't be negative")
+
+        for name in create_partitions(options["months_ahead"]):
+            self.stdout.write(f"Created partition {name}")
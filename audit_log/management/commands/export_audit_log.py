@@ -0,0 +1,168 @@
+import gzip
+import json
+import os
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from audit_log.models import LogEntry
+from profiles.audit_log import log_entry_message
+
+FILTERS = ["start", "end", "profile", "actor", "service"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports audit log entries into a gzipped JSON Lines file, one audit event "
+        "per line in the same format as the audit logger output. The entries are "
+        "read in id order with a server-side cursor. Progress is recorded in a "
+        "checkpoint file next to the output, so an interrupted export can be "
+        "continued with --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Path of the output file")
+        parser.add_argument(
+            "--start",
+            help="Export the entries at or after DATETIME (ISO 8601)",
+            metavar="DATETIME",
+        )
+        parser.add_argument(
+            "--end",
+            help="Export the entries before DATETIME (ISO 8601)",
+            metavar="DATETIME",
+        )
+        parser.add_argument("--profile", help="Id of the target profile")
+        parser.add_argument("--actor", help="User id of the actor")
+        parser.add_argument("--service", help="Name of the service")
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue an interrupted export with the same filters",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Number of entries written between checkpoints. Default is 10000.",
+        )
+
+    @staticmethod
+    def _parse_datetime(value, name):
+        if value is None:
+            return None
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"Invalid {name}: {value}")
+        return parsed
+
+    @staticmethod
+    def _parse_uuid(value, name):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            raise CommandError(f"Invalid {name}: {value}")
+
+    def _build_queryset(self, filters):
+        queryset = LogEntry.objects.order_by("id")
+        if filters["start"]:
+            queryset = queryset.filter(
+                timestamp__gte=self._parse_datetime(filters["start"], "--start")
+            )
+        if filters["end"]:
+            queryset = queryset.filter(
+                timestamp__lt=self._parse_datetime(filters["end"], "--end")
+            )
+        if filters["profile"]:
+            queryset = queryset.filter(
+                target_profile_id=self._parse_uuid(filters["profile"], "--profile")
+            )
+        if filters["actor"]:
+            queryset = queryset.filter(
+                actor_user_id=self._parse_uuid(filters["actor"], "--actor")
+            )
+        if filters["service"]:
+            queryset = queryset.filter(service_name=filters["service"])
+        return queryset
+
+    @staticmethod
+    def _read_checkpoint(path):
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_checkpoint(path, checkpoint):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _write_chunk(self, output, log_entries):
+        # Every chunk is a complete gzip member, and a file of concatenated members
+        # is a valid gzip file.
+        with gzip.GzipFile(fileobj=output, mode="wb") as archive:
+            for log_entry in log_entries:
+                archive.write(json.dumps(log_entry_message(log_entry)).encode())
+                archive.write(b"\n")
+        output.flush()
+        os.fsync(output.fileno())
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        output_path = options["output"]
+        checkpoint_path = f"{output_path}.checkpoint"
+        filters = {name: options[name] for name in FILTERS}
+
+        if options["resume"]:
+            if not (os.path.exists(checkpoint_path) and os.path.exists(output_path)):
+                raise CommandError(f"No interrupted export found at {output_path}")
+            checkpoint = self._read_checkpoint(checkpoint_path)
+            if checkpoint["filters"] != filters:
+                raise CommandError(
+                    "The filters differ from the ones of the interrupted export"
+                )
+        else:
+            if os.path.exists(output_path):
+                raise CommandError(
+                    f"{output_path} already exists. Use --resume to continue "
+                    "an interrupted export."
+                )
+            checkpoint = {"filters": filters, "last_id": 0, "size": 0, "count": 0}
+
+        queryset = self._build_queryset(filters).filter(id__gt=checkpoint["last_id"])
+
+        mode = "r+b" if options["resume"] else "wb"
+        with open(output_path, mode) as output:
+            # Drop whatever was written after the last checkpoint
+            output.truncate(checkpoint["size"])
+            output.seek(checkpoint["size"])
+
+            chunk = []
+            for log_entry in queryset.iterator(chunk_size=options["chunk_size"]):
+                chunk.append(log_entry)
+                if len(chunk) == options["chunk_size"]:
+                    self._export_chunk(output, chunk, checkpoint, checkpoint_path)
+                    chunk = []
+            if chunk:
+                self._export_chunk(output, chunk, checkpoint, checkpoint_path)
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(
+            f"Exported {checkpoint['count']} audit log entries to {output_path}"
+        )
+
+    def _export_chunk(self, output, chunk, checkpoint, checkpoint_path):
+        self._write_chunk(output, chunk)
+        checkpoint["last_id"] = chunk[-1].id
+        checkpoint["size"] = output.tell()
+        checkpoint["count"] += len(chunk)
+        self._write_checkpoint(checkpoint_path, checkpoint)
@@ -0,0 +1,71 @@
+import os
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from audit_log.partitions import (
+    add_months,
+    archive_partition,
+    detach_partition,
+    drop_table,
+    expired_partitions,
+    month_start,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Removes the audit log partitions whose all rows are older than the "
+        "retention period. The partitions are detached from the audit log table and "
+        "then archived and/or dropped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            required=True,
+            help="Number of full months to keep in addition to the current month",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            help="Directory to write the removed partitions to as gzipped CSV files",
+        )
+        parser.add_argument(
+            "--keep-detached",
+            action="store_true",
+            help="Leave the detached partitions in the database as separate tables",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the partitions that would be removed",
+        )
+
+    def handle(self, *args, **options):
+        if options["keep_months"] < 0:
+            raise CommandError("--keep-months can't be negative")
+        archive_dir = options["archive_dir"]
+        if archive_dir and not os.path.isdir(archive_dir):
+            raise CommandError(f"Archive directory {archive_dir} does not exist")
+
+        cutoff = add_months(
+            month_start(datetime.now(tz=timezone.utc)), -options["keep_months"]
+        )
+
+        for partition in expired_partitions(cutoff):
+            if options["dry_run"]:
+                self.stdout.write(f"Would remove partition {partition.name}")
+                continue
+
+            with transaction.atomic():
+                detach_partition(partition)
+                if archive_dir:
+                    path = os.path.join(archive_dir, f"{partition.name}.csv.gz")
+                    archive_partition(partition, path)
+                    self.stdout.write(f"Archived partition {partition.name} to {path}")
+                if not options["keep_detached"]:
+                    drop_table(partition.name)
+
+            self.stdout.write(f"Removed partition {partition.name}")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from audit_log.rollups import update_daily_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Adds the audit log entries created since the previous run to the daily "
+        "access statistics. Should be run regularly, for example every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100000,
+            help="Number of log entry ids processed in one transaction. "
+            "Default is 100000.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        last_id = update_daily_counts(options["batch_size"])
+        self.stdout.write(f"Daily counts are up to date up to log entry {last_id}")
@@ -0,0 +1,185 @@
+# Generated by Django 4.2.17 on 2026-10-19 11:20
+
+from django.db import migrations
+
+# The existing table becomes the partition of all the months up to and including
+# the current one, so the existing rows don't need to be copied. Later months get
+# their own partitions from the create_audit_log_partitions command. Rows outside
+# of the created partitions go to the default partition.
+#
+# The primary key of a partitioned table must include the partition key, so the
+# primary key in the database is (id, timestamp). The ids still come from a single
+# sequence, so the model can keep treating id as the primary key.
+#
+# The table is written to all the time, so nothing that reads the whole table is
+# done while holding a lock that blocks the writes. The index of the new primary
+# key is built concurrently, which can't be done in a transaction, so the
+# migration isn't atomic. A validated check constraint matching the partition
+# bound lets the table be attached as a partition without scanning it.
+
+# The end of the current month, or of the month of the latest entry
+_UPPER_BOUND_SQL = """
+    SELECT (
+        date_trunc('month', greatest(now(), max("timestamp")) AT TIME ZONE 'UTC')
+        + interval '1 month'
+    ) AT TIME ZONE 'UTC'
+    INTO upper_bound
+    FROM {table}
+"""
+
+PREPARE_SQL = [
+    # Left behind invalid by a failed concurrent build
+    "DROP INDEX CONCURRENTLY IF EXISTS audit_log_logentry_legacy_pkey",
+    """
+    CREATE UNIQUE INDEX CONCURRENTLY audit_log_logentry_legacy_pkey
+        ON audit_log_logentry (id, "timestamp")
+    """,
+    """
+    ALTER TABLE audit_log_logentry
+        DROP CONSTRAINT IF EXISTS audit_log_logentry_legacy_bound
+    """,
+    # Rows added after this are checked against the bound right away, so the
+    # bound computed again when attaching can only be the same or later.
+    f"""
+    DO $$
+    DECLARE
+        upper_bound timestamp with time zone;
+    BEGIN
+        {_UPPER_BOUND_SQL.format(table="audit_log_logentry")};
+
+        EXECUTE format(
+            'ALTER TABLE audit_log_logentry '
+            'ADD CONSTRAINT audit_log_logentry_legacy_bound '
+            'CHECK ("timestamp" < %L) NOT VALID',
+            upper_bound
+        );
+    END
+    $$
+    """,
+    # Doesn't block reads or writes
+    """
+    ALTER TABLE audit_log_logentry
+        VALIDATE CONSTRAINT audit_log_logentry_legacy_bound
+    """,
+]
+
+PARTITION_SQL = [
+    "ALTER TABLE audit_log_logentry RENAME TO audit_log_logentry_legacy",
+    "ALTER TABLE audit_log_logentry_legacy DROP CONSTRAINT audit_log_logentry_pkey",
+    """
+    ALTER INDEX audit_log_logentry_timestamp_f234a316
+        RENAME TO audit_log_logentry_legacy_timestamp_idx
+    """,
+    """
+    ALTER TABLE audit_log_logentry_legacy
+        ADD CONSTRAINT audit_log_logentry_legacy_pkey
+        PRIMARY KEY USING INDEX audit_log_logentry_legacy_pkey
+    """,
+    # A partition can't have an identity column, and the id sequence must not be
+    # dropped when the legacy partition eventually is.
+    "ALTER TABLE audit_log_logentry_legacy ALTER COLUMN id DROP IDENTITY IF EXISTS",
+    "ALTER TABLE audit_log_logentry_legacy ALTER COLUMN id DROP DEFAULT",
+    "DROP SEQUENCE IF EXISTS audit_log_logentry_id_seq",
+    "CREATE SEQUENCE audit_log_logentry_id_seq",
+    """
+    SELECT setval(
+        'audit_log_logentry_id_seq',
+        COALESCE((SELECT max(id) FROM audit_log_logentry_legacy), 0) + 1,
+        false
+    )
+    """,
+    """
+    CREATE TABLE audit_log_logentry (
+        id bigint NOT NULL DEFAULT nextval('audit_log_logentry_id_seq'),
+        "timestamp" timestamp with time zone NOT NULL,
+        service_name varchar(1024) NOT NULL,
+        client_id varchar(1024) NOT NULL,
+        ip_address varchar(128) NOT NULL,
+        actor_user_id uuid NULL,
+        actor_role varchar(1024) NOT NULL,
+        target_user_id uuid NULL,
+        target_profile_id uuid NULL,
+        target_type varchar(1024) NOT NULL,
+        operation varchar(1024) NOT NULL,
+        CONSTRAINT audit_log_logentry_pkey PRIMARY KEY (id, "timestamp")
+    ) PARTITION BY RANGE ("timestamp")
+    """,
+    "ALTER SEQUENCE audit_log_logentry_id_seq OWNED BY audit_log_logentry.id",
+    # The existing indexes of the legacy table are attached to these when the
+    # table is attached, instead of building new ones.
+    'CREATE INDEX audit_log_logentry_timestamp_idx ON audit_log_logentry ("timestamp")',
+    f"""
+    DO $$
+    DECLARE
+        upper_bound timestamp with time zone;
+    BEGIN
+        {_UPPER_BOUND_SQL.format(table="audit_log_logentry_legacy")};
+
+        EXECUTE format(
+            'ALTER TABLE audit_log_logentry '
+            'ATTACH PARTITION audit_log_logentry_legacy '
+            'FOR VALUES FROM (MINVALUE) TO (%L)',
+            upper_bound
+        );
+    END
+    $$
+    """,
+    """
+    ALTER TABLE audit_log_logentry_legacy
+        DROP CONSTRAINT audit_log_logentry_legacy_bound
+    """,
+    "CREATE TABLE audit_log_logentry_default PARTITION OF audit_log_logentry DEFAULT",
+]
+
+UNPARTITION_SQL = [
+    "ALTER TABLE audit_log_logentry RENAME TO audit_log_logentry_partitioned",
+    """
+    ALTER TABLE audit_log_logentry_partitioned
+        RENAME CONSTRAINT audit_log_logentry_pkey
+        TO audit_log_logentry_partitioned_pkey
+    """,
+    """
+    ALTER INDEX audit_log_logentry_timestamp_idx
+        RENAME TO audit_log_logentry_partitioned_timestamp_idx
+    """,
+    """
+    CREATE TABLE audit_log_logentry (
+        LIKE audit_log_logentry_partitioned INCLUDING DEFAULTS,
+        CONSTRAINT audit_log_logentry_pkey PRIMARY KEY (id)
+    )
+    """,
+    "INSERT INTO audit_log_logentry SELECT * FROM audit_log_logentry_partitioned",
+    "ALTER SEQUENCE audit_log_logentry_id_seq OWNED BY audit_log_logentry.id",
+    # The index name Django gave in the initial migration
+    """
+    CREATE INDEX audit_log_logentry_timestamp_f234a316
+        ON audit_log_logentry ("timestamp")
+    """,
+    "DROP TABLE audit_log_logentry_partitioned",
+]
+
+
+def _execute(statements):
+    def execute(apps, schema_editor):
+        for sql in statements:
+            schema_editor.execute(sql, params=None)
+
+    return execute
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("audit_log", "0001_initial"),
+    ]
+
+    operations = [
+        # Dropping the partitioned table in the reverse drops these as well
+        migrations.RunSQL(PREPARE_SQL, reverse_sql=migrations.RunSQL.noop),
+        # RunPython, unlike RunSQL, can be run in a transaction in a non-atomic
+        # migration, so the table is never seen half converted.
+        migrations.RunPython(
+            _execute(PARTITION_SQL), _execute(UNPARTITION_SQL), atomic=True
+        ),
+    ]
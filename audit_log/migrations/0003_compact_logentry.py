@@ -0,0 +1,368 @@
+# Generated by Django 4.2.17 on 2026-10-19 13:05
+
+from dataclasses import dataclass, field
+
+from django.db import migrations, models
+
+import audit_log.fields
+
+ACTOR_ROLE_CODES = {"": 0, "OWNER": 1, "ADMIN": 2, "SYSTEM": 3, "ANONYMOUS": 4}
+OPERATION_CODES = {"": 0, "CREATE": 1, "READ": 2, "UPDATE": 3, "DELETE": 4}
+
+
+def _code_case(column, codes):
+    whens = " ".join(f"WHEN '{value}' THEN {code}" for value, code in codes.items())
+    return f"CASE {column} {whens} END"
+
+
+def _value_case(column, codes):
+    whens = " ".join(f"WHEN {code} THEN '{value}'" for value, code in codes.items())
+    return f"CASE {column} {whens} END"
+
+
+LOOKUP_COLUMNS = ["service_name", "client_id", "target_type"]
+
+# The table is written to all the time and can be large, so it isn't rewritten in
+# one go under a lock that blocks the writes. Instead the columns are converted in
+# stages, forwards and backwards alike:
+#
+# 1. The converted columns are added next to the existing ones, and a trigger
+#    converts the rows inserted from then on.
+# 2. The existing rows are converted in batches, each in its own transaction. The
+#    converted values are cleared from the old columns, so that the space of the
+#    old row versions can be reused.
+# 3. The constraints of the converted columns are added as not valid and then
+#    validated, which doesn't block the writes.
+# 4. The old columns are replaced with the converted ones in a single transaction
+#    that only changes the catalog.
+#
+# The functions used in the conversions are ordinary functions instead of
+# temporary ones, since the trigger runs in the sessions of the application.
+
+BATCH_SIZE = 10000
+
+COMPACT_FUNCTIONS = {
+    "audit_log_value_id(text)": """
+    CREATE OR REPLACE FUNCTION audit_log_value_id(text) RETURNS smallint
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        value_id smallint;
+    BEGIN
+        IF coalesce($1, '') = '' THEN
+            RETURN NULL;
+        END IF;
+        SELECT id INTO value_id FROM audit_log_logvalue WHERE value = $1;
+        IF NOT FOUND THEN
+            INSERT INTO audit_log_logvalue (value) VALUES ($1)
+            ON CONFLICT (value) DO NOTHING;
+            SELECT id INTO value_id FROM audit_log_logvalue WHERE value = $1;
+        END IF;
+        RETURN value_id;
+    END
+    $$
+    """,
+    # Text values that are not valid IP addresses can't be stored as inet, so
+    # they are dropped.
+    "audit_log_inet(text)": """
+    CREATE OR REPLACE FUNCTION audit_log_inet(text) RETURNS inet
+    LANGUAGE plpgsql IMMUTABLE
+    AS $$
+    BEGIN
+        RETURN nullif($1, '')::inet;
+    EXCEPTION WHEN invalid_text_representation THEN
+        RETURN NULL;
+    END
+    $$
+    """,
+}
+
+EXPAND_FUNCTIONS = {
+    "audit_log_value(smallint)": """
+    CREATE OR REPLACE FUNCTION audit_log_value(smallint) RETURNS varchar
+    LANGUAGE sql STABLE
+    AS $$ SELECT coalesce((SELECT value FROM audit_log_logvalue WHERE id = $1), '') $$
+    """,
+}
+
+
+@dataclass
+class Conversion:
+    # (column, new type, expression converting the old column, not null)
+    columns: list
+    # Function signature -> SQL creating it
+    functions: dict
+    foreign_keys: list = field(default_factory=list)
+
+
+COMPACT = Conversion(
+    columns=[
+        (column, "smallint", f"audit_log_value_id({{}}.{column})", False)
+        for column in LOOKUP_COLUMNS
+    ]
+    + [
+        ("ip_address", "inet", "audit_log_inet({}.ip_address)", False),
+        (
+            "actor_role",
+            "smallint",
+            _code_case("{}.actor_role", ACTOR_ROLE_CODES),
+            True,
+        ),
+        ("operation", "smallint", _code_case("{}.operation", OPERATION_CODES), True),
+    ],
+    functions=COMPACT_FUNCTIONS,
+    foreign_keys=LOOKUP_COLUMNS,
+)
+
+EXPAND = Conversion(
+    columns=[
+        (column, "varchar(1024)", f"audit_log_value({{}}.{column})", True)
+        for column in LOOKUP_COLUMNS
+    ]
+    + [
+        ("ip_address", "varchar(128)", "coalesce(host({}.ip_address), '')", True),
+        (
+            "actor_role",
+            "varchar(1024)",
+            _value_case("{}.actor_role", ACTOR_ROLE_CODES),
+            True,
+        ),
+        (
+            "operation",
+            "varchar(1024)",
+            _value_case("{}.operation", OPERATION_CODES),
+            True,
+        ),
+    ],
+    functions=EXPAND_FUNCTIONS,
+)
+
+# Always set before the conversion, so the rows where it's null are converted
+GUARD_COLUMN = "operation"
+
+
+def _partitions(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = 'audit_log_logentry'
+            """
+        )
+        return [name for (name,) in cursor.fetchall()]
+
+
+def _fk_name(table, column):
+    return f"{table}_{column}_fk"
+
+
+def _not_null_check_name(column):
+    return f"audit_log_logentry_{column}_not_null"
+
+
+def _prepare(conversion, drop_foreign_keys=()):
+    def prepare(apps, schema_editor):
+        for sql in conversion.functions.values():
+            schema_editor.execute(sql, params=None)
+        for column in drop_foreign_keys:
+            schema_editor.execute(
+                "ALTER TABLE audit_log_logentry DROP CONSTRAINT IF EXISTS "
+                + _fk_name("audit_log_logentry", column)
+            )
+        schema_editor.execute(
+            "ALTER TABLE audit_log_logentry "
+            + ", ".join(
+                f"ADD COLUMN IF NOT EXISTS {column}_new {new_type}, "
+                f"ALTER COLUMN {column} DROP NOT NULL"
+                for column, new_type, _expression, _not_null in conversion.columns
+            )
+        )
+        assignments = "".join(
+            f"NEW.{column}_new := {expression.format('NEW')}; NEW.{column} := NULL; "
+            for column, _new_type, expression, _not_null in conversion.columns
+        )
+        schema_editor.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION audit_log_logentry_convert() RETURNS trigger
+            LANGUAGE plpgsql
+            AS $$ BEGIN {assignments}RETURN NEW; END $$
+            """,
+            params=None,
+        )
+        schema_editor.execute(
+            "DROP TRIGGER IF EXISTS audit_log_logentry_convert ON audit_log_logentry"
+        )
+        schema_editor.execute(
+            """
+            CREATE TRIGGER audit_log_logentry_convert
+            BEFORE INSERT ON audit_log_logentry
+            FOR EACH ROW EXECUTE FUNCTION audit_log_logentry_convert()
+            """
+        )
+
+    return prepare
+
+
+def _backfill(conversion):
+    def backfill(apps, schema_editor):
+        assignments = ", ".join(
+            f"{column}_new = {expression.format('audit_log_logentry')}, "
+            f"{column} = NULL"
+            for column, _new_type, expression, _not_null in conversion.columns
+        )
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT min(id), max(id) FROM audit_log_logentry")
+            min_id, max_id = cursor.fetchone()
+        if min_id is None:
+            return
+
+        # The rows inserted after this are converted by the trigger
+        for start in range(min_id, max_id + 1, BATCH_SIZE):
+            schema_editor.execute(
+                f"UPDATE audit_log_logentry SET {assignments} "
+                f"WHERE id >= %s AND id < %s AND {GUARD_COLUMN} IS NOT NULL",
+                [start, start + BATCH_SIZE],
+            )
+
+    return backfill
+
+
+def _validate(conversion):
+    def validate(apps, schema_editor):
+        for column, _new_type, _expression, not_null in conversion.columns:
+            if not_null:
+                name = _not_null_check_name(column)
+                schema_editor.execute(
+                    f"ALTER TABLE audit_log_logentry DROP CONSTRAINT IF EXISTS {name}"
+                )
+                schema_editor.execute(
+                    f"ALTER TABLE audit_log_logentry ADD CONSTRAINT {name} "
+                    f"CHECK ({column}_new IS NOT NULL) NOT VALID"
+                )
+                schema_editor.execute(
+                    f"ALTER TABLE audit_log_logentry VALIDATE CONSTRAINT {name}"
+                )
+
+        # A foreign key of a partitioned table can't be added as not valid. It's
+        # added and validated on every partition instead, and the ones of the
+        # partitions are attached to the one of the table when it's added.
+        for partition in _partitions(schema_editor):
+            for column in conversion.foreign_keys:
+                name = _fk_name(partition, column)
+                schema_editor.execute(
+                    f"ALTER TABLE {partition} DROP CONSTRAINT IF EXISTS {name}"
+                )
+                schema_editor.execute(
+                    f"ALTER TABLE {partition} ADD CONSTRAINT {name} "
+                    f"FOREIGN KEY ({column}_new) REFERENCES audit_log_logvalue (id) "
+                    "NOT VALID"
+                )
+                schema_editor.execute(
+                    f"ALTER TABLE {partition} VALIDATE CONSTRAINT {name}"
+                )
+
+    return validate
+
+
+def _finish(conversion):
+    def finish(apps, schema_editor):
+        schema_editor.execute(
+            "DROP TRIGGER audit_log_logentry_convert ON audit_log_logentry"
+        )
+        schema_editor.execute("DROP FUNCTION audit_log_logentry_convert()")
+        for column, _new_type, _expression, not_null in conversion.columns:
+            schema_editor.execute(
+                f"ALTER TABLE audit_log_logentry DROP COLUMN {column}"
+            )
+            schema_editor.execute(
+                f"ALTER TABLE audit_log_logentry RENAME COLUMN {column}_new TO {column}"
+            )
+            if not_null:
+                # The validated check constraint proves it without a scan
+                schema_editor.execute(
+                    f"ALTER TABLE audit_log_logentry ALTER COLUMN {column} SET NOT NULL"
+                )
+                schema_editor.execute(
+                    "ALTER TABLE audit_log_logentry "
+                    f"DROP CONSTRAINT {_not_null_check_name(column)}"
+                )
+        for column in conversion.foreign_keys:
+            schema_editor.execute(
+                "ALTER TABLE audit_log_logentry ADD CONSTRAINT "
+                f"{_fk_name('audit_log_logentry', column)} "
+                f"FOREIGN KEY ({column}) REFERENCES audit_log_logvalue (id)"
+            )
+        for signature in conversion.functions:
+            schema_editor.execute(f"DROP FUNCTION {signature}")
+
+    return finish
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("audit_log", "0002_partition_logentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LogValue",
+            fields=[
+                ("id", models.SmallAutoField(primary_key=True, serialize=False)),
+                ("value", models.CharField(max_length=1024, unique=True)),
+            ],
+        ),
+        # The database is changed with RunPython, which unlike RunSQL can be run in
+        # a transaction in a non-atomic migration.
+        migrations.RunPython(_prepare(COMPACT), _finish(EXPAND), atomic=True),
+        # Reversed, the operations are run in the opposite order
+        migrations.RunPython(_backfill(COMPACT), _validate(EXPAND)),
+        migrations.RunPython(_validate(COMPACT), _backfill(EXPAND)),
+        migrations.RunPython(
+            _finish(COMPACT),
+            _prepare(EXPAND, drop_foreign_keys=LOOKUP_COLUMNS),
+            atomic=True,
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="logentry",
+                    name="service_name",
+                    field=audit_log.fields.LogValueField(),
+                ),
+                migrations.AlterField(
+                    model_name="logentry",
+                    name="client_id",
+                    field=audit_log.fields.LogValueField(),
+                ),
+                migrations.AlterField(
+                    model_name="logentry",
+                    name="ip_address",
+                    field=models.GenericIPAddressField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name="logentry",
+                    name="actor_role",
+                    field=audit_log.fields.CodedCharField(
+                        codes=ACTOR_ROLE_CODES, default=""
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="logentry",
+                    name="target_type",
+                    field=audit_log.fields.LogValueField(),
+                ),
+                migrations.AlterField(
+                    model_name="logentry",
+                    name="operation",
+                    field=audit_log.fields.CodedCharField(
+                        codes=OPERATION_CODES, default=""
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.17 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+INDEXES = {
+    "audit_log_target_profile_idx": 'target_profile_id, "timestamp", id',
+    "audit_log_actor_user_idx": 'actor_user_id, "timestamp", id',
+}
+
+
+def _partitions(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = 'audit_log_logentry'
+            """
+        )
+        return [name for (name,) in cursor.fetchall()]
+
+
+def create_indexes(apps, schema_editor):
+    # An index on a partitioned table can't be built concurrently. Instead the
+    # index is first created on the partitioned table only, and then built
+    # concurrently on every partition and attached, so that writes aren't blocked.
+    partitions = _partitions(schema_editor)
+    for name, columns in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON ONLY audit_log_logentry ({columns})"
+        )
+        for partition in partitions:
+            partition_index = f"{partition}_{name.removeprefix('audit_log_')}"
+            schema_editor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} "
+                f"ON {partition} ({columns})"
+            )
+            schema_editor.execute(
+                f"ALTER INDEX {name} ATTACH PARTITION {partition_index}"
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("audit_log", "0003_compact_logentry"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="logentry",
+                    index=models.Index(
+                        fields=["target_profile_id", "timestamp", "id"],
+                        name="audit_log_target_profile_idx",
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name="logentry",
+                    index=models.Index(
+                        fields=["actor_user_id", "timestamp", "id"],
+                        name="audit_log_actor_user_idx",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.17 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+import audit_log.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("audit_log", "0004_logentry_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyLogEntryCount",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("service_name", models.CharField(blank=True, max_length=1024)),
+                (
+                    "actor_role",
+                    audit_log.fields.CodedCharField(
+                        codes={
+                            "": 0,
+                            "ADMIN": 2,
+                            "ANONYMOUS": 4,
+                            "OWNER": 1,
+                            "SYSTEM": 3,
+                        },
+                        default="",
+                    ),
+                ),
+                (
+                    "operation",
+                    audit_log.fields.CodedCharField(
+                        codes={"": 0, "CREATE": 1, "DELETE": 4, "READ": 2, "UPDATE": 3},
+                        default="",
+                    ),
+                ),
+                ("target_type", models.CharField(blank=True, max_length=1024)),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RollupProgress",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("last_id", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="dailylogentrycount",
+            constraint=models.UniqueConstraint(
+                fields=(
+                    "day",
+                    "service_name",
+                    "actor_role",
+                    "operation",
+                    "target_type",
+                ),
+                name="audit_log_daily_count_unique",
+            ),
+        ),
+    ]
@@ -1,15 +1,121 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+
+from .fields import CodedCharField, LogValueField
+
+ACTOR_ROLE_CODES = {"": 0, "OWNER": 1, "ADMIN": 2, "SYSTEM": 3, "ANONYMOUS": 4}
+OPERATION_CODES = {"": 0, "CREATE": 1, "READ": 2, "UPDATE": 3, "DELETE": 4}
+
+# The LogValue table is small and its rows are never changed or deleted, so the
+# whole table is cached in memory.
+_log_value_ids = {}
+_log_values = {}
+
+
+class LogValueManager(models.Manager):
+    def _load(self):
+        for pk, value in self.values_list("pk", "value"):
+            _log_value_ids[value] = pk
+            _log_values[pk] = value
+
+    def get_id(self, value, create):
+        if value not in _log_value_ids:
+            self._load()
+        if value not in _log_value_ids and create:
+            self.bulk_create([LogValue(value=value)], ignore_conflicts=True)
+            self._load()
+        return _log_value_ids.get(value)
+
+    def get_value(self, pk):
+        if pk not in _log_values:
+            self._load()
+        return _log_values[pk]
+
+    def clear_cache(self):
+        _log_value_ids.clear()
+        _log_values.clear()
+
+
+class LogValue(models.Model):
+    """A distinct value of the repetitive text columns of LogEntry."""
+
+    id = models.SmallAutoField(primary_key=True)
+    value = models.CharField(max_length=1024, unique=True)
+
+    objects = LogValueManager()
+
+
+class LogEntryQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        try:
+            with transaction.atomic(using=self.db):
+                return super().bulk_create(objs, *args, **kwargs)
+        except IntegrityError:
+            # A cached LogValue may have been created in a transaction that was
+            # rolled back afterwards.
+            LogValue.objects.clear_cache()
+            return super().bulk_create(objs, *args, **kwargs)
 
 
 class LogEntry(models.Model):
     id = models.BigAutoField(primary_key=True)
     timestamp = models.DateTimeField(db_index=True)
-    service_name = models.CharField(max_length=1024, blank=True)
-    client_id = models.CharField(max_length=1024, blank=True)
-    ip_address = models.CharField(max_length=128, blank=True)
+    service_name = LogValueField()
+    client_id = LogValueField()
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
     actor_user_id = models.UUIDField(null=True)
-    actor_role = models.CharField(max_length=1024, blank=True)
+    actor_role = CodedCharField(codes=ACTOR_ROLE_CODES, default="")
     target_user_id = models.UUIDField(null=True)
     target_profile_id = models.UUIDField(null=True)
+    target_type = LogValueField()
+    operation = CodedCharField(codes=OPERATION_CODES, default="")
+
+    objects = LogEntryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["target_profile_id", "timestamp", "id"],
+                name="audit_log_target_profile_idx",
+            ),
+            models.Index(
+                fields=["actor_user_id", "timestamp", "id"],
+                name="audit_log_actor_user_idx",
+            ),
+        ]
+
+
+class DailyLogEntryCount(models.Model):
+    """Number of log entries per UTC day and per the repetitive columns.
+
+    The counts are maintained incrementally from the new log entries, see
+    `audit_log.rollups`.
+    """
+
+    day = models.DateField()
+    service_name = models.CharField(max_length=1024, blank=True)
+    actor_role = CodedCharField(codes=ACTOR_ROLE_CODES, default="")
+    operation = CodedCharField(codes=OPERATION_CODES, default="")
     target_type = models.CharField(max_length=1024, blank=True)
-    operation = models.CharField(max_length=1024, blank=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "day",
+                    "service_name",
+                    "actor_role",
+                    "operation",
+                    "target_type",
+                ],
+                name="audit_log_daily_count_unique",
+            ),
+        ]
+
+
+class RollupProgress(models.Model):
+    """The id of the last log entry that has been added to a rollup."""
+
+    name = models.CharField(max_length=64, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
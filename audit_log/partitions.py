@@ -0,0 +1,212 @@
+"""Management of the monthly partitions of the LogEntry table.
+
+The LogEntry table is range partitioned by timestamp. Every month has its own
+partition named like `audit_log_logentry_y2026m01`, with the exception of the
+legacy partition, which contains everything up to the month the table was
+partitioned, and the default partition, which catches the rows that have no other
+partition. The months are in UTC.
+"""
+
+import gzip
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+
+from .models import ACTOR_ROLE_CODES, OPERATION_CODES, LogEntry, LogValue
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = LogEntry._meta.db_table
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+_BOUND_RE = re.compile(r"FOR VALUES FROM \((.+)\) TO \((.+)\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    start: datetime | None
+    end: datetime | None
+
+    @property
+    def is_default(self):
+        return self.name == DEFAULT_PARTITION
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month_index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT_TABLE}_y{month.year}m{month.month:02}"
+
+
+def _parse_bound(value):
+    if value == "MINVALUE" or value == "MAXVALUE":
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def list_partitions() -> list[Partition]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = %s
+            """,
+            [PARENT_TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.match(bound)
+        if match:
+            start, end = (_parse_bound(value) for value in match.groups())
+        else:
+            start = end = None
+        partitions.append(Partition(name=name, start=start, end=end))
+
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted(partitions, key=lambda p: (p.is_default, p.start or oldest))
+
+
+def _is_covered(month, partitions):
+    month_end = add_months(month, 1)
+    return any(
+        (p.start is None or p.start < month_end) and (p.end is None or month < p.end)
+        for p in partitions
+        if not p.is_default
+    )
+
+
+def create_partition(month: datetime) -> bool:
+    """Creates the partition of the given month unless the month is covered already.
+
+    Rows of the month that have ended up in the default partition are moved into
+    the new partition. Returns True if the partition was created.
+    """
+    month = month_start(month)
+    if _is_covered(month, list_partitions()):
+        return False
+
+    name = partition_name(month)
+    bounds = [month, add_months(month, 1)]
+    quoted_name = connection.ops.quote_name(name)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {quoted_name} (LIKE {PARENT_TABLE})")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE "timestamp" >= %s AND "timestamp" < %s
+                RETURNING *
+            )
+            INSERT INTO {quoted_name} SELECT * FROM moved
+            """,
+            bounds,
+        )
+        if cursor.rowcount:
+            logger.info(
+                "Moved %s rows from the default partition to %s", cursor.rowcount, name
+            )
+        cursor.execute(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {quoted_name} "
+            "FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+
+    return True
+
+
+def create_partitions(months_ahead: int, now: datetime | None = None) -> list[str]:
+    """Creates the missing partitions up to `months_ahead` months from now.
+
+    Returns the names of the created partitions.
+    """
+    current_month = month_start(now or datetime.now(tz=timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current_month, offset)
+        if create_partition(month):
+            created.append(partition_name(month))
+    return created
+
+
+def expired_partitions(cutoff: datetime) -> list[Partition]:
+    """Returns the partitions that only contain rows older than `cutoff`."""
+    return [
+        partition
+        for partition in list_partitions()
+        if not partition.is_default
+        and partition.end is not None
+        and partition.end <= cutoff
+    ]
+
+
+def _decode_sql(column, codes):
+    whens = " ".join(f"WHEN {code} THEN '{value}'" for value, code in codes.items())
+    return f"CASE entry.{column} {whens} END AS {column}"
+
+
+def archive_partition(partition: Partition, path):
+    """Writes the rows of the partition into a gzipped CSV file.
+
+    The coded columns are written as their text values, so the archive doesn't
+    depend on the LogValue table.
+    """
+    quoted_name = connection.ops.quote_name(partition.name)
+    query = f"""
+        SELECT
+            entry.id,
+            entry."timestamp",
+            service_name.value AS service_name,
+            client_id.value AS client_id,
+            host(entry.ip_address) AS ip_address,
+            entry.actor_user_id,
+            {_decode_sql("actor_role", ACTOR_ROLE_CODES)},
+            entry.target_user_id,
+            entry.target_profile_id,
+            target_type.value AS target_type,
+            {_decode_sql("operation", OPERATION_CODES)}
+        FROM {quoted_name} entry
+        LEFT JOIN {LogValue._meta.db_table} service_name
+            ON service_name.id = entry.service_name
+        LEFT JOIN {LogValue._meta.db_table} client_id
+            ON client_id.id = entry.client_id
+        LEFT JOIN {LogValue._meta.db_table} target_type
+            ON target_type.id = entry.target_type
+        ORDER BY entry.id
+    """
+    with connection.cursor() as cursor, gzip.open(path, "wb") as archive:
+        with cursor.cursor.copy(
+            f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)"
+        ) as copy:
+            for data in copy:
+                archive.write(data)
+
+
+def detach_partition(partition: Partition):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION "
+            f"{connection.ops.quote_name(partition.name)}"
+        )
+
+
+def drop_table(name: str):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
@@ -0,0 +1,130 @@
+"""Incrementally maintained aggregates of the LogEntry table.
+
+Every run adds only the log entries that have been inserted since the previous
+run to the aggregates, so the cost of a run depends on the number of new log
+entries, not on the size of the whole table.
+
+The log entry ids come from a sequence, but the inserts don't necessarily commit
+in id order. An entry with a smaller id than the ones already processed could
+become visible later and be skipped. Therefore the sequence value is read first,
+and then the transactions inserting into the table are waited for: every insert
+holds a lock on the table from before it takes its id until the transaction
+ends, so once those transactions have ended, no more entries up to the read
+value can appear. The lock is only inspected, never taken, so the inserts are
+never blocked.
+"""
+
+import logging
+import time
+
+from django.db import connection, transaction
+
+from .models import DailyLogEntryCount, LogEntry, LogValue, RollupProgress
+
+logger = logging.getLogger(__name__)
+
+DAILY_COUNTS = "daily_counts"
+
+_LOG_ENTRY_TABLE = LogEntry._meta.db_table
+_LOG_ENTRY_SEQUENCE = f"{_LOG_ENTRY_TABLE}_id_seq"
+
+
+def _inserting_transactions(cursor):
+    cursor.execute(
+        """
+        SELECT virtualtransaction FROM pg_locks
+        WHERE relation = %s::regclass
+            AND mode = 'RowExclusiveLock'
+            AND pid IS DISTINCT FROM pg_backend_pid()
+        """,
+        [_LOG_ENTRY_TABLE],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _final_id_limit(poll_interval=0.1):
+    """Returns the id up to which the set of log entries can't change anymore.
+
+    Waits for the transactions that may have taken an id up to the returned one
+    to end.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_sequence_last_value(%s::regclass)", [_LOG_ENTRY_SEQUENCE]
+        )
+        limit = cursor.fetchone()[0] or 0
+
+        # Read after the sequence, so that every transaction which took an id up
+        # to the limit and is still running is included
+        running = _inserting_transactions(cursor)
+        while running:
+            time.sleep(poll_interval)
+            running &= _inserting_transactions(cursor)
+
+    return limit
+
+
+def _add_to_daily_counts(cursor, start_id, end_id):
+    count_table = DailyLogEntryCount._meta.db_table
+    value_table = LogValue._meta.db_table
+    cursor.execute(
+        f"""
+        INSERT INTO {count_table} AS daily_count (
+            day, service_name, actor_role, operation, target_type, count
+        )
+        SELECT
+            entry.day,
+            COALESCE(service_name.value, ''),
+            entry.actor_role,
+            entry.operation,
+            COALESCE(target_type.value, ''),
+            entry.count
+        FROM (
+            SELECT
+                ("timestamp" AT TIME ZONE 'UTC')::date AS day,
+                service_name,
+                actor_role,
+                operation,
+                target_type,
+                count(*) AS count
+            FROM {_LOG_ENTRY_TABLE}
+            WHERE id > %s AND id <= %s
+            GROUP BY 1, 2, 3, 4, 5
+        ) entry
+        LEFT JOIN {value_table} service_name
+            ON service_name.id = entry.service_name
+        LEFT JOIN {value_table} target_type
+            ON target_type.id = entry.target_type
+        ON CONFLICT (day, service_name, actor_role, operation, target_type)
+        DO UPDATE SET count = daily_count.count + EXCLUDED.count
+        """,
+        [start_id, end_id],
+    )
+
+
+def update_daily_counts(batch_size: int = 100_000) -> int:
+    """Adds the log entries that haven't been counted yet to the daily counts.
+
+    The entries are processed in batches of `batch_size` ids, each in its own
+    transaction. Concurrent runs wait for each other. Returns the id of the last
+    processed log entry.
+    """
+    limit = _final_id_limit()
+    RollupProgress.objects.get_or_create(name=DAILY_COUNTS)
+
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            progress = RollupProgress.objects.select_for_update().get(name=DAILY_COUNTS)
+            if progress.last_id >= limit:
+                return progress.last_id
+
+            end_id = min(progress.last_id + batch_size, limit)
+            _add_to_daily_counts(cursor, progress.last_id, end_id)
+            logger.info(
+                "Added log entries %s-%s to the daily counts",
+                progress.last_id + 1,
+                end_id,
+            )
+
+            progress.last_id = end_id
+            progress.save(update_fields=["last_id"])
@@ -0,0 +1,117 @@
+import base64
+import binascii
+
+import graphene
+from django.core.exceptions import ValidationError
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+
+from open_city_profile.decorators import permission_required
+
+from .models import LogEntry
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(log_entry):
+    value = f"{log_entry.timestamp.isoformat()}|{log_entry.id}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return parse_datetime(timestamp), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError(_("Invalid cursor"))
+
+
+def get_log_entry_page(first, after=None, **filters):
+    """Returns a page of log entries, newest first, and whether there are more.
+
+    The pages are keyset paginated over (timestamp, id), so fetching a page costs
+    the same regardless of its position. `after` is the cursor of the last entry of
+    the previous page.
+    """
+    queryset = LogEntry.objects.filter(**filters).order_by("-timestamp", "-id")
+    if after:
+        timestamp, pk = decode_cursor(after)
+        # The timestamp__lte condition lets the database use the index range
+        queryset = queryset.filter(timestamp__lte=timestamp).exclude(
+            timestamp=timestamp, id__gte=pk
+        )
+
+    log_entries = list(queryset[: first + 1])
+    return log_entries[:first], len(log_entries) > first
+
+
+class AuditLogEntryType(graphene.ObjectType):
+    timestamp = graphene.DateTime(required=True)
+    service_name = graphene.String(required=True)
+    client_id = graphene.String(required=True)
+    ip_address = graphene.String()
+    actor_user_id = graphene.UUID()
+    actor_role = graphene.String(required=True)
+    target_user_id = graphene.UUID()
+    target_profile_id = graphene.UUID()
+    target_type = graphene.String(required=True)
+    operation = graphene.String(required=True)
+
+
+class AuditLogEntryPage(graphene.ObjectType):
+    entries = graphene.List(graphene.NonNull(AuditLogEntryType), required=True)
+    has_next_page = graphene.Boolean(required=True)
+    end_cursor = graphene.String(
+        description="Give this as the `after` argument to get the next page."
+    )
+
+
+class Query(graphene.ObjectType):
+    audit_log_entries = graphene.Field(
+        AuditLogEntryPage,
+        target_profile_id=graphene.Argument(
+            graphene.UUID, description="Id of the profile the events concern."
+        ),
+        actor_user_id=graphene.Argument(
+            graphene.UUID, description="User id of the user who caused the events."
+        ),
+        first=graphene.Argument(
+            graphene.Int,
+            description=f"Number of events to return. Default is {DEFAULT_PAGE_SIZE}, "
+            f"maximum is {MAX_PAGE_SIZE}.",
+        ),
+        after=graphene.Argument(graphene.String),
+        description="Get the audit events of a profile or of an actor, newest first.\n\n"  # noqa: E501
+        "Exactly one of `targetProfileId` and `actorUserId` must be given.\n\n"
+        "Requires the permission to view audit log entries.",
+    )
+
+    @permission_required("audit_log.view_logentry")
+    def resolve_audit_log_entries(self, info, **kwargs):
+        filters = {
+            name: kwargs[name]
+            for name in ["target_profile_id", "actor_user_id"]
+            if kwargs.get(name)
+        }
+        if len(filters) != 1:
+            raise ValidationError(
+                _("Exactly one of targetProfileId and actorUserId must be given")
+            )
+
+        first = kwargs.get("first")
+        if first is None:
+            first = DEFAULT_PAGE_SIZE
+        if not 0 < first <= MAX_PAGE_SIZE:
+            raise ValidationError(
+                _("first must be between 1 and %(max)s") % {"max": MAX_PAGE_SIZE}
+            )
+
+        log_entries, has_next_page = get_log_entry_page(
+            first, kwargs.get("after"), **filters
+        )
+        return AuditLogEntryPage(
+            entries=log_entries,
+            has_next_page=has_next_page,
+            end_cursor=encode_cursor(log_entries[-1]) if log_entries else None,
+        )
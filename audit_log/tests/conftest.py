@@ -0,0 +1 @@
+from open_city_profile.tests.conftest import *  # noqa
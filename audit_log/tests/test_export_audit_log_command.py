@@ -0,0 +1,146 @@
+import gzip
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from audit_log.management.commands.export_audit_log import Command
+from audit_log.models import LogEntry
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+PROFILE_ID = uuid.uuid4()
+ACTOR_ID = uuid.uuid4()
+
+
+@pytest.fixture
+def log_entries():
+    return LogEntry.objects.bulk_create(
+        [
+            LogEntry(
+                timestamp=START + timedelta(hours=index),
+                service_name="berth" if index % 2 else "youth_membership",
+                ip_address="12.23.34.45",
+                actor_user_id=ACTOR_ID if index < 3 else None,
+                actor_role="ADMIN" if index < 3 else "ANONYMOUS",
+                target_profile_id=PROFILE_ID if index % 3 == 0 else uuid.uuid4(),
+                target_type="base profile",
+                operation="READ",
+            )
+            for index in range(7)
+        ]
+    )
+
+
+def _read_events(path):
+    with gzip.open(path, "rt") as f:
+        return [json.loads(line)["audit_event"] for line in f]
+
+
+def test_exports_all_entries_in_logger_format(log_entries, tmp_path):
+    output = tmp_path / "audit.jsonl.gz"
+    out = StringIO()
+
+    call_command("export_audit_log", str(output), stdout=out)
+
+    events = _read_events(output)
+    assert len(events) == 7
+    assert events[0] == {
+        "origin": "PROFILE-BE",
+        "status": "SUCCESS",
+        "date_time_epoch": int(START.timestamp() * 1000),
+        "date_time": "2026-01-01T00:00:00.000Z",
+        "actor": {
+            "service_name": "youth_membership",
+            "ip_address": "12.23.34.45",
+            "user_id": str(ACTOR_ID),
+            "role": "ADMIN",
+        },
+        "operation": "READ",
+        "target": {"id": str(PROFILE_ID), "type": "base profile"},
+    }
+    assert "Exported 7 audit log entries" in out.getvalue()
+    assert not (tmp_path / "audit.jsonl.gz.checkpoint").exists()
+
+
+@pytest.mark.parametrize(
+    "args,expected_indexes",
+    [
+        (
+            ["--start", "2026-01-01T02:00:00Z", "--end", "2026-01-01T05:00:00Z"],
+            [2, 3, 4],
+        ),
+        (["--profile", str(PROFILE_ID)], [0, 3, 6]),
+        (["--actor", str(ACTOR_ID)], [0, 1, 2]),
+        (["--service", "berth"], [1, 3, 5]),
+        (["--service", "unknown"], []),
+    ],
+)
+def test_filters(log_entries, tmp_path, args, expected_indexes):
+    output = tmp_path / "audit.jsonl.gz"
+
+    call_command("export_audit_log", str(output), *args, stdout=StringIO())
+
+    expected_times = [
+        int((START + timedelta(hours=index)).timestamp() * 1000)
+        for index in expected_indexes
+    ]
+    assert [event["date_time_epoch"] for event in _read_events(output)] == (
+        expected_times
+    )
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--profile", "not-a-uuid"],
+        ["--actor", "123"],
+        ["--start", "yesterday"],
+        ["--end", "2026-13-01T00:00:00Z"],
+        ["--chunk-size", "0"],
+    ],
+)
+def test_invalid_options_raise_an_error(tmp_path, args):
+    with pytest.raises(CommandError):
+        call_command("export_audit_log", str(tmp_path / "audit.jsonl.gz"), *args)
+
+
+def test_existing_output_is_not_overwritten(tmp_path):
+    output = tmp_path / "audit.jsonl.gz"
+    output.write_bytes(b"")
+
+    with pytest.raises(CommandError):
+        call_command("export_audit_log", str(output))
+
+
+def test_interrupted_export_can_be_resumed(log_entries, tmp_path, mocker):
+    output = tmp_path / "audit.jsonl.gz"
+    write_chunk = Command._write_chunk
+
+    def write_one_chunk(self, output_file, chunk):
+        if output_file.tell() > 0:
+            # A partially written chunk
+            output_file.write(b"garbage")
+            raise KeyboardInterrupt()
+        write_chunk(self, output_file, chunk)
+
+    mocker.patch.object(Command, "_write_chunk", write_one_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        call_command("export_audit_log", str(output), "--chunk-size=3")
+    mocker.stopall()
+
+    with pytest.raises(CommandError):
+        call_command("export_audit_log", str(output), "--resume", "--service", "berth")
+
+    out = StringIO()
+    call_command(
+        "export_audit_log", str(output), "--resume", "--chunk-size=3", stdout=out
+    )
+
+    events = _read_events(output)
+    assert [event["date_time_epoch"] for event in events] == [
+        int(log_entry.timestamp.timestamp() * 1000) for log_entry in log_entries
+    ]
+    assert "Exported 7 audit log entries" in out.getvalue()
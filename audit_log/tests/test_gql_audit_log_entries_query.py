@@ -0,0 +1,123 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from guardian.shortcuts import assign_perm
+
+from audit_log.models import LogEntry
+from open_city_profile.tests.asserts import assert_match_error_code
+
+QUERY = """
+    query ($targetProfileId: UUID, $actorUserId: UUID, $first: Int, $after: String) {
+        auditLogEntries(
+            targetProfileId: $targetProfileId
+            actorUserId: $actorUserId
+            first: $first
+            after: $after
+        ) {
+            entries {
+                timestamp
+                serviceName
+                actorUserId
+                actorRole
+                targetProfileId
+                targetType
+                operation
+            }
+            hasNextPage
+            endCursor
+        }
+    }
+"""
+
+NOW = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+PROFILE_ID = uuid.uuid4()
+ACTOR_ID = uuid.uuid4()
+
+
+@pytest.fixture
+def log_entries():
+    # Pairs of entries with the same timestamp, newest first
+    return LogEntry.objects.bulk_create(
+        [
+            LogEntry(
+                timestamp=NOW - timedelta(minutes=index // 2),
+                service_name="berth",
+                actor_user_id=ACTOR_ID,
+                actor_role="ADMIN",
+                target_profile_id=PROFILE_ID if index < 5 else uuid.uuid4(),
+                target_type="base profile",
+                operation="READ",
+            )
+            for index in range(7)
+        ]
+    )
+
+
+def _execute(gql_client, **variables):
+    return gql_client.execute(QUERY, variables=variables)
+
+
+def test_entries_are_returned_newest_first_in_pages(log_entries, user_gql_client):
+    assign_perm("audit_log.view_logentry", user_gql_client.user)
+
+    pages = []
+    after = None
+    while True:
+        executed = _execute(
+            user_gql_client, targetProfileId=str(PROFILE_ID), first=2, after=after
+        )
+        assert "errors" not in executed
+        page = executed["data"]["auditLogEntries"]
+        pages.append(page["entries"])
+        if not page["hasNextPage"]:
+            break
+        after = page["endCursor"]
+
+    assert [len(entries) for entries in pages] == [2, 2, 1]
+    timestamps = [entry["timestamp"] for entries in pages for entry in entries]
+    assert timestamps == sorted(timestamps, reverse=True)
+    assert pages[0][0] == {
+        "timestamp": NOW.isoformat(),
+        "serviceName": "berth",
+        "actorUserId": str(ACTOR_ID),
+        "actorRole": "ADMIN",
+        "targetProfileId": str(PROFILE_ID),
+        "targetType": "base profile",
+        "operation": "READ",
+    }
+
+
+def test_entries_of_an_actor(log_entries, user_gql_client):
+    assign_perm("audit_log.view_logentry", user_gql_client.user)
+
+    executed = _execute(user_gql_client, actorUserId=str(ACTOR_ID))
+
+    page = executed["data"]["auditLogEntries"]
+    assert len(page["entries"]) == 7
+    assert page["hasNextPage"] is False
+
+
+@pytest.mark.parametrize(
+    "variables",
+    [
+        {},
+        {"targetProfileId": str(PROFILE_ID), "actorUserId": str(ACTOR_ID)},
+        {"targetProfileId": str(PROFILE_ID), "first": 0},
+        {"targetProfileId": str(PROFILE_ID), "after": "invalid"},
+    ],
+)
+def test_invalid_arguments(user_gql_client, variables):
+    assign_perm("audit_log.view_logentry", user_gql_client.user)
+
+    executed = _execute(user_gql_client, **variables)
+
+    assert executed["data"] == {"auditLogEntries": None}
+    assert_match_error_code(executed, "VALIDATION_ERROR")
+
+
+def test_requires_view_log_entry_permission(log_entries, user_gql_client):
+    executed = _execute(user_gql_client, targetProfileId=str(PROFILE_ID))
+
+    assert executed["data"] == {"auditLogEntries": None}
+    assert_match_error_code(executed, "PERMISSION_DENIED_ERROR")
@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+
+from django.db import connection
+
+app = "audit_log"
+
+
+def test_partition_logentry_migration(execute_migration_test):
+    timestamp = datetime(2022, 5, 23, tzinfo=timezone.utc)
+
+    def create_data(apps):
+        LogEntry = apps.get_model(app, "LogEntry")
+        return (LogEntry.objects.create(timestamp=timestamp, operation="READ").pk,)
+
+    def verify_migration(apps, log_entry_id):
+        LogEntry = apps.get_model(app, "LogEntry")
+        new_log_entry = LogEntry.objects.create(timestamp=timestamp, operation="READ")
+        assert new_log_entry.pk > log_entry_id
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, tableoid::regclass::text FROM audit_log_logentry "
+                "ORDER BY id"
+            )
+            assert cursor.fetchall() == [
+                (log_entry_id, "audit_log_logentry_legacy"),
+                (new_log_entry.pk, "audit_log_logentry_legacy"),
+            ]
+
+            cursor.execute(
+                "SELECT conname FROM pg_constraint "
+                "WHERE conrelid = 'audit_log_logentry_legacy'::regclass "
+                "AND contype IN ('c', 'p')"
+            )
+            assert cursor.fetchall() == [("audit_log_logentry_legacy_pkey",)]
+
+    execute_migration_test(
+        "0001_initial",
+        "0002_partition_logentry",
+        create_data,
+        verify_migration,
+    )
+
+
+def test_compact_logentry_migration(execute_migration_test):
+    timestamp = datetime(2022, 5, 23, tzinfo=timezone.utc)
+    values = {
+        "service_name": "berth",
+        "client_id": "",
+        "ip_address": "unknown",
+        "actor_role": "OWNER",
+        "target_type": "base profile",
+        "operation": "READ",
+    }
+
+    def create_data(apps):
+        LogEntry = apps.get_model(app, "LogEntry")
+        return (LogEntry.objects.create(timestamp=timestamp, **values).pk,)
+
+    def verify_migration(apps, log_entry_id):
+        LogEntry = apps.get_model(app, "LogEntry")
+        log_entry = LogEntry.objects.get(pk=log_entry_id)
+        assert {name: getattr(log_entry, name) for name in values} == {
+            **values,
+            "ip_address": None,
+        }
+
+        new_log_entry = LogEntry.objects.create(
+            timestamp=timestamp, service_name="kukkuu", operation="UPDATE"
+        )
+        assert LogEntry.objects.get(pk=new_log_entry.pk).service_name == "kukkuu"
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_proc WHERE proname LIKE 'audit_log_%'"
+            )
+            assert cursor.fetchone() == (0,)
+
+    execute_migration_test(
+        "0002_partition_logentry",
+        "0003_compact_logentry",
+        create_data,
+        verify_migration,
+    )
@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from audit_log import models
+from audit_log.models import LogEntry, LogValue
+
+
+def _log_entry(**kwargs):
+    return LogEntry(timestamp=datetime.now(tz=timezone.utc), **kwargs)
+
+
+def test_coded_values_are_returned_as_text():
+    LogEntry.objects.bulk_create(
+        [
+            _log_entry(
+                service_name="berth",
+                client_id="berth-client",
+                ip_address="12.23.34.45",
+                actor_role="OWNER",
+                target_type="base profile",
+                operation="READ",
+            ),
+            _log_entry(actor_role="ANONYMOUS", operation="CREATE"),
+        ]
+    )
+
+    coded, empty = LogEntry.objects.order_by("id")
+    assert coded.service_name == "berth"
+    assert coded.client_id == "berth-client"
+    assert coded.ip_address == "12.23.34.45"
+    assert coded.actor_role == "OWNER"
+    assert coded.target_type == "base profile"
+    assert coded.operation == "READ"
+    assert empty.service_name == ""
+    assert empty.client_id == ""
+    assert empty.ip_address is None
+    assert empty.target_type == ""
+
+
+def test_values_are_stored_once():
+    LogEntry.objects.bulk_create(
+        [
+            _log_entry(service_name="berth", target_type="email", operation="READ"),
+            _log_entry(service_name="berth", target_type="phone", operation="READ"),
+        ]
+    )
+
+    assert sorted(LogValue.objects.values_list("value", flat=True)) == [
+        "berth",
+        "email",
+        "phone",
+    ]
+
+
+def test_filtering_by_text():
+    LogEntry.objects.bulk_create(
+        [
+            _log_entry(service_name="berth", operation="READ"),
+            _log_entry(service_name="youth_membership", operation="UPDATE"),
+        ]
+    )
+
+    assert LogEntry.objects.get(service_name="berth").operation == "READ"
+    assert LogEntry.objects.get(operation="UPDATE").service_name == "youth_membership"
+    assert not LogEntry.objects.filter(service_name="unknown").exists()
+    assert not LogValue.objects.filter(value="unknown").exists()
+
+
+def test_stale_cached_value_id_is_replaced(mocker):
+    mocker.patch.dict(models._log_value_ids, {"berth": 32000})
+
+    LogEntry.objects.bulk_create([_log_entry(service_name="berth", operation="READ")])
+
+    assert LogEntry.objects.get().service_name == "berth"
+    assert models._log_value_ids["berth"] == LogValue.objects.get(value="berth").pk
+
+
+def test_unknown_code_is_rejected():
+    with pytest.raises(ValueError):
+        LogEntry.objects.bulk_create([_log_entry(operation="DESTROY")])
@@ -0,0 +1,93 @@
+import gzip
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from freezegun import freeze_time
+
+from audit_log.models import LogEntry
+from audit_log.partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    create_partitions,
+    list_partitions,
+    month_start,
+    partition_name,
+)
+
+
+def _log_entry(timestamp):
+    return LogEntry.objects.create(timestamp=timestamp, operation="READ")
+
+
+def _partition_of(log_entry):
+    return (
+        LogEntry.objects.extra(select={"partition": "tableoid::regclass::text"})
+        .get(pk=log_entry.pk)
+        .partition
+    )
+
+
+def test_month_arithmetic():
+    month = month_start(datetime(2026, 11, 30, 23, 59, tzinfo=timezone.utc))
+    assert month == datetime(2026, 11, 1, tzinfo=timezone.utc)
+    assert add_months(month, 2) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert add_months(month, -11) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert partition_name(month) == "audit_log_logentry_y2026m11"
+
+
+def test_create_partitions_creates_missing_months():
+    now = add_months(month_start(datetime.now(tz=timezone.utc)), 12)
+
+    created = create_partitions(2, now=now)
+
+    assert created == [partition_name(add_months(now, offset)) for offset in range(3)]
+    assert create_partitions(2, now=now) == []
+
+
+def test_rows_are_moved_from_the_default_partition():
+    month = add_months(month_start(datetime.now(tz=timezone.utc)), 6)
+    log_entry = _log_entry(month)
+    assert _partition_of(log_entry) == DEFAULT_PARTITION
+
+    create_partitions(0, now=month)
+
+    assert _partition_of(log_entry) == partition_name(month)
+    assert LogEntry.objects.get(pk=log_entry.pk).timestamp == month
+
+
+def test_prune_drops_expired_partitions(tmp_path):
+    old_month = add_months(month_start(datetime.now(tz=timezone.utc)), 12)
+    current_month = add_months(old_month, 24)
+    create_partitions(0, now=old_month)
+    old_entry = _log_entry(old_month)
+    new_entry = _log_entry(current_month)
+
+    out = StringIO()
+    with freeze_time(current_month):
+        call_command(
+            "prune_audit_log", keep_months=12, archive_dir=str(tmp_path), stdout=out
+        )
+
+    name = partition_name(old_month)
+    assert f"Removed partition {name}" in out.getvalue()
+    assert name not in [partition.name for partition in list_partitions()]
+    assert not LogEntry.objects.filter(pk=old_entry.pk).exists()
+    assert LogEntry.objects.filter(pk=new_entry.pk).exists()
+    with gzip.open(tmp_path / f"{name}.csv.gz", "rt") as archive:
+        lines = archive.read().splitlines()
+    assert lines[0].startswith("id,timestamp,")
+    assert lines[1].startswith(f"{old_entry.pk},")
+
+
+def test_prune_dry_run_keeps_partitions():
+    old_month = add_months(month_start(datetime.now(tz=timezone.utc)), 12)
+    create_partitions(0, now=old_month)
+
+    out = StringIO()
+    with freeze_time(add_months(old_month, 24)):
+        call_command("prune_audit_log", keep_months=12, dry_run=True, stdout=out)
+
+    name = partition_name(old_month)
+    assert f"Would remove partition {name}" in out.getvalue()
+    assert name in [partition.name for partition in list_partitions()]
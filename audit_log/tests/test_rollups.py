@@ -0,0 +1,119 @@
+import threading
+from datetime import date, datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+
+from audit_log.models import DailyLogEntryCount, LogEntry, RollupProgress
+from audit_log.rollups import DAILY_COUNTS, update_daily_counts
+
+DAY = datetime(2026, 3, 10, 12, tzinfo=timezone.utc)
+
+
+def _log_entries(count, timestamp=DAY, **kwargs):
+    values = {
+        "service_name": "berth",
+        "actor_role": "ADMIN",
+        "operation": "READ",
+        "target_type": "base profile",
+        **kwargs,
+    }
+    return LogEntry.objects.bulk_create(
+        [LogEntry(timestamp=timestamp, **values) for _ in range(count)]
+    )
+
+
+def _counts():
+    return {
+        (
+            count.day,
+            count.service_name,
+            count.actor_role,
+            count.operation,
+            count.target_type,
+        ): count.count
+        for count in DailyLogEntryCount.objects.all()
+    }
+
+
+def test_log_entries_are_counted_per_day_and_columns():
+    _log_entries(3)
+    _log_entries(2, operation="UPDATE")
+    _log_entries(1, timestamp=datetime(2026, 3, 10, 23, 59, tzinfo=timezone.utc))
+    _log_entries(1, timestamp=datetime(2026, 3, 11, tzinfo=timezone.utc))
+    _log_entries(1, service_name="", actor_role="", target_type="")
+
+    update_daily_counts()
+
+    assert _counts() == {
+        (date(2026, 3, 10), "berth", "ADMIN", "READ", "base profile"): 4,
+        (date(2026, 3, 10), "berth", "ADMIN", "UPDATE", "base profile"): 2,
+        (date(2026, 3, 11), "berth", "ADMIN", "READ", "base profile"): 1,
+        (date(2026, 3, 10), "", "", "READ", ""): 1,
+    }
+
+
+def test_only_new_log_entries_are_added():
+    _log_entries(2)
+    update_daily_counts()
+    update_daily_counts()
+
+    log_entries = _log_entries(3)
+    update_daily_counts(batch_size=2)
+
+    assert _counts() == {
+        (date(2026, 3, 10), "berth", "ADMIN", "READ", "base profile"): 5,
+    }
+    assert RollupProgress.objects.get(name=DAILY_COUNTS).last_id == log_entries[-1].id
+
+
+def _in_thread(target):
+    def run():
+        try:
+            target()
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_uncommitted_log_entries_are_waited_for_without_blocking_inserts(
+    transactional_db,
+):
+    # Commits the LogValues, which would otherwise be locked by the insert
+    _log_entries(1)
+    inserted = threading.Event()
+    commit = threading.Event()
+
+    def insert_and_wait():
+        with transaction.atomic():
+            _log_entries(1)
+            inserted.set()
+            commit.wait()
+
+    inserting = _in_thread(insert_and_wait)
+    inserted.wait()
+    updating = _in_thread(update_daily_counts)
+    updating.join(timeout=0.5)
+    assert updating.is_alive()
+
+    log_entry = _log_entries(1)[0]
+    commit.set()
+    inserting.join()
+    updating.join()
+
+    assert _counts() == {
+        (date(2026, 3, 10), "berth", "ADMIN", "READ", "base profile"): 2,
+    }
+    assert RollupProgress.objects.get(name=DAILY_COUNTS).last_id < log_entry.id
+
+
+def test_command_updates_the_counts():
+    _log_entries(2)
+
+    call_command("update_audit_log_rollups", stdout=StringIO())
+
+    assert DailyLogEntryCount.objects.get().count == 2
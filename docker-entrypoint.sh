@@ -40,5 +40,9 @@ if [[ -n "$*" ]]; then
 elif [[ "$DEV_SERVER" = "1" ]]; then
     python -Wd ./manage.py runserver 0.0.0.0:8080
 else
+    # Combine the Prometheus metrics of the uWSGI worker processes
+    export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-metrics}"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    rm -f "$PROMETHEUS_MULTIPROC_DIR"/*.db
     uwsgi --ini .prod/uwsgi.ini
 fi
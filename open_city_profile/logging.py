@@ -1,6 +1,65 @@
+import atexit
 import logging
+import queue
 import time
+from logging.handlers import QueueHandler, QueueListener
 
 
 class UtcFormatter(logging.Formatter):
     converter = time.gmtime
+
+
+def _skip_flush():
+    pass
+
+
+class BatchFlushingQueueListener(QueueListener):
+    """A QueueListener that flushes its handlers once per batch of records.
+
+    Stream handlers flush after every record. Here they are flushed only when the
+    queue has been emptied, so a burst of records gets written with a few writes
+    instead of one write per record.
+    """
+
+    def __init__(self, queue, *handlers):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self._flushes = [handler.flush for handler in handlers]
+        for handler in handlers:
+            # emit() calls self.flush() after every record
+            handler.flush = _skip_flush
+
+    def _flush(self):
+        for flush in self._flushes:
+            flush()
+
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            self._flush()
+
+    def stop(self):
+        if self._thread:
+            super().stop()
+            self._flush()
+
+
+class _InProcessQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The records don't leave the process, so unlike in QueueHandler they
+        # don't need to be formatted and copied before they are queued.
+        return record
+
+
+def enqueue_handlers(logger):
+    """Moves the handlers of the logger behind a queue.
+
+    The logging calls only put the records into the queue, and a background thread
+    passes them on to the original handlers. The queue is emptied when the process
+    exits. Returns the started listener.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = BatchFlushingQueueListener(log_queue, *logger.handlers)
+    logger.handlers = [_InProcessQueueHandler(log_queue)]
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,49 @@
+"""The Prometheus metrics of the /metrics endpoint.
+
+Under uWSGI every worker process keeps its own metrics, and the endpoint is served
+by whichever process receives the request. When the `PROMETHEUS_MULTIPROC_DIR`
+environment variable is set, the processes write their metrics into files in that
+directory instead, and the endpoint reports the metrics of all the processes
+combined. The variable must be set before the processes start, and the directory
+must be emptied before the server is started.
+"""
+
+import atexit
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+# Collectors that report state shared by the processes, rather than the metrics
+# of a single process
+_shared_collectors = []
+
+
+def is_multiprocess():
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def register_shared_collector(collector):
+    """Registers a collector whose metrics are the same in every process."""
+    REGISTRY.register(collector)
+    _shared_collectors.append(collector)
+
+
+def get_registry():
+    """Returns the registry of the metrics reported by the /metrics endpoint."""
+    if not is_multiprocess():
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _shared_collectors:
+        registry.register(collector)
+    return registry
+
+
+def _mark_process_dead():
+    # Removes the values of the live gauges of the exiting process
+    multiprocess.mark_process_dead(os.getpid())
+
+
+if is_multiprocess():
+    atexit.register(_mark_process_dead)
@@ -1,3 +1,7 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -6,12 +10,14 @@ from oauthlib.oauth2 import OAuth2Error
 from requests_oauthlib import OAuth2Session
 
 from open_city_profile.exceptions import TokenExchangeError
+from utils.instrumentation import OPERATION_TOKEN_EXCHANGE, instrumented_request
 
 
 class TunnistamoTokenExchange:
     """Exchanges an authorization code with Tunnistamo into API token for open-city-profile."""  # noqa: E501
 
     timeout = 5
+    instrumentation_name = "tunnistamo"
 
     def __init__(self):
         self.check_settings()
@@ -47,7 +53,8 @@ class TunnistamoTokenExchange:
         )
 
         try:
-            session.fetch_token(
+            self._instrumented(
+                session.fetch_token,
                 token_url=oidc_conf["token_endpoint"],
                 code=authorization_code,
                 client_secret=self.client_secret,
@@ -57,7 +64,9 @@ class TunnistamoTokenExchange:
         except OAuth2Error as exc:
             raise TokenExchangeError("Failed to obtain an access token.") from exc
 
-        response = session.get(self.api_tokens_url, timeout=self.timeout)
+        response = self._instrumented(
+            session.get, self.api_tokens_url, timeout=self.timeout
+        )
         response.raise_for_status()
 
         api_tokens = response.json()
@@ -69,13 +78,27 @@ class TunnistamoTokenExchange:
 
     def get(self, url: str) -> requests.Response:
         headers = {"accept": "application/json"}
-        response = requests.get(url, headers=headers, timeout=self.timeout)
+        response = self._instrumented(
+            requests.get, url, headers=headers, timeout=self.timeout
+        )
         response.raise_for_status()
         return response
 
+    def _instrumented(self, send, *args, **kwargs):
+        return instrumented_request(
+            self.instrumentation_name, OPERATION_TOKEN_EXCHANGE, send, *args, **kwargs
+        )
+
 
 class KeycloakTokenExchange:
     timeout = 5
+    instrumentation_name = "keycloak"
+    # API tokens are not reused when they are about to expire
+    api_token_expiry_margin = 10
+    # Client credentials tokens are renewed this long before they expire, so that
+    # they stay valid for the work done between the renewal checks
+    client_credentials_token_renewal_margin = 120
+    max_concurrent_api_token_requests = 8
 
     def __init__(self):
         self.check_settings()
@@ -87,6 +110,11 @@ class KeycloakTokenExchange:
         self.callback_url = settings.GDPR_AUTH_CALLBACK_URL
 
         self.access_token = None
+        self._access_token_expires_at = float("inf")
+        self._api_tokens = {}
+        # The prefetch errors are kept per thread, so that an error is only
+        # raised in the thread whose prefetch got it
+        self._local = threading.local()
 
     @staticmethod
     def check_settings():
@@ -111,7 +139,8 @@ class KeycloakTokenExchange:
         )
 
         try:
-            response = session.fetch_token(
+            response = self._instrumented(
+                session.fetch_token,
                 token_url=self.oidc_config["token_endpoint"],
                 code=authorization_code,
                 client_secret=self.client_secret,
@@ -124,14 +153,71 @@ class KeycloakTokenExchange:
 
         return self.access_token
 
+    def fetch_client_credentials_token(self) -> str:
+        """Authenticates with the client's own credentials instead of a user's."""
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+        }
+        response = self._instrumented(
+            requests.post,
+            self.oidc_config["token_endpoint"],
+            timeout=self.timeout,
+            data=data,
+        )
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as exc:
+            raise TokenExchangeError("Failed to obtain an access token.") from exc
+
+        response_data = response.json()
+        self.access_token = response_data.get("access_token")
+        expires_in = response_data.get("expires_in")
+        self._access_token_expires_at = (
+            time.monotonic() + expires_in - self.client_credentials_token_renewal_margin
+            if expires_in is not None
+            else float("inf")
+        )
+
+        return self.access_token
+
+    def renew_client_credentials_token(self) -> str:
+        """Fetches a new client credentials token if there isn't one yet or if the
+        current one is about to expire."""
+        if self.access_token is None or self._access_token_expires_at <= (
+            time.monotonic()
+        ):
+            return self.fetch_client_credentials_token()
+        return self.access_token
+
+    @property
+    def _api_token_errors(self):
+        if not hasattr(self._local, "api_token_errors"):
+            self._local.api_token_errors = {}
+        return self._local.api_token_errors
+
     def fetch_api_token(self, target_aud, permission):
+        """Returns an API token for the audience and permission.
+
+        Fetched tokens are reused until they are about to expire.
+        """
+        key = (target_aud, permission)
+        if key in self._api_token_errors:
+            raise self._api_token_errors.pop(key)
+
+        api_token = self._cached_api_token(key)
+        if api_token:
+            return api_token
+
         headers = {"Authorization": "Bearer {}".format(self.access_token)}
         data = {
             "grant_type": "urn:ietf:params:oauth:grant-type:uma-ticket",
             "audience": target_aud,
             "permission": "#{}".format(permission),
         }
-        response = requests.post(
+        response = self._instrumented(
+            requests.post,
             self.oidc_config["token_endpoint"],
             headers=headers,
             timeout=self.timeout,
@@ -140,7 +226,48 @@ class KeycloakTokenExchange:
         response.raise_for_status()
         response_data = response.json()
 
-        return response_data.get("access_token")
+        api_token = response_data.get("access_token")
+        if api_token:
+            expires_in = response_data.get("expires_in")
+            expires_at = (
+                time.monotonic() + expires_in - self.api_token_expiry_margin
+                if expires_in is not None
+                else float("inf")
+            )
+            self._api_tokens[key] = (api_token, expires_at)
+
+        return api_token
+
+    def _cached_api_token(self, key):
+        api_token, expires_at = self._api_tokens.get(key, (None, 0))
+        return api_token if expires_at > time.monotonic() else None
+
+    def prefetch_api_tokens(self, audience_permissions):
+        """Fetches the API tokens for the (audience, permission) pairs concurrently.
+
+        The tokens are then returned by `fetch_api_token` without further requests.
+        An error in fetching a token is raised from the next `fetch_api_token` call
+        for the same audience and permission in the calling thread.
+        """
+
+        def fetch(key):
+            try:
+                self.fetch_api_token(*key)
+            except requests.RequestException as e:
+                return key, e
+
+        keys = {key for key in audience_permissions if not self._cached_api_token(key)}
+        if len(keys) < 2:
+            return
+
+        # Populate the cached property before the threads need it
+        self.oidc_config  # noqa: B018
+
+        with ThreadPoolExecutor(
+            max_workers=min(len(keys), self.max_concurrent_api_token_requests)
+        ) as executor:
+            errors = [error for error in executor.map(fetch, keys) if error]
+        self._api_token_errors.update(errors)
 
     @cached_property
     def oidc_config(self):
@@ -150,6 +277,13 @@ class KeycloakTokenExchange:
 
     def get(self, url: str) -> requests.Response:
         headers = {"accept": "application/json"}
-        response = requests.get(url, headers=headers, timeout=self.timeout)
+        response = self._instrumented(
+            requests.get, url, headers=headers, timeout=self.timeout
+        )
         response.raise_for_status()
         return response
+
+    def _instrumented(self, send, *args, **kwargs):
+        return instrumented_request(
+            self.instrumentation_name, OPERATION_TOKEN_EXCHANGE, send, *args, **kwargs
+        )
@@ -1,11 +1,17 @@
 import graphene
 from graphene_federation import build_schema
 
+import audit_log.schema
 import profiles.schema
 import services.schema
 
 
-class Query(profiles.schema.Query, services.schema.Query, graphene.ObjectType):
+class Query(
+    audit_log.schema.Query,
+    profiles.schema.Query,
+    services.schema.Query,
+    graphene.ObjectType,
+):
     pass
 
 
@@ -36,6 +36,7 @@ env = environ.Env(
     CACHE_URL=(str, "locmemcache://"),
     EMAIL_URL=(str, "consolemail://"),
     SENTRY_DSN=(str, ""),
+    SENTRY_TRACES_SAMPLE_RATE=(float, 0.0),
     TOKEN_AUTH_ACCEPTED_AUDIENCE=(list, []),
     TOKEN_AUTH_ACCEPTED_SCOPE_PREFIX=(str, ""),
     TOKEN_AUTH_REQUIRE_SCOPE=(bool, False),
@@ -47,10 +48,16 @@ env = environ.Env(
     DEFAULT_FROM_EMAIL=(str, "no-reply@hel.fi"),
     FIELD_ENCRYPTION_KEYS=(list, []),
     SALT_NATIONAL_IDENTIFICATION_NUMBER=(str, None),
+    SALT_BLIND_INDEXES=(str, None),
     OPENSHIFT_BUILD_COMMIT=(str, ""),
     AUDIT_LOG_TO_LOGGER_ENABLED=(bool, False),
     AUDIT_LOG_LOGGER_FILENAME=(str, ""),
+    AUDIT_LOG_LOGGER_QUEUE_ENABLED=(bool, False),
     AUDIT_LOG_TO_DB_ENABLED=(bool, False),
+    AUDIT_LOG_ASYNC_WRITER_ENABLED=(bool, False),
+    AUDIT_LOG_ASYNC_QUEUE_SIZE=(int, 10000),
+    AUDIT_LOG_ASYNC_BATCH_SIZE=(int, 500),
+    AUDIT_LOG_ASYNC_ENQUEUE_TIMEOUT=(float, 1.0),
     OPEN_CITY_PROFILE_LOG_LEVEL=(str, None),
     ENABLE_ALLOWED_DATA_FIELDS_RESTRICTION=(bool, False),
     ENABLE_GRAPHIQL=(bool, False),
@@ -74,6 +81,11 @@ env = environ.Env(
     KEYCLOAK_CLIENT_SECRET=(str, ""),
     KEYCLOAK_GDPR_CLIENT_ID=(str, ""),
     KEYCLOAK_GDPR_CLIENT_SECRET=(str, ""),
+    GDPR_API_MAX_RESPONSE_SIZE=(int, 10 * 1024 * 1024),
+    GDPR_API_CIRCUIT_BREAKER_ENABLED=(bool, True),
+    GDPR_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD=(int, 5),
+    GDPR_API_CIRCUIT_BREAKER_RESET_TIMEOUT=(int, 60),
+    ENABLE_METRICS_ENDPOINT=(bool, False),
     VERIFIED_PERSONAL_INFORMATION_ACCESS_AMR_LIST=(list, []),
     CSP_CONNECT_SRC=(str, None),
     CSP_IMG_SRC=(str, None),
@@ -91,6 +103,7 @@ sentry_sdk.init(
     dsn=env.str("SENTRY_DSN", ""),
     release=env.str("OPENSHIFT_BUILD_COMMIT", VERSION),
     environment=env.str("SENTRY_ENVIRONMENT", "development"),
+    traces_sample_rate=env.float("SENTRY_TRACES_SAMPLE_RATE"),
     integrations=[DjangoIntegration()],
 )
 
@@ -150,6 +163,9 @@ FIELD_ENCRYPTION_KEYS = env.list("FIELD_ENCRYPTION_KEYS")
 SALT_NATIONAL_IDENTIFICATION_NUMBER = env.str("SALT_NATIONAL_IDENTIFICATION_NUMBER")
 if not SALT_NATIONAL_IDENTIFICATION_NUMBER and DEBUG:
     SALT_NATIONAL_IDENTIFICATION_NUMBER = "DEBUG_SALT"
+SALT_BLIND_INDEXES = (
+    env.str("SALT_BLIND_INDEXES") or SALT_NATIONAL_IDENTIFICATION_NUMBER
+)
 
 ROOT_URLCONF = "open_city_profile.urls"
 WSGI_APPLICATION = "open_city_profile.wsgi.application"
@@ -239,8 +255,6 @@ TEMPLATES = [
     }
 ]
 
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800
-
 CORS_ALLOW_ALL_ORIGINS = True
 
 # Authentication
@@ -300,7 +314,12 @@ GRAPHENE = {
 
 AUDIT_LOG_TO_LOGGER_ENABLED = env.bool("AUDIT_LOG_TO_LOGGER_ENABLED")
 AUDIT_LOG_LOGGER_FILENAME = env("AUDIT_LOG_LOGGER_FILENAME")
+AUDIT_LOG_LOGGER_QUEUE_ENABLED = env.bool("AUDIT_LOG_LOGGER_QUEUE_ENABLED")
 AUDIT_LOG_TO_DB_ENABLED = env.bool("AUDIT_LOG_TO_DB_ENABLED")
+AUDIT_LOG_ASYNC_WRITER_ENABLED = env.bool("AUDIT_LOG_ASYNC_WRITER_ENABLED")
+AUDIT_LOG_ASYNC_QUEUE_SIZE = env.int("AUDIT_LOG_ASYNC_QUEUE_SIZE")
+AUDIT_LOG_ASYNC_BATCH_SIZE = env.int("AUDIT_LOG_ASYNC_BATCH_SIZE")
+AUDIT_LOG_ASYNC_ENQUEUE_TIMEOUT = env.float("AUDIT_LOG_ASYNC_ENQUEUE_TIMEOUT")
 
 if AUDIT_LOG_LOGGER_FILENAME:
     if "X" in AUDIT_LOG_LOGGER_FILENAME:
@@ -378,6 +397,18 @@ KEYCLOAK_CLIENT_SECRET = env("KEYCLOAK_CLIENT_SECRET")
 KEYCLOAK_GDPR_CLIENT_ID = env("KEYCLOAK_GDPR_CLIENT_ID")
 KEYCLOAK_GDPR_CLIENT_SECRET = env("KEYCLOAK_GDPR_CLIENT_SECRET")
 
+GDPR_API_MAX_RESPONSE_SIZE = env.int("GDPR_API_MAX_RESPONSE_SIZE")
+GDPR_API_CIRCUIT_BREAKER_ENABLED = env.bool("GDPR_API_CIRCUIT_BREAKER_ENABLED")
+GDPR_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD = env.int(
+    "GDPR_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD"
+)
+GDPR_API_CIRCUIT_BREAKER_RESET_TIMEOUT = env.int(
+    "GDPR_API_CIRCUIT_BREAKER_RESET_TIMEOUT"
+)
+
+# Set to True to expose Prometheus metrics in the /metrics endpoint
+ENABLE_METRICS_ENDPOINT = env.bool("ENABLE_METRICS_ENDPOINT")
+
 # get build time from a file in docker image
 APP_BUILD_TIME = datetime.fromtimestamp(os.path.getmtime(__file__))
 
@@ -12,10 +12,11 @@ snapshots['test_graphql_schema_matches_the_reference 1'] = '''type Query {
   profile(id: ID!, serviceType: ServiceType): ProfileNode
   myProfile: ProfileNode
   downloadMyProfile(authorizationCode: String!, authorizationCodeKeycloak: String): JSONString
-  profiles(serviceType: ServiceType, offset: Int, before: String, after: String, first: Int, last: Int, id: [UUID!], firstName: String, lastName: String, nickname: String, nationalIdentificationNumber: String, emails_Email: String, emails_EmailType: String, emails_Primary: Boolean, emails_Verified: Boolean, phones_Phone: String, phones_PhoneType: String, phones_Primary: Boolean, addresses_Address: String, addresses_PostalCode: String, addresses_City: String, addresses_CountryCode: String, addresses_AddressType: String, addresses_Primary: Boolean, language: String, orderBy: String): ProfileNodeConnection
+  profiles(serviceType: ServiceType, offset: Int, before: String, after: String, first: Int, last: Int, id: [UUID!], firstName: String, lastName: String, nickname: String, nationalIdentificationNumber: String, municipalityOfResidenceNumber: String, permanentAddressPostalCode: String, emails_Email: String, emails_EmailType: String, emails_Primary: Boolean, emails_Verified: Boolean, phones_Phone: String, phones_PhoneType: String, phones_Primary: Boolean, addresses_Address: String, addresses_PostalCode: String, addresses_City: String, addresses_CountryCode: String, addresses_AddressType: String, addresses_Primary: Boolean, language: String, orderBy: String): ProfileNodeConnection
   claimableProfile(token: UUID!): ProfileNode
   profileWithAccessToken(token: UUID!): RestrictedProfileNode
   serviceConnectionWithUserId(userId: UUID!, serviceClientId: String!): ServiceConnectionType
+  auditLogEntries(targetProfileId: UUID, actorUserId: UUID, first: Int, after: String): AuditLogEntryPage
   _entities(representations: [_Any!]!): [_Entity]!
   _service: _Service!
 }
@@ -292,6 +293,25 @@ type RestrictedProfileNode implements Node {
   contactMethod: ContactMethod
 }
 
+type AuditLogEntryPage {
+  entries: [AuditLogEntryType!]!
+  hasNextPage: Boolean!
+  endCursor: String
+}
+
+type AuditLogEntryType {
+  timestamp: DateTime!
+  serviceName: String!
+  clientId: String!
+  ipAddress: String
+  actorUserId: UUID
+  actorRole: String!
+  targetUserId: UUID
+  targetProfileId: UUID
+  targetType: String!
+  operation: String!
+}
+
 union _Entity = ProfileNode | AddressNode
 
 scalar _Any
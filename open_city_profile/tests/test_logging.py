@@ -0,0 +1,46 @@
+import io
+import logging
+import queue
+
+from open_city_profile.logging import BatchFlushingQueueListener, enqueue_handlers
+
+
+class CountingStream(io.StringIO):
+    flush_count = 0
+
+    def flush(self):
+        self.flush_count += 1
+        super().flush()
+
+
+def test_enqueued_records_are_written_by_the_original_handlers():
+    stream = io.StringIO()
+    logger = logging.getLogger("test_enqueue_handlers")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [logging.StreamHandler(stream)]
+
+    listener = enqueue_handlers(logger)
+    for index in range(100):
+        logger.info("message %s", index)
+    listener.stop()
+
+    assert stream.getvalue().splitlines() == [
+        f"message {index}" for index in range(100)
+    ]
+
+
+def test_handlers_are_flushed_once_per_batch():
+    stream = CountingStream()
+    log_queue = queue.SimpleQueue()
+    for index in range(100):
+        log_queue.put(
+            logging.makeLogRecord({"msg": f"message {index}", "levelno": logging.INFO})
+        )
+
+    listener = BatchFlushingQueueListener(log_queue, logging.StreamHandler(stream))
+    listener.start()
+    listener.stop()
+
+    assert len(stream.getvalue().splitlines()) == 100
+    assert stream.flush_count <= 2
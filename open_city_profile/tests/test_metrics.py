@@ -0,0 +1,29 @@
+from prometheus_client import REGISTRY, Counter, values
+
+from open_city_profile.metrics import get_registry
+
+
+def test_metrics_of_the_current_process_are_reported_by_default(client, settings):
+    settings.ENABLE_METRICS_ENDPOINT = True
+
+    response = client.get("/metrics")
+
+    assert get_registry() is REGISTRY
+    assert "gdpr_api_circuit_breaker_state" in response.content.decode()
+
+
+def test_metrics_of_all_processes_are_combined_in_multiprocess_mode(
+    client, settings, monkeypatch, tmp_path
+):
+    settings.ENABLE_METRICS_ENDPOINT = True
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    for pid in (1, 2):
+        monkeypatch.setattr(
+            values, "ValueClass", values.MultiProcessValue(lambda pid=pid: pid)
+        )
+        Counter("test_requests", "Test requests", registry=None).inc(pid)
+
+    metrics = client.get("/metrics").content.decode()
+
+    assert "test_requests_total 3.0" in metrics.splitlines()
+    assert "gdpr_api_circuit_breaker_state" in metrics
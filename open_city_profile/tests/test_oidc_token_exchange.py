@@ -1,8 +1,12 @@
+import threading
+from urllib.parse import parse_qs
+
 import pytest
+import requests
 from django.conf import settings
 
 from open_city_profile.exceptions import TokenExchangeError
-from open_city_profile.oidc import TunnistamoTokenExchange
+from open_city_profile.oidc import KeycloakTokenExchange, TunnistamoTokenExchange
 
 
 def test_authorization_code_exchange_successful(user, requests_mock):
@@ -36,3 +40,107 @@ def test_authorization_code_exchange_failed(requests_mock):
         tte.fetch_api_tokens("auth_code")
 
     assert str(e.value) == "Failed to obtain an access token."
+
+
+KEYCLOAK_TOKEN_ENDPOINT = "https://keycloak.example.com/token"
+
+
+@pytest.fixture
+def keycloak_token_exchange(settings, requests_mock):
+    settings.KEYCLOAK_BASE_URL = "https://keycloak.example.com"
+    settings.KEYCLOAK_REALM = "test-realm"
+    settings.KEYCLOAK_GDPR_CLIENT_ID = "test-gdpr-client"
+    settings.KEYCLOAK_GDPR_CLIENT_SECRET = "testsecret"
+    requests_mock.get(
+        "https://keycloak.example.com/realms/test-realm/.well-known/openid-configuration",
+        json={"token_endpoint": KEYCLOAK_TOKEN_ENDPOINT},
+    )
+
+    def get_api_token_response(request, context):
+        body = parse_qs(request.body)
+        if body["grant_type"][0] == "client_credentials":
+            return {"access_token": "client-token", "expires_in": 300}
+        audience = body["audience"][0]
+        if audience == "failing-api":
+            context.status_code = 500
+            return {}
+        return {"access_token": f"{audience}-token", "expires_in": 300}
+
+    requests_mock.post(KEYCLOAK_TOKEN_ENDPOINT, json=get_api_token_response)
+
+    return KeycloakTokenExchange()
+
+
+def _api_token_request_count(requests_mock):
+    return len(
+        [r for r in requests_mock.request_history if r.url == KEYCLOAK_TOKEN_ENDPOINT]
+    )
+
+
+def test_keycloak_api_token_is_reused_until_it_expires(
+    keycloak_token_exchange, requests_mock, mocker
+):
+    monotonic = mocker.patch("open_city_profile.oidc.time.monotonic", return_value=0)
+
+    assert keycloak_token_exchange.fetch_api_token("api", "delete") == "api-token"
+    monotonic.return_value = 280
+    assert keycloak_token_exchange.fetch_api_token("api", "delete") == "api-token"
+    assert _api_token_request_count(requests_mock) == 1
+
+    monotonic.return_value = 295
+    assert keycloak_token_exchange.fetch_api_token("api", "delete") == "api-token"
+    assert _api_token_request_count(requests_mock) == 2
+
+
+def test_keycloak_api_tokens_are_prefetched(keycloak_token_exchange, requests_mock):
+    keys = [("api-1", "query"), ("api-2", "query"), ("failing-api", "query")]
+
+    keycloak_token_exchange.prefetch_api_tokens(keys)
+    assert _api_token_request_count(requests_mock) == 3
+
+    assert keycloak_token_exchange.fetch_api_token("api-1", "query") == "api-1-token"
+    assert keycloak_token_exchange.fetch_api_token("api-2", "query") == "api-2-token"
+    with pytest.raises(requests.HTTPError):
+        keycloak_token_exchange.fetch_api_token("failing-api", "query")
+    assert _api_token_request_count(requests_mock) == 3
+
+
+def test_keycloak_api_token_prefetch_errors_are_raised_only_in_the_same_thread(
+    keycloak_token_exchange, requests_mock
+):
+    keycloak_token_exchange.prefetch_api_tokens(
+        [("api-1", "query"), ("failing-api", "query")]
+    )
+    errors = []
+
+    def fetch_in_other_thread():
+        try:
+            keycloak_token_exchange.fetch_api_token("failing-api", "query")
+        except requests.HTTPError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=fetch_in_other_thread)
+    thread.start()
+    thread.join()
+
+    # The other thread requested the token itself
+    assert len(errors) == 1
+    assert _api_token_request_count(requests_mock) == 3
+    with pytest.raises(requests.HTTPError):
+        keycloak_token_exchange.fetch_api_token("failing-api", "query")
+    assert _api_token_request_count(requests_mock) == 3
+
+
+def test_keycloak_client_credentials_token_is_renewed_when_about_to_expire(
+    keycloak_token_exchange, requests_mock, mocker
+):
+    monotonic = mocker.patch("open_city_profile.oidc.time.monotonic", return_value=0)
+
+    assert keycloak_token_exchange.renew_client_credentials_token() == "client-token"
+    monotonic.return_value = 170
+    keycloak_token_exchange.renew_client_credentials_token()
+    assert _api_token_request_count(requests_mock) == 1
+
+    monotonic.return_value = 185
+    keycloak_token_exchange.renew_client_credentials_token()
+    assert _api_token_request_count(requests_mock) == 2
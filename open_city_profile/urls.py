@@ -2,14 +2,16 @@ from csp.decorators import csp_exempt
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.urls import include, path
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import TemplateView
 from graphql_sync_dataloaders import DeferredExecutionContext
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from open_city_profile import __version__
+from open_city_profile.metrics import get_registry
 from open_city_profile.views import GraphQLView
 
 urlpatterns = [
@@ -61,4 +63,16 @@ def readiness(*args, **kwargs):
     return JsonResponse(response_json, status=200)
 
 
-urlpatterns += [path("healthz", healthz), path("readiness", readiness)]
+def metrics(*args, **kwargs):
+    if not settings.ENABLE_METRICS_ENDPOINT:
+        raise Http404()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
+
+
+urlpatterns += [
+    path("healthz", healthz),
+    path("readiness", readiness),
+    path("metrics", metrics),
+]
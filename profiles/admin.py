@@ -1,4 +1,4 @@
-import json
+import tempfile
 from functools import reduce
 
 from django import forms
@@ -6,13 +6,16 @@ from django.contrib import admin, messages
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.forms.models import ModelForm
 from django.http import JsonResponse
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import path
 from django.utils.decorators import method_decorator
 
+from profiles.customer_import import fail_stale_import_jobs, start_import_job
+from profiles.enums import CustomerImportStatus
 from profiles.models import (
     Address,
     ClaimToken,
+    CustomerImportJob,
     Email,
     Phone,
     Profile,
@@ -23,6 +26,8 @@ from profiles.models import (
 from services.admin import ServiceConnectionInline
 from services.models import Service
 
+SHOWN_VALIDATION_ERRORS_COUNT = 100
+
 
 def superuser_required(function):
     def wrapper(request, *args, **kwargs):
@@ -173,22 +178,51 @@ class ExtendedProfileAdmin(admin.ModelAdmin):
 
     def get_urls(self):
         urls = super().get_urls()
-        my_urls = [path("upload-json/", self.upload_json, name="upload-json")]
+        my_urls = [
+            path("upload-json/", self.upload_json, name="upload-json"),
+            path(
+                "upload-json/<int:job_id>/",
+                self.customer_import_job,
+                name="customer-import-job",
+            ),
+            path(
+                "upload-json/<int:job_id>/export.json",
+                self.customer_import_job_result,
+                name="customer-import-job-result",
+            ),
+            path(
+                "upload-json/<int:job_id>/errors.json",
+                self.customer_import_job_validation_errors,
+                name="customer-import-job-validation-errors",
+            ),
+        ]
         return my_urls + urls
 
+    @staticmethod
+    def _save_upload(uploaded_file):
+        """Copies the uploaded file to a file that outlives the request."""
+        with tempfile.NamedTemporaryFile(
+            prefix="customer-import-", suffix=".json", delete=False
+        ) as f:
+            for chunk in uploaded_file.chunks():
+                f.write(chunk)
+        return f.name
+
     @method_decorator(superuser_required, name="dispatch")
     def upload_json(self, request):
         try:
             if request.method == "POST":
                 form = ImportProfilesFromJsonForm(request.POST, request.FILES)
                 if form.is_valid():
-                    data = json.loads(request.FILES["json_file"].read())
-                    service = form.cleaned_data["service"]
-                    result = Profile.import_customer_data(data, service)
-                    response = JsonResponse(result)
-                    response["Content-Disposition"] = "attachment; filename=export.json"
-
-                    return response
+                    path = self._save_upload(request.FILES["json_file"])
+                    job = CustomerImportJob.objects.create(
+                        service=form.cleaned_data["service"],
+                        created_by=request.user,
+                        file_path=path,
+                    )
+                    start_import_job(job.pk, path)
+
+                    return redirect("admin:customer-import-job", job_id=job.pk)
                 else:
                     raise ValidationError(form.errors.as_text())
             else:
@@ -201,6 +235,39 @@ class ExtendedProfileAdmin(admin.ModelAdmin):
             form = ImportProfilesFromJsonForm()
             return render(request, "admin/profiles/upload_json.html", {"form": form})
 
+    @method_decorator(superuser_required, name="dispatch")
+    def customer_import_job(self, request, job_id):
+        fail_stale_import_jobs()
+        job = get_object_or_404(CustomerImportJob, pk=job_id)
+        return render(
+            request,
+            "admin/profiles/customer_import_job.html",
+            {
+                "job": job,
+                "is_running": job.status == CustomerImportStatus.RUNNING,
+                "validation_errors": job.validation_errors[
+                    :SHOWN_VALIDATION_ERRORS_COUNT
+                ],
+            },
+        )
+
+    @method_decorator(superuser_required, name="dispatch")
+    def customer_import_job_result(self, request, job_id):
+        job = get_object_or_404(
+            CustomerImportJob.objects.exclude(status=CustomerImportStatus.RUNNING),
+            pk=job_id,
+        )
+        response = JsonResponse(job.result)
+        response["Content-Disposition"] = "attachment; filename=export.json"
+        return response
+
+    @method_decorator(superuser_required, name="dispatch")
+    def customer_import_job_validation_errors(self, request, job_id):
+        job = get_object_or_404(CustomerImportJob, pk=job_id)
+        response = JsonResponse(job.validation_errors, safe=False)
+        response["Content-Disposition"] = "attachment; filename=errors.json"
+        return response
+
     def delete_model(self, request, obj):
         user = obj.user
         super().delete_model(request, obj)
@@ -5,5 +5,7 @@ class ProfilesConfig(AppConfig):
     name = "profiles"
 
     def ready(self):
-        import profiles.log_signals  # noqa isort:skip
         import profiles.signals  # noqa isort:skip
+        from profiles.log_signals import connect_audit_log_receivers
+
+        connect_audit_log_receivers()
@@ -1,36 +1,112 @@
+import atexit
+import contextvars
+import ipaddress
 import json
 import logging
+import queue
 import threading
 from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from typing import Any
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.db import close_old_connections
+from django.db.models import Q
 from django.utils.text import camel_case_to_spaces
+from prometheus_client import Counter, Gauge
 
 from audit_log.models import LogEntry
+from open_city_profile.logging import enqueue_handlers
 
 User = get_user_model()
 
-_thread_locals = threading.local()
+logger = logging.getLogger(__name__)
+
+dropped_entries_counter = Counter(
+    "audit_log_dropped_entries",
+    "Number of audit log entries that were not written",
+    ["reason"],
+)
+queue_depth_gauge = Gauge(
+    "audit_log_queue_depth",
+    "Number of requests' audit log records waiting to be written",
+    multiprocess_mode="livesum",
+)
+
+
+@dataclass
+class _AuditContext:
+    """The audit log data collected in one audit context.
+
+    The actor and the client are taken from the request, unless given explicitly.
+    """
+
+    request: Any = None
+    user: Any = None
+    service: Any = None
+    client_id: str | None = None
+    ip_address: str | None = None
+    loggables: dict = field(
+        default_factory=lambda: defaultdict(lambda: {"parts": dict()})
+    )
+    # (model, pk) -> profile id of the audited instances seen in the context
+    profile_ids: dict = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_current_context = contextvars.ContextVar("audit_log_context", default=None)
+
+
+@contextmanager
+def audit_context(request=None, user=None, service=None, client_id=None):
+    """Collects the audit log entries of the enclosed code.
+
+    The entries are written in one go when the context exits. Code that runs
+    outside of any audit context isn't audit logged. A context is inherited by
+    asyncio tasks, and by threads that run in a copy of the caller's context,
+    e.g. with `contextvars.copy_context().run`. Without a request and a user the
+    actor is the system itself, like in management commands.
+    """
+    context = _AuditContext(
+        request=request, user=user, service=service, client_id=client_id
+    )
+    token = _current_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_context.reset(token)
+        _commit_audit_logs(context)
 
 
-def _get_current_request():
-    return getattr(_thread_locals, "request", None)
+def _get_current_user(context):
+    if context.user is not None:
+        return context.user
+    return getattr(context.request, "user", None)
 
 
-def _get_current_user():
-    return getattr(_get_current_request(), "user", None)
+def _is_ip_address(value):
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
 
 
-def _get_original_client_ip():
+def _get_original_client_ip(context):
     client_ip = None
 
-    request = _get_current_request()
+    request = context.request
     if request:
         if settings.USE_X_FORWARDED_FOR:
             forwarded_for = request.headers.get("x-forwarded-for", "")
-            client_ip = forwarded_for.split(",")[0] or None
+            client_ip = forwarded_for.split(",")[0].strip() or None
+            # The address is stored as an inet, so anything else is ignored
+            if client_ip and not _is_ip_address(client_ip):
+                client_ip = None
 
         if not client_ip:
             client_ip = request.META.get("REMOTE_ADDR")
@@ -38,12 +114,16 @@ def _get_original_client_ip():
     return client_ip
 
 
-def _get_current_service():
-    return getattr(_get_current_request(), "service", None)
+def _get_current_service(context):
+    if context.service is not None:
+        return context.service
+    return getattr(context.request, "service", None)
 
 
-def _get_current_client_id():
-    return getattr(_get_current_request(), "client_id", None)
+def _get_current_client_id(context):
+    if context.client_id is not None:
+        return context.client_id
+    return getattr(context.request, "client_id", None)
 
 
 class AuditLogMiddleware:
@@ -51,38 +131,115 @@ class AuditLogMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        _thread_locals.request = request
-        request._audit_loggables = defaultdict(lambda: {"parts": dict()})
+        with audit_context(request=request):
+            return self.get_response(request)
+
 
-        response = self.get_response(request)
+def _resolve_profile_id(instance, known_profile_ids):
+    if hasattr(instance, "profile_id"):
+        return instance.profile_id
 
-        _commit_audit_logs()
-        _thread_locals.__dict__.clear()
+    # An instance that isn't directly related to a profile is usually loaded
+    # through an audited instance that has been seen already in this context
+    for model_field in instance._meta.concrete_fields:
+        if model_field.many_to_one or model_field.one_to_one:
+            key = (model_field.related_model, getattr(instance, model_field.attname))
+            if key in known_profile_ids:
+                return known_profile_ids[key]
 
-        return response
+    return instance.resolve_profile_id()
 
 
-def _get_profile_and_loggables(instance):
+def _get_profile_loggables(context, instance):
     if not (settings.AUDIT_LOG_TO_LOGGER_ENABLED or settings.AUDIT_LOG_TO_DB_ENABLED):
         return
 
-    audit_loggables = getattr(_get_current_request(), "_audit_loggables", None)
-
-    if (
-        audit_loggables is not None
-        and getattr(instance.__class__, "audit_log", False)
-        and instance.pk
-    ):
-        profile = (
-            instance.profile
-            if hasattr(instance, "profile")
-            else instance.resolve_profile()
-        )
+    if getattr(instance.__class__, "audit_log", False) and instance.pk:
+        profile_id = _resolve_profile_id(instance, context.profile_ids)
+        context.profile_ids[(instance.__class__, instance.pk)] = profile_id
+
+        return context.loggables[profile_id]
+
+
+def _get_loaded_profile(instance):
+    """Returns the profile of the instance if it has been loaded already."""
+    if instance.__class__.__name__ == "Profile":
+        return instance
+
+    try:
+        profile_field = instance._meta.get_field("profile")
+    except FieldDoesNotExist:
+        return None
+
+    return profile_field.get_cached_value(instance, None)
+
+
+def _get_profile_user(context, profile):
+    """Returns the user of the profile if it has been loaded already."""
+    if profile.user_id is None:
+        return None
+
+    user = profile._state.fields_cache.get("user")
+    if user is None:
+        current_user = _get_current_user(context)
+        if profile.user_id == getattr(current_user, "pk", None):
+            user = current_user
+
+    return user
+
+
+def _store_profile_user(context, instance, profile_loggables):
+    """Stores the uuid of the profile's user from the already loaded data.
 
-        return profile, audit_loggables[profile.pk]
+    Nothing is fetched from the database. The instances are often seen before
+    their related objects have been attached to them, so the loaded profiles are
+    kept and their users are looked up again when the audit context exits.
+    """
+    if profile_loggables.get("user_uuid") is not None:
+        return
+
+    profile = _get_loaded_profile(instance)
+    if profile is None:
+        return
+
+    user = _get_profile_user(context, profile)
+    if user is not None:
+        profile_loggables["user_uuid"] = user.uuid
+        profile_loggables.pop("profiles", None)
+    else:
+        profiles = profile_loggables.setdefault("profiles", [])
+        if not any(loaded is profile for loaded in profiles):
+            profiles.append(profile)
+
+
+def _detach_profile_loggables(context, profile_loggables):
+    """Returns the loggables of a profile without the loaded instances.
+
+    If the user's uuid still isn't known, the id of the user is included when a
+    profile has been loaded, so that the uuid can be resolved also after the
+    profile has been deleted.
+    """
+    data = {
+        "parts": profile_loggables["parts"],
+        "user_uuid": profile_loggables.get("user_uuid"),
+    }
+    profiles = profile_loggables.get("profiles")
+    if data["user_uuid"] is None and profiles:
+        for profile in profiles:
+            user = _get_profile_user(context, profile)
+            if user is not None:
+                data["user_uuid"] = user.uuid
+                break
+        else:
+            data["user_id"] = next(
+                (profile.user_id for profile in profiles if profile.user_id), None
+            )
+    return data
 
 
-def _resolve_role(current_user, profile_user_uuid):
+def _resolve_role(current_user, profile_user_uuid, is_system=False):
+    if is_system:
+        return "SYSTEM"
     if profile_user_uuid and profile_user_uuid == getattr(current_user, "uuid", None):
         return "OWNER"
     elif current_user is not None:
@@ -104,47 +261,63 @@ def _profile_part(instance):
 
 
 def register_loggable(instance):
-    profile_and_loggables = _get_profile_and_loggables(instance)
+    context = _current_context.get()
+    if context is None:
+        return
 
-    if profile_and_loggables is not None:
-        profile, profile_loggables = profile_and_loggables
+    with context.lock:
+        profile_loggables = _get_profile_loggables(context, instance)
 
-        profile_loggables["profile"] = profile
-        if profile.user:
-            profile_loggables["user_uuid"] = profile.user.uuid
+        if profile_loggables is not None:
+            _store_profile_user(context, instance, profile_loggables)
 
 
 def log(action, instance):
-    profile_and_loggables = _get_profile_and_loggables(instance)
+    context = _current_context.get()
+    if context is None:
+        return
+
+    with context.lock:
+        profile_loggables = _get_profile_loggables(context, instance)
+
+        if profile_loggables is not None:
+            _store_profile_user(context, instance, profile_loggables)
+
+            data_action = (action, _profile_part(instance))
+            if data_action not in profile_loggables["parts"]:
+                profile_loggables["parts"][data_action] = datetime.now(tz=timezone.utc)
 
-    if profile_and_loggables is not None:
-        profile, profile_loggables = profile_and_loggables
 
-        profile_loggables["profile"] = profile
-        data_action = (action, _profile_part(instance))
-        if data_action not in profile_loggables["parts"]:
-            profile_loggables["parts"][data_action] = datetime.now(tz=timezone.utc)
+@dataclass
+class _AuditLogRecord:
+    """The audit log data of a single audit context, detached from the context."""
 
+    current_user: Any
+    service_name: str
+    client_id: str
+    ip_address: str
+    audit_loggables: dict
+    is_system: bool = False
 
-def _create_log_entries(current_user, service, client_id, ip_address, audit_loggables):
+
+def _create_log_entries(record):
     log_entries = []
 
-    service_name = service.name if service else ""
-    client_id = client_id if client_id else ""
-    ip_address = ip_address if ip_address else ""
-    actor_user_id = getattr(current_user, "uuid", None)
+    actor_user_id = getattr(record.current_user, "uuid", None)
 
-    for profile_id, data in audit_loggables.items():
+    for profile_id, data in record.audit_loggables.items():
         target_user_uuid = data.get("user_uuid")
-        actor_role = _resolve_role(current_user, target_user_uuid)
+        actor_role = _resolve_role(
+            record.current_user, target_user_uuid, record.is_system
+        )
 
         for (action, profile_part), timestamp in data["parts"].items():
             log_entries.append(
                 LogEntry(
                     timestamp=timestamp,
-                    service_name=service_name,
-                    client_id=client_id,
-                    ip_address=ip_address,
+                    service_name=record.service_name,
+                    client_id=record.client_id,
+                    ip_address=record.ip_address,
                     actor_user_id=actor_user_id,
                     actor_role=actor_role,
                     target_user_id=target_user_uuid,
@@ -157,75 +330,315 @@ def _create_log_entries(current_user, service, client_id, ip_address, audit_logg
     return log_entries
 
 
-def _put_logs_to_logger(log_entries):
-    logger = logging.getLogger("audit")
-
-    for log_entry in log_entries:
-        actor_dict = {
-            k: v
-            for k, v in [
-                ("service_name", log_entry.service_name),
-                ("client_id", log_entry.client_id),
-                ("ip_address", log_entry.ip_address),
-                ("user_id", str(log_entry.actor_user_id or "")),
-                ("role", log_entry.actor_role),
-            ]
-            if v
+def log_entry_message(log_entry):
+    """Returns the audit event envelope of the log entry as a dict."""
+    actor_dict = {
+        k: v
+        for k, v in [
+            ("service_name", log_entry.service_name),
+            ("client_id", log_entry.client_id),
+            ("ip_address", log_entry.ip_address),
+            ("user_id", str(log_entry.actor_user_id or "")),
+            ("role", log_entry.actor_role),
+        ]
+        if v
+    }
+
+    target_dict = {
+        k: v
+        for k, v in [
+            ("id", str(log_entry.target_profile_id or "")),
+            ("user_id", str(log_entry.target_user_id or "")),
+            ("type", log_entry.target_type),
+        ]
+        if v
+    }
+
+    return {
+        "audit_event": {
+            "origin": "PROFILE-BE",
+            "status": "SUCCESS",
+            "date_time_epoch": int(log_entry.timestamp.timestamp() * 1000),
+            "date_time": f"{log_entry.timestamp.replace(tzinfo=None).isoformat(sep='T', timespec='milliseconds')}Z",  # noqa: E501
+            "actor": actor_dict,
+            "operation": log_entry.operation,
+            "target": target_dict,
         }
+    }
 
-        target_dict = {
-            k: v
-            for k, v in [
-                ("id", str(log_entry.target_profile_id or "")),
-                ("user_id", str(log_entry.target_user_id or "")),
-                ("type", log_entry.target_type),
-            ]
-            if v
-        }
 
-        message = {
-            "audit_event": {
-                "origin": "PROFILE-BE",
-                "status": "SUCCESS",
-                "date_time_epoch": int(log_entry.timestamp.timestamp() * 1000),
-                "date_time": f"{log_entry.timestamp.replace(tzinfo=None).isoformat(sep='T', timespec='milliseconds')}Z",  # noqa: E501
-                "actor": actor_dict,
-                "operation": log_entry.operation,
-                "target": target_dict,
-            }
-        }
+_encode_json_string = json.encoder.encode_basestring_ascii
 
-        logger.info(json.dumps(message))
 
+def _json_object(items):
+    return (
+        "{"
+        + ", ".join(
+            f'"{key}": {_encode_json_string(value)}' for key, value in items if value
+        )
+        + "}"
+    )
 
-def _put_logs_to_db(log_entries):
-    LogEntry.objects.bulk_create(log_entries)
 
+def _serialize_log_entries(log_entries):
+    """Yields the `log_entry_message` of every log entry as JSON.
 
-def _commit_audit_logs():
-    request = _get_current_request()
+    The output is the same as from `json.dumps`, but the actor and the target
+    objects, which mostly repeat in a request, are encoded only once.
+    """
+    actors = {}
+    targets = {}
 
-    audit_loggables = getattr(request, "_audit_loggables", None)
-    if not audit_loggables:
+    for log_entry in log_entries:
+        actor_key = (
+            log_entry.service_name,
+            log_entry.client_id,
+            log_entry.ip_address,
+            log_entry.actor_user_id,
+            log_entry.actor_role,
+        )
+        actor = actors.get(actor_key)
+        if actor is None:
+            actor = actors[actor_key] = _json_object(
+                [
+                    ("service_name", log_entry.service_name),
+                    ("client_id", log_entry.client_id),
+                    ("ip_address", log_entry.ip_address),
+                    ("user_id", str(log_entry.actor_user_id or "")),
+                    ("role", log_entry.actor_role),
+                ]
+            )
+
+        target_key = (
+            log_entry.target_profile_id,
+            log_entry.target_user_id,
+            log_entry.target_type,
+        )
+        target = targets.get(target_key)
+        if target is None:
+            target = targets[target_key] = _json_object(
+                [
+                    ("id", str(log_entry.target_profile_id or "")),
+                    ("user_id", str(log_entry.target_user_id or "")),
+                    ("type", log_entry.target_type),
+                ]
+            )
+
+        timestamp = log_entry.timestamp
+        date_time = timestamp.replace(tzinfo=None).isoformat(
+            sep="T", timespec="milliseconds"
+        )
+        yield (
+            '{"audit_event": {"origin": "PROFILE-BE", "status": "SUCCESS", '
+            f'"date_time_epoch": {int(timestamp.timestamp() * 1000)}, '
+            f'"date_time": "{date_time}Z", "actor": {actor}, '
+            f'"operation": {_encode_json_string(log_entry.operation)}, '
+            f'"target": {target}}}}}'
+        )
+
+
+def _put_logs_to_logger(log_entries, logger=None):
+    logger = logger or get_audit_logger()
+    if not logger.isEnabledFor(logging.INFO):
         return
 
-    del request._audit_loggables
+    for message in _serialize_log_entries(log_entries):
+        # Unlike logger.info, doesn't look up the caller for every entry
+        logger.handle(
+            logger.makeRecord(logger.name, logging.INFO, "", 0, message, None, None)
+        )
 
-    current_user = _get_current_user()
-    service = _get_current_service()
-    client_id = _get_current_client_id()
-    ip_address = _get_original_client_ip()
 
-    profiles = [log_data["profile"] for log_data in audit_loggables.values()]
-    for ids in User.objects.filter(profile__in=profiles).values("uuid", "profile__id"):
-        audit_loggables[ids["profile__id"]]["user_uuid"] = ids["uuid"]
+def _put_logs_to_db(log_entries):
+    LogEntry.objects.bulk_create(log_entries)
 
-    log_entries = _create_log_entries(
-        current_user, service, client_id, ip_address, audit_loggables
-    )
+
+def _write_audit_log_records(records):
+    """Writes the records to the enabled outputs.
+
+    The users that weren't known already when the records were created are
+    resolved with a single query, by the user id if a profile was loaded and
+    otherwise by the profile id.
+    """
+    by_user_id = {}
+    by_profile_id = {}
+    for record in records:
+        for profile_id, data in record.audit_loggables.items():
+            if data.get("user_uuid") is not None:
+                continue
+            if "user_id" not in data:
+                by_profile_id.setdefault(profile_id, []).append(data)
+            elif data["user_id"] is not None:
+                by_user_id.setdefault(data["user_id"], []).append(data)
+
+    if by_user_id or by_profile_id:
+        for ids in User.objects.filter(
+            Q(pk__in=by_user_id) | Q(profile__id__in=by_profile_id)
+        ).values("pk", "uuid", "profile__id"):
+            for data in by_user_id.get(ids["pk"], []) + by_profile_id.get(
+                ids["profile__id"], []
+            ):
+                data["user_uuid"] = ids["uuid"]
+
+    log_entries = [
+        log_entry for record in records for log_entry in _create_log_entries(record)
+    ]
 
     if settings.AUDIT_LOG_TO_LOGGER_ENABLED:
         _put_logs_to_logger(log_entries)
 
     if settings.AUDIT_LOG_TO_DB_ENABLED:
         _put_logs_to_db(log_entries)
+
+
+def _commit_audit_logs(context):
+    if not context.loggables:
+        return
+
+    current_user = _get_current_user(context)
+    service = _get_current_service(context)
+    record = _AuditLogRecord(
+        current_user=current_user,
+        service_name=service.name if service else "",
+        client_id=_get_current_client_id(context) or "",
+        ip_address=_get_original_client_ip(context) or "",
+        audit_loggables={
+            profile_id: _detach_profile_loggables(context, data)
+            for profile_id, data in context.loggables.items()
+        },
+        is_system=context.request is None and current_user is None,
+    )
+
+    if settings.AUDIT_LOG_ASYNC_WRITER_ENABLED:
+        get_async_writer().put(record)
+    else:
+        _write_audit_log_records([record])
+
+
+class AsyncAuditLogWriter:
+    """Writes the audit log records in batches in a background thread.
+
+    The records are passed to the thread through a bounded queue. When the queue
+    is full, `put` blocks for at most `enqueue_timeout` seconds, after which the
+    record is dropped. The queue is flushed when the process exits.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_queue_size, batch_size, enqueue_timeout):
+        self.batch_size = batch_size
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="audit-log-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        if self._thread and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+    def flush(self):
+        """Blocks until all the queued records have been written."""
+        self._queue.join()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _update_queue_depth_gauge(self):
+        # Set on every change instead of being read when collected, so that the
+        # value is also available from the other processes in multiprocess mode
+        queue_depth_gauge.set(self.queue_depth())
+
+    def put(self, record):
+        try:
+            self._queue.put(record, timeout=self.enqueue_timeout)
+            self._update_queue_depth_gauge()
+        except queue.Full:
+            entry_count = _count_entries(record)
+            dropped_entries_counter.labels(reason="queue_full").inc(entry_count)
+            logger.error(
+                "Audit log queue is full, dropped %s audit log entries", entry_count
+            )
+
+    def _get_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._get_batch()
+            stopping = batch[-1] is self._STOP
+            records = [record for record in batch if record is not self._STOP]
+
+            try:
+                if records:
+                    _write_audit_log_records(records)
+            except Exception:
+                entry_count = sum(_count_entries(record) for record in records)
+                dropped_entries_counter.labels(reason="write_error").inc(entry_count)
+                logger.exception("Writing %s audit log entries failed", entry_count)
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self._queue.task_done()
+                self._update_queue_depth_gauge()
+
+            if stopping:
+                return
+
+
+def _count_entries(record):
+    return sum(len(data["parts"]) for data in record.audit_loggables.values())
+
+
+_async_writer = None
+_async_writer_lock = threading.Lock()
+
+
+def get_async_writer():
+    global _async_writer
+
+    with _async_writer_lock:
+        if _async_writer is None:
+            _async_writer = AsyncAuditLogWriter(
+                max_queue_size=settings.AUDIT_LOG_ASYNC_QUEUE_SIZE,
+                batch_size=settings.AUDIT_LOG_ASYNC_BATCH_SIZE,
+                enqueue_timeout=settings.AUDIT_LOG_ASYNC_ENQUEUE_TIMEOUT,
+            )
+            _async_writer.start()
+
+    return _async_writer
+
+
+_audit_logger = None
+_audit_logger_lock = threading.Lock()
+
+
+def get_audit_logger():
+    """Returns the logger of the audit log output.
+
+    If enabled, the handlers of the logger are moved behind a queue on first use,
+    so that logging doesn't block on writing.
+    """
+    global _audit_logger
+
+    if _audit_logger is None:
+        with _audit_logger_lock:
+            if _audit_logger is None:
+                audit_logger = logging.getLogger("audit")
+                if settings.AUDIT_LOG_LOGGER_QUEUE_ENABLED:
+                    enqueue_handlers(audit_logger)
+                _audit_logger = audit_logger
+
+    return _audit_logger
@@ -0,0 +1,243 @@
+"""Deleting profiles in bulk, without the profile owners' authorization.
+
+The deletion of every profile proceeds in the same order as in the
+`deleteMyProfile` mutation: first the data is deleted from the connected services
+and from Keycloak, and only after that is the profile itself deleted. The progress
+of every profile is recorded in a `ProfileDeletionCheckpoint`, so an interrupted
+run can be continued by running it again with the same run id.
+
+The HTTP requests are made concurrently in worker threads. The worker threads
+don't access the database; all database changes are made in the calling thread.
+Every batch is audit logged in its own audit context, with the system as the actor.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List
+
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+
+from open_city_profile.exceptions import ConnectedServiceDeletionFailedError
+from services.models import ServiceConnection
+from users.models import User
+
+from .audit_log import audit_context
+from .connected_services import (
+    DeleteGdprDataResult,
+    delete_connected_service_data_as_system,
+)
+from .enums import ProfileDeletionStatus
+from .keycloak_integration import delete_profile_from_keycloak
+from .models import Profile, ProfileDeletionCheckpoint
+
+logger = logging.getLogger(__name__)
+
+KEYCLOAK_USER_DELETION_ERROR = "KEYCLOAK_USER_DELETION_ERROR"
+
+
+@dataclass
+class ProfileDeletionOutcome:
+    profile: Profile
+    results: List[DeleteGdprDataResult] = field(default_factory=list)
+    errors: List[dict] = field(default_factory=list)
+
+
+def _serialize_errors(results):
+    return [
+        {
+            "service": result.service.name,
+            "code": error.code,
+            "message": {message.lang: message.text for message in error.message},
+        }
+        for result in results
+        for error in result.errors
+    ]
+
+
+def _delete_external_data(profile, keycloak_token_exchange, dry_run):
+    """Runs in a worker thread, so must not access the database."""
+    service_connections = [
+        sc
+        for sc in profile.service_connections.all()
+        if not sc.service.is_profile_service
+    ]
+    outcome = ProfileDeletionOutcome(profile=profile)
+    outcome.results = delete_connected_service_data_as_system(
+        service_connections, keycloak_token_exchange, dry_run=dry_run
+    )
+    outcome.errors = _serialize_errors(outcome.results)
+
+    if not dry_run and not outcome.errors:
+        try:
+            delete_profile_from_keycloak(profile)
+        except ConnectedServiceDeletionFailedError as e:
+            logger.error("Deleting profile %s from Keycloak failed: %s", profile.id, e)
+            outcome.errors.append(
+                {
+                    "service": "keycloak",
+                    "code": KEYCLOAK_USER_DELETION_ERROR,
+                    "message": {"en": str(e)},
+                }
+            )
+
+    return outcome
+
+
+def create_checkpoints(run_id, profile_ids):
+    """Adds the profiles to the run. Profiles already in the run are left as is."""
+    ProfileDeletionCheckpoint.objects.bulk_create(
+        [
+            ProfileDeletionCheckpoint(run_id=run_id, profile_id=profile_id)
+            for profile_id in profile_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def retry_failed(run_id):
+    return ProfileDeletionCheckpoint.objects.filter(
+        run_id=run_id, status=ProfileDeletionStatus.FAILED
+    ).update(status=ProfileDeletionStatus.PENDING, updated_at=timezone.now())
+
+
+def _load_profiles(profile_ids):
+    return (
+        Profile.objects.filter(id__in=profile_ids)
+        .select_related("user")
+        .prefetch_related(
+            Prefetch(
+                "service_connections",
+                queryset=ServiceConnection.objects.select_related("service"),
+            )
+        )
+    )
+
+
+def _process_batch(checkpoints, keycloak_token_exchange, dry_run, executor):
+    profiles = {
+        profile.id: profile
+        for profile in _load_profiles([cp.profile_id for cp in checkpoints])
+    }
+    outcomes = {
+        outcome.profile.id: outcome
+        for outcome in executor.map(
+            lambda profile: _delete_external_data(
+                profile, keycloak_token_exchange, dry_run
+            ),
+            profiles.values(),
+        )
+    }
+
+    now = timezone.now()
+    deleted_service_connection_ids = []
+    deleted_profile_ids = []
+    deleted_user_ids = []
+
+    for checkpoint in checkpoints:
+        checkpoint.updated_at = now
+        outcome = outcomes.get(checkpoint.profile_id)
+
+        if outcome is None:
+            # Already deleted by some other means
+            checkpoint.status = ProfileDeletionStatus.DELETED
+            checkpoint.errors = []
+            continue
+
+        checkpoint.errors = outcome.errors
+        if outcome.errors:
+            checkpoint.status = ProfileDeletionStatus.FAILED
+        elif dry_run:
+            checkpoint.status = ProfileDeletionStatus.DRY_RUN_SUCCEEDED
+        else:
+            checkpoint.status = ProfileDeletionStatus.DELETED
+            deleted_profile_ids.append(outcome.profile.id)
+            if outcome.profile.user_id:
+                deleted_user_ids.append(outcome.profile.user_id)
+
+        if not dry_run:
+            successful_services = {
+                result.service.pk
+                for result in outcome.results
+                if result.success and not result.dry_run
+            }
+            deleted_service_connection_ids.extend(
+                sc.pk
+                for sc in outcome.profile.service_connections.all()
+                if sc.service_id in successful_services
+            )
+
+    with transaction.atomic():
+        if deleted_service_connection_ids:
+            ServiceConnection.objects.filter(
+                pk__in=deleted_service_connection_ids
+            ).delete()
+        if deleted_profile_ids:
+            Profile.objects.filter(id__in=deleted_profile_ids).delete()
+        if deleted_user_ids:
+            User.objects.filter(id__in=deleted_user_ids).delete()
+        ProfileDeletionCheckpoint.objects.bulk_update(
+            checkpoints, ["status", "errors", "updated_at"]
+        )
+
+
+def run_bulk_deletion(
+    run_id,
+    keycloak_token_exchange,
+    dry_run=False,
+    workers=4,
+    batch_size=100,
+    progress_callback=None,
+):
+    """Processes the unfinished profiles of the run in batches.
+
+    A dry run processes the pending profiles. A real run also processes the
+    profiles whose dry run has succeeded. Failed profiles are not retried unless
+    they are first reset with `retry_failed`.
+    """
+    statuses = [ProfileDeletionStatus.PENDING]
+    if not dry_run:
+        statuses.append(ProfileDeletionStatus.DRY_RUN_SUCCEEDED)
+
+    remaining = ProfileDeletionCheckpoint.objects.filter(
+        run_id=run_id, status__in=statuses
+    )
+    total = remaining.count()
+    processed = 0
+    last_id = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            checkpoints = list(remaining.filter(id__gt=last_id)[:batch_size])
+            if not checkpoints:
+                break
+            last_id = checkpoints[-1].id
+
+            if keycloak_token_exchange:
+                # A run can outlast the client credentials token
+                keycloak_token_exchange.renew_client_credentials_token()
+
+            with audit_context():
+                _process_batch(checkpoints, keycloak_token_exchange, dry_run, executor)
+
+            processed += len(checkpoints)
+            if progress_callback:
+                progress_callback(processed, total)
+
+    return summarize(run_id)
+
+
+def summarize(run_id):
+    """Returns the number of profiles in the run by status."""
+    counts = dict.fromkeys(ProfileDeletionStatus, 0)
+    rows = (
+        ProfileDeletionCheckpoint.objects.filter(run_id=run_id)
+        .values_list("status")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for status, count in rows:
+        counts[ProfileDeletionStatus(status)] = count
+    return counts
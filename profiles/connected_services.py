@@ -1,11 +1,14 @@
 import logging
+import time
 from dataclasses import dataclass
-from json import JSONDecodeError
 from typing import List
 
+import ijson
 import requests
+from django.conf import settings
 
 from open_city_profile.consts import (
+    MISSING_GDPR_API_TOKEN_ERROR,
     SERVICE_GDPR_API_REQUEST_ERROR,
     SERVICE_GDPR_API_UNKNOWN_ERROR,
 )
@@ -15,12 +18,90 @@ from open_city_profile.exceptions import (
     MissingGDPRApiTokenError,
 )
 from open_city_profile.oidc import KeycloakTokenExchange, TunnistamoTokenExchange
+from services import circuit_breaker
 from services.enums import ServiceIdp
 from services.models import Service
 from utils.auth import BearerAuth
+from utils.instrumentation import (
+    OPERATION_DELETE,
+    OPERATION_DRY_RUN,
+    OPERATION_QUERY,
+    instrumented_request,
+)
 
 logger = logging.getLogger(__name__)
 
+_RESPONSE_CHUNK_SIZE = 64 * 1024
+_LOGGED_BODY_MAX_LENGTH = 1000
+
+
+class ResponseTooLargeError(requests.RequestException):
+    """Response body from a GDPR API exceeds the maximum allowed size."""
+
+
+class _BoundedResponseReader:
+    """File-like object for reading a streamed response body with a size limit.
+
+    Only the beginning of the body is kept for logging purposes.
+    """
+
+    def __init__(self, response, max_size):
+        content_length = response.headers.get("Content-Length", "")
+        if content_length.isdigit() and int(content_length) > max_size:
+            raise ResponseTooLargeError(
+                f"Response size {content_length} exceeds the limit of {max_size} bytes"
+            )
+
+        self._chunks = response.iter_content(chunk_size=_RESPONSE_CHUNK_SIZE)
+        self._max_size = max_size
+        self._buffer = b""
+        self._read_size = 0
+        self._head = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+
+            self._read_size += len(chunk)
+            if self._read_size > self._max_size:
+                raise ResponseTooLargeError(
+                    f"Response size exceeds the limit of {self._max_size} bytes"
+                )
+
+            if len(self._head) <= _LOGGED_BODY_MAX_LENGTH:
+                self._head += chunk[: _LOGGED_BODY_MAX_LENGTH + 1 - len(self._head)]
+            self._buffer += chunk
+
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def body_for_log(self):
+        body = self._head[:_LOGGED_BODY_MAX_LENGTH].decode(errors="replace")
+        if len(self._head) > _LOGGED_BODY_MAX_LENGTH:
+            body += "... (truncated)"
+        return body
+
+
+def _read_json_response(response, log_message, *log_args):
+    """Parse the streamed JSON response body incrementally.
+
+    The body is read at most up to `GDPR_API_MAX_RESPONSE_SIZE` bytes. Raises
+    `ResponseTooLargeError` if the body is too large and `ijson.JSONError` if
+    the body isn't valid JSON.
+    """
+    reader = _BoundedResponseReader(response, settings.GDPR_API_MAX_RESPONSE_SIZE)
+    try:
+        (data,) = ijson.items(reader, "", use_float=True)
+    finally:
+        logger.debug(log_message, *log_args, reader.body_for_log())
+
+    return data
+
 
 def _check_service_gdpr_query_configuration(service_connections):
     for service_connection in service_connections:
@@ -45,6 +126,24 @@ def _check_service_gdpr_query_configuration(service_connections):
             )
 
 
+def _check_service_gdpr_api_availability(service_connections):
+    for service_connection in service_connections:
+        service = service_connection.service
+
+        if not circuit_breaker.allow_request(service):
+            raise ConnectedServiceDataQueryFailedError(
+                f"Connected service: {service.name} is temporarily unavailable."
+            )
+
+
+def _record_gdpr_api_outcome(service, started_at, response):
+    latency = time.monotonic() - started_at
+    if response is None or response.status_code >= 500:
+        circuit_breaker.record_failure(service, latency)
+    else:
+        circuit_breaker.record_success(service, latency)
+
+
 def _any_tunnistamo_connected_services(service_connections):
     return any([not sc.service.is_pure_keycloak for sc in service_connections])
 
@@ -53,13 +152,43 @@ def _any_pure_keycloak_connected_services(service_connections):
     return any([sc.service.is_pure_keycloak for sc in service_connections])
 
 
+def _get_tunnistamo_api_token(service, scope, api_tokens):
+    if service.is_pure_keycloak:
+        return ""
+    api_identifier = scope.rsplit(".", 1)[0]
+    return api_tokens.get(api_identifier, "")
+
+
+def _needs_keycloak_api_token(service, scope, api_tokens):
+    return bool(
+        not _get_tunnistamo_api_token(service, scope, api_tokens)
+        and service.idp
+        and ServiceIdp.KEYCLOAK in service.idp
+    )
+
+
+def _prefetch_keycloak_api_tokens(
+    service_connections, scope_field, api_tokens, keycloak_token_exchange
+):
+    """Fetches concurrently the Keycloak API tokens that `_get_api_token` needs."""
+    if not keycloak_token_exchange:
+        return
+
+    keycloak_token_exchange.prefetch_api_tokens(
+        [
+            (sc.service.gdpr_audience, getattr(sc.service, scope_field))
+            for sc in service_connections
+            if _needs_keycloak_api_token(
+                sc.service, getattr(sc.service, scope_field), api_tokens
+            )
+        ]
+    )
+
+
 def _get_api_token(service, scope, api_tokens, keycloak_token_exchange):
-    api_token = ""
-    if not service.is_pure_keycloak:
-        api_identifier = scope.rsplit(".", 1)[0]
-        api_token = api_tokens.get(api_identifier, "")
+    api_token = _get_tunnistamo_api_token(service, scope, api_tokens)
 
-    if not api_token and service.idp and ServiceIdp.KEYCLOAK in service.idp:
+    if _needs_keycloak_api_token(service, scope, api_tokens):
         logger.debug("Fetch Keycloak API Token for service %s", service.name)
         api_token = keycloak_token_exchange.fetch_api_token(
             service.gdpr_audience, scope
@@ -78,6 +207,7 @@ def download_connected_service_data(
         return []
 
     _check_service_gdpr_query_configuration(service_connections)
+    _check_service_gdpr_api_availability(service_connections)
 
     logger.debug("Downloading connected service data for profile %s", profile.id)
 
@@ -92,6 +222,12 @@ def download_connected_service_data(
         logger.debug("Pure Keycloak services exist. Fetch Keycloak access token.")
         keycloak_token_exchange = KeycloakTokenExchange()
         keycloak_token_exchange.fetch_access_token(authorization_code_keycloak)
+        _prefetch_keycloak_api_tokens(
+            service_connections,
+            "gdpr_query_scope",
+            api_tokens,
+            keycloak_token_exchange,
+        )
 
     external_data = []
 
@@ -112,25 +248,39 @@ def download_connected_service_data(
                 f"Couldn't fetch an API token for service {service.name}."
             )
 
+        started_at = time.monotonic()
+        response = None
         try:
             url = service_connection.get_gdpr_url()
             logger.debug("GDPR URL: %s", url)
-            response = requests.get(url, auth=BearerAuth(api_token), timeout=5)
+            response = instrumented_request(
+                service.name,
+                OPERATION_QUERY,
+                requests.get,
+                url,
+                auth=BearerAuth(api_token),
+                timeout=5,
+                stream=True,
+            )
             logger.debug(
-                "GDPR query response for profile %s to service %s status code: %s, headers: %s, body: %s",  # noqa: E501
+                "GDPR query response for profile %s to service %s status code: %s, headers: %s",  # noqa: E501
                 profile.id,
                 service.name,
                 response.status_code,
                 response.headers,
-                response.text,
             )
             response.raise_for_status()
 
             if response.status_code == 200:
-                service_connection_data = response.json()
+                service_connection_data = _read_json_response(
+                    response,
+                    "GDPR query response body for profile %s from service %s: %s",
+                    profile.id,
+                    service.name,
+                )
             else:
                 service_connection_data = {}
-        except requests.RequestException as e:
+        except (requests.RequestException, ijson.JSONError) as e:
             logger.error(
                 "Invalid GDPR query response for profile %s from service %s. Exception: %s.",  # noqa: E501
                 profile.id,
@@ -140,6 +290,10 @@ def download_connected_service_data(
             raise ConnectedServiceDataQueryFailedError(
                 f"Invalid response from service {service.name}"
             )
+        finally:
+            if response is not None:
+                response.close()
+            _record_gdpr_api_outcome(service, started_at, response)
 
         if service_connection_data:
             external_data.append(service_connection_data)
@@ -213,57 +367,9 @@ def _add_error_to_result(result, code, message):
     return result
 
 
-def _delete_service_data(
-    service_connection, api_token: str, dry_run=False
-) -> DeleteGdprDataResult:
-    """Delete service specific GDPR data by profile.
-
-    API token needs to be for a user that can access information for the related
-    profile on the related GDPR API.
-
-    Dry run parameter can be used for asking the service if delete is possible.
-
-    The errors content from the service is returned if the service provides a JSON
-    response with an "errors" key containing valid error content.
-    """
+def _result_from_delete_response(result, response, service_connection):
     service = service_connection.service
-
-    result = DeleteGdprDataResult(
-        service=service, dry_run=dry_run, success=False, errors=[]
-    )
-
-    url = service_connection.get_gdpr_url()
-
-    data = {}
-    if dry_run:
-        data["dry_run"] = "true"
-
-    try:
-        response = requests.delete(
-            url, auth=BearerAuth(api_token), timeout=5, params=data
-        )
-        logger.debug(
-            "GDPR delete (dry run: %s) response for profile %s to service %s status code: %s, headers: %s, body: %s",  # noqa: E501
-            dry_run,
-            service_connection.profile.id,
-            service.name,
-            response.status_code,
-            response.headers,
-            response.text,
-        )
-    except requests.RequestException as e:
-        logger.error(
-            "GDPR delete request (dry run: %s) failed for profile %s to service %s. Exception: %s.",  # noqa: E501
-            dry_run,
-            service_connection.profile.id,
-            service.name,
-            e,
-        )
-        return _add_error_to_result(
-            result,
-            SERVICE_GDPR_API_REQUEST_ERROR,
-            "Error when making a request to the GDPR URL of the service",
-        )
+    dry_run = result.dry_run
 
     if response.status_code == 204:
         logger.debug(
@@ -277,7 +383,16 @@ def _delete_service_data(
 
     if response.status_code in [403, 500]:
         try:
-            errors_from_the_service = response.json().get("errors")
+            response_data = _read_json_response(
+                response,
+                "GDPR delete response body (dry run: %s) for profile %s from service %s: %s",  # noqa: E501
+                dry_run,
+                service_connection.profile.id,
+                service.name,
+            )
+            errors_from_the_service = (
+                response_data.get("errors") if isinstance(response_data, dict) else None
+            )
             if _validate_gdpr_api_errors(errors_from_the_service):
                 logger.debug(
                     "GDPR delete request (dry run: %s) for profile %s to service %s denied with reasons %s",  # noqa: E501
@@ -293,15 +408,15 @@ def _delete_service_data(
                     "Badly formatted delete response from service %s (profile %s): '%s'",  # noqa: E501
                     service.name,
                     service_connection.profile.id,
-                    response.text,
+                    str(response_data)[:_LOGGED_BODY_MAX_LENGTH],
                 )
-        except JSONDecodeError:
+        except (ijson.JSONError, ResponseTooLargeError) as e:
             logger.debug(
-                "Couldn't parse GDPR delete response (status: %s) from service %s as JSON (profile %s). Body '%s'.",  # noqa: E501
+                "Couldn't parse GDPR delete response (status: %s) from service %s as JSON (profile %s). Exception: %s.",  # noqa: E501
                 response.status_code,
                 service.name,
                 service_connection.profile.id,
-                response.text,
+                e,
             )
     else:
         logger.warning(
@@ -318,6 +433,78 @@ def _delete_service_data(
     )
 
 
+def _delete_service_data(
+    service_connection, api_token: str, dry_run=False
+) -> DeleteGdprDataResult:
+    """Delete service specific GDPR data by profile.
+
+    API token needs to be for a user that can access information for the related
+    profile on the related GDPR API.
+
+    Dry run parameter can be used for asking the service if delete is possible.
+
+    The errors content from the service is returned if the service provides a JSON
+    response with an "errors" key containing valid error content.
+    """
+    service = service_connection.service
+
+    result = DeleteGdprDataResult(
+        service=service, dry_run=dry_run, success=False, errors=[]
+    )
+
+    url = service_connection.get_gdpr_url()
+
+    data = {}
+    if dry_run:
+        data["dry_run"] = "true"
+
+    if not circuit_breaker.allow_request(service):
+        return _add_error_to_result(
+            result,
+            SERVICE_GDPR_API_REQUEST_ERROR,
+            "The GDPR API of the service is temporarily unavailable",
+        )
+
+    started_at = time.monotonic()
+    try:
+        response = instrumented_request(
+            service.name,
+            OPERATION_DRY_RUN if dry_run else OPERATION_DELETE,
+            requests.delete,
+            url,
+            auth=BearerAuth(api_token),
+            timeout=5,
+            params=data,
+            stream=True,
+        )
+        _record_gdpr_api_outcome(service, started_at, response)
+        logger.debug(
+            "GDPR delete (dry run: %s) response for profile %s to service %s status code: %s, headers: %s",  # noqa: E501
+            dry_run,
+            service_connection.profile.id,
+            service.name,
+            response.status_code,
+            response.headers,
+        )
+    except requests.RequestException as e:
+        _record_gdpr_api_outcome(service, started_at, None)
+        logger.error(
+            "GDPR delete request (dry run: %s) failed for profile %s to service %s. Exception: %s.",  # noqa: E501
+            dry_run,
+            service_connection.profile.id,
+            service.name,
+            e,
+        )
+        return _add_error_to_result(
+            result,
+            SERVICE_GDPR_API_REQUEST_ERROR,
+            "Error when making a request to the GDPR URL of the service",
+        )
+
+    with response:
+        return _result_from_delete_response(result, response, service_connection)
+
+
 def _delete_service_connection_and_service_data(
     service_connections, api_tokens, keycloak_token_exchange, dry_run=False
 ):
@@ -407,7 +594,11 @@ def delete_connected_service_data(
         keycloak_token_exchange.fetch_access_token(authorization_code_keycloak)
 
     _check_service_gdpr_delete_configuration(service_connections, api_tokens, profile)
+    _prefetch_keycloak_api_tokens(
+        service_connections, "gdpr_delete_scope", api_tokens, keycloak_token_exchange
+    )
 
+    # The API tokens fetched for the dry run are reused in the actual deletion
     results = _delete_service_connection_and_service_data(
         service_connections, api_tokens, keycloak_token_exchange, dry_run=True
     )
@@ -419,3 +610,76 @@ def delete_connected_service_data(
             service_connections, api_tokens, keycloak_token_exchange, dry_run=False
         )
         return results
+
+
+def _delete_service_data_as_system(
+    service_connection, keycloak_token_exchange, dry_run=False
+) -> DeleteGdprDataResult:
+    service = service_connection.service
+
+    result = DeleteGdprDataResult(
+        service=service, dry_run=dry_run, success=False, errors=[]
+    )
+
+    if not service.gdpr_delete_scope or not service_connection.get_gdpr_url():
+        return _add_error_to_result(
+            result,
+            SERVICE_GDPR_API_REQUEST_ERROR,
+            "The service does not have an API for removing data",
+        )
+
+    try:
+        api_token = _get_api_token(
+            service, service.gdpr_delete_scope, {}, keycloak_token_exchange
+        )
+    except requests.RequestException as e:
+        logger.error(
+            "Fetching Keycloak API Token failed for service %s. Exception: %s.",
+            service.name,
+            e,
+        )
+        api_token = ""
+
+    if not api_token:
+        return _add_error_to_result(
+            result,
+            MISSING_GDPR_API_TOKEN_ERROR,
+            "Couldn't fetch an API token for the service",
+        )
+
+    return _delete_service_data(service_connection, api_token, dry_run=dry_run)
+
+
+def delete_connected_service_data_as_system(
+    service_connections, keycloak_token_exchange, dry_run=False
+) -> List[DeleteGdprDataResult]:
+    """Delete profile's data from the connected services with system credentials.
+
+    Works like `delete_connected_service_data`, but the API tokens are fetched with
+    a `KeycloakTokenExchange` that has been authenticated with the client's own
+    credentials. Only services that accept Keycloak tokens can be handled this
+    way.
+
+    Doesn't access the database, so it can be run in a worker thread. Any
+    problems are reported as errors in the results instead of raising exceptions
+    and the successfully deleted service connections are left for the caller to
+    remove.
+    """
+    _prefetch_keycloak_api_tokens(
+        [sc for sc in service_connections if sc.service.gdpr_delete_scope],
+        "gdpr_delete_scope",
+        {},
+        keycloak_token_exchange,
+    )
+
+    results = [
+        _delete_service_data_as_system(sc, keycloak_token_exchange, dry_run=True)
+        for sc in service_connections
+    ]
+    if dry_run or any([len(r.errors) for r in results]):
+        return results
+
+    return [
+        _delete_service_data_as_system(sc, keycloak_token_exchange, dry_run=False)
+        for sc in service_connections
+    ]
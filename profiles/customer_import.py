@@ -0,0 +1,389 @@
+"""Importing the customers of a service as profiles, in bulk.
+
+The customer data is validated in full before anything is written, so an import
+with invalid data fails before any profiles have been created. The profiles and
+their related data are built in memory one batch at a time and inserted with one
+query per model. The audit log receivers aren't triggered by bulk inserts, so the
+created instances are audit logged explicitly.
+
+Imports uploaded in the admin are run in a background thread of the worker
+process that received the upload. The progress of such an import is stored in a
+`CustomerImportJob`. If the process exits during the import, the job isn't
+updated anymore, and it's marked as failed once it has been stale for
+`STALE_IMPORT_JOB_TIMEOUT`.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from contextlib import suppress
+from datetime import timedelta
+from itertools import islice
+
+import ijson
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from services.models import ServiceConnection
+
+from .audit_log import audit_context, log
+from .enums import AddressType, CustomerImportStatus, EmailType, PhoneType
+from .models import (
+    Address,
+    CustomerImportJob,
+    Email,
+    Phone,
+    Profile,
+    SensitiveData,
+)
+from .validators import validate_finnish_postal_code
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+STALE_IMPORT_JOB_TIMEOUT = timedelta(minutes=10)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _error_message(index, customer_id=None):
+    if customer_id is not None:
+        return "Could not import customer_id: {}, index: {}".format(customer_id, index)
+    return "Could not import unknown customer, index: {}".format(index)
+
+
+class InvalidCustomerDataError(Exception):
+    """The customer data didn't pass the validation.
+
+    `errors` is the validation report of all the invalid customers, as returned by
+    `validate_customers`. The message identifies the first invalid customer.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(_error_message(errors[0]["index"], errors[0]["customer_id"]))
+
+
+def _validate_value(errors, key, field, value, extra_validators=()):
+    try:
+        field.clean(value, None)
+        for validator in extra_validators:
+            validator(value)
+    except ValidationError as e:
+        errors.setdefault(key, []).extend(e.messages)
+
+
+def _validate_customer(item):
+    """Validates the values the same way as they would be validated when saving
+    the created instances. Values that aren't imported aren't validated."""
+    if not isinstance(item, dict):
+        return {NON_FIELD_ERRORS: [_("Must be an object")]}
+
+    errors = {}
+    if "customer_id" not in item:
+        errors["customer_id"] = [_("This field is required.")]
+
+    for name in ("first_name", "last_name"):
+        if item.get(name) is not None:
+            _validate_value(errors, name, Profile._meta.get_field(name), item[name])
+
+    if item.get("ssn"):
+        _validate_value(
+            errors, "ssn", SensitiveData._meta.get_field("ssn"), item["ssn"]
+        )
+    if item.get("email"):
+        _validate_value(errors, "email", Email._meta.get_field("email"), item["email"])
+
+    address = item.get("address")
+    if address:
+        if isinstance(address, dict):
+            for name in ("address", "postal_code", "city"):
+                if address.get(name) is not None:
+                    _validate_value(
+                        errors,
+                        f"address.{name}",
+                        Address._meta.get_field(name),
+                        address[name],
+                        # The addresses are imported as Finnish addresses
+                        [validate_finnish_postal_code]
+                        if name == "postal_code" and address[name]
+                        else (),
+                    )
+        else:
+            errors["address"] = [_("Must be an object")]
+
+    phones = item.get("phones", ())
+    if isinstance(phones, (list, tuple)):
+        for phone in phones:
+            _validate_value(errors, "phones", Phone._meta.get_field("phone"), phone)
+    else:
+        errors["phones"] = [_("Must be a list")]
+
+    return errors
+
+
+def validate_customers(customers):
+    """Validates the customer data in a single pass, without writing anything.
+
+    Returns a list of the invalid customers, each with the index of the customer
+    in the data, its customer_id and the error messages by field. The list is
+    empty if all the customers are valid.
+    """
+    report = []
+    for index, item in enumerate(customers):
+        errors = _validate_customer(item)
+        if errors:
+            report.append(
+                {
+                    "index": index,
+                    "customer_id": item.get("customer_id")
+                    if isinstance(item, dict)
+                    else None,
+                    "errors": errors,
+                }
+            )
+    return report
+
+
+def _build_customer(item, service):
+    profile = Profile(
+        first_name=item.get("first_name", ""),
+        last_name=item.get("last_name", ""),
+    )
+    # Assigned after the initialization, as an instance initialized with a pk
+    # would be audit logged as read
+    profile.id = uuid.uuid4()
+    instances = [profile]
+
+    ssn = item.get("ssn")
+    if ssn:
+        instances.append(SensitiveData(ssn=ssn, profile=profile))
+    email = item.get("email", None)
+    if email:
+        instances.append(
+            Email(
+                profile=profile,
+                email=email,
+                email_type=EmailType.PERSONAL,
+                primary=True,
+            )
+        )
+    address = item.get("address", None)
+    if address:
+        instances.append(
+            Address(
+                profile=profile,
+                address=address.get("address", ""),
+                postal_code=address.get("postal_code", ""),
+                city=address.get("city", ""),
+                country_code="fi",
+                address_type=AddressType.HOME,
+                primary=True,
+            )
+        )
+    phones = item.get("phones", ())
+    for index, phone in enumerate(phones):
+        instances.append(
+            Phone(
+                profile=profile,
+                phone=phone,
+                phone_type=PhoneType.MOBILE,
+                primary=index == 0,
+            )
+        )
+    if service:
+        instances.append(
+            ServiceConnection(profile=profile, service=service, enabled=False)
+        )
+
+    return item["customer_id"], instances
+
+
+def create_customers(indexed_items, service):
+    """Creates the profiles of a batch of customers.
+
+    The batch is given as (index, customer data) pairs, the index being the
+    position of the customer in the whole import. The customers are expected to
+    have been validated with `validate_customers`. Returns a dict where the key is
+    the customer_id and the value is the UUID of the created profile. Must be
+    called in a transaction.
+    """
+    result = {}
+    instances_by_model = {
+        model: []
+        for model in (Profile, SensitiveData, Email, Address, Phone, ServiceConnection)
+    }
+
+    for index, item in indexed_items:
+        try:
+            customer_id, instances = _build_customer(item, service)
+        except Exception as err:
+            customer_id = item.get("customer_id") if isinstance(item, dict) else None
+            raise Exception(_error_message(index, customer_id)) from err
+
+        result[customer_id] = instances[0].pk
+        for instance in instances:
+            instances_by_model[type(instance)].append(instance)
+
+    try:
+        for model, instances in instances_by_model.items():
+            model.objects.bulk_create(instances)
+    except Exception as err:
+        raise Exception(
+            "Could not import customers, indexes: {}-{}".format(
+                indexed_items[0][0], indexed_items[-1][0]
+            )
+        ) from err
+
+    for instances in instances_by_model.values():
+        for instance in instances:
+            log("CREATE", instance)
+
+    return result
+
+
+def import_customers(customers, service, batch_size=BATCH_SIZE, user=None):
+    """Imports the customers in batches, committing every batch separately.
+
+    The customers are expected to have been validated with `validate_customers`.
+    Yields the customer_id to profile UUID mapping of every batch after it has
+    been committed, so the customers imported before a failing batch stay
+    imported. Every batch is audit logged in its own audit context, with the user
+    as the actor, or the system if no user is given.
+    """
+    for batch in batched(enumerate(customers), batch_size):
+        with transaction.atomic(), audit_context(user=user):
+            result = create_customers(batch, service)
+        yield result
+
+
+def read_customers(file):
+    """Parses the customers from a file containing a JSON list one at a time."""
+    return ijson.items(file, "item", use_float=True)
+
+
+def _update_job(job_id, **fields):
+    CustomerImportJob.objects.filter(pk=job_id).update(
+        updated_at=timezone.now(), **fields
+    )
+
+
+def _with_heartbeat(job_id, items, interval=BATCH_SIZE):
+    """Updates the job after every `interval` items, so it isn't seen as stale."""
+    for index, item in enumerate(items, 1):
+        if index % interval == 0:
+            _update_job(job_id)
+        yield item
+
+
+def run_import_job(job_id, path, batch_size=BATCH_SIZE):
+    """Imports the customers from the file and records the progress in the job.
+
+    The whole file is validated first, and nothing is imported if any of the
+    customers is invalid. The file is removed afterwards.
+    """
+    result = {}
+    try:
+        job = CustomerImportJob.objects.select_related("service", "created_by").get(
+            pk=job_id
+        )
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            errors = validate_customers(_with_heartbeat(job_id, read_customers(f)))
+            if errors:
+                raise InvalidCustomerDataError(errors)
+
+            f.seek(0)
+            for batch_result in import_customers(
+                read_customers(f), job.service, batch_size, user=job.created_by
+            ):
+                result.update(
+                    (customer_id, str(profile_id))
+                    for customer_id, profile_id in batch_result.items()
+                )
+                _update_job(
+                    job_id,
+                    imported_count=len(result),
+                    progress=min(99, f.tell() * 100 // max(size, 1)),
+                )
+    except InvalidCustomerDataError as e:
+        _update_job(
+            job_id,
+            status=CustomerImportStatus.FAILED,
+            error=f"Invalid data in {len(e.errors)} customers, nothing was imported",
+            validation_errors=e.errors,
+        )
+    except Exception as e:
+        logger.exception("Customer import %s failed", job_id)
+        error = f"{e}: {e.__cause__}" if e.__cause__ else str(e)
+        _update_job(
+            job_id,
+            status=CustomerImportStatus.FAILED,
+            imported_count=len(result),
+            error=error,
+            result=result,
+        )
+    else:
+        _update_job(
+            job_id,
+            status=CustomerImportStatus.SUCCEEDED,
+            imported_count=len(result),
+            progress=100,
+            result=result,
+        )
+    finally:
+        # Already removed if the job was seen as stale
+        with suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def fail_stale_import_jobs():
+    """Marks the running jobs that haven't been updated within
+    `STALE_IMPORT_JOB_TIMEOUT` as failed, and removes their files."""
+    stale_jobs = CustomerImportJob.objects.filter(
+        status=CustomerImportStatus.RUNNING,
+        updated_at__lt=timezone.now() - STALE_IMPORT_JOB_TIMEOUT,
+    )
+    for job in stale_jobs:
+        logger.error("Customer import %s was interrupted", job.pk)
+        _update_job(
+            job.pk,
+            status=CustomerImportStatus.FAILED,
+            error=(
+                "The import was interrupted. The customers imported before the "
+                "interruption stay imported, but their profile ids are unknown."
+            ),
+        )
+        if job.file_path:
+            with suppress(FileNotFoundError):
+                os.remove(job.file_path)
+
+
+def _run_import_job_in_thread(job_id, path):
+    try:
+        run_import_job(job_id, path)
+    finally:
+        connection.close()
+
+
+def start_import_job(job_id, path):
+    """Runs the import job in a background thread.
+
+    The thread doesn't outlive the process, so if the process exits during the
+    import, the job is never finished. It's failed by `fail_stale_import_jobs`
+    later.
+    """
+    threading.Thread(
+        target=_run_import_job_in_thread,
+        args=(job_id, path),
+        name=f"customer-import-{job_id}",
+        daemon=True,
+    ).start()
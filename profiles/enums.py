@@ -52,3 +52,27 @@ class LoginMethodType(Enum):
         PASSWORD = _("Password")
         OTP = _("One-time password")
         SUOMI_FI = _("Suomi.fi")
+
+
+class ProfileDeletionStatus(Enum):
+    PENDING = "pending"
+    DRY_RUN_SUCCEEDED = "dry_run_succeeded"
+    DELETED = "deleted"
+    FAILED = "failed"
+
+    class Labels:
+        PENDING = _("Pending")
+        DRY_RUN_SUCCEEDED = _("Dry run succeeded")
+        DELETED = _("Deleted")
+        FAILED = _("Failed")
+
+
+class CustomerImportStatus(Enum):
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    class Labels:
+        RUNNING = _("Running")
+        SUCCEEDED = _("Succeeded")
+        FAILED = _("Failed")
@@ -1,27 +1,52 @@
+from django.apps import apps
 from django.db.models.signals import post_delete, post_init, post_save, pre_delete
-from django.dispatch import receiver
 
 from .audit_log import log, register_loggable
 
 
-@receiver(pre_delete)
 def pre_delete_audit_log(sender, instance, **kwargs):
     register_loggable(instance)
 
 
-@receiver(post_delete)
 def post_delete_audit_log(sender, instance, **kwargs):
     log("DELETE", instance)
 
 
-@receiver(post_init)
 def post_init_audit_log(sender, instance, **kwargs):
     log("READ", instance)
 
 
-@receiver(post_save)
 def post_save_audit_log(sender, instance, created, **kwargs):
     if created:
         log("CREATE", instance)
     else:
         log("UPDATE", instance)
+
+
+RECEIVERS = [
+    (pre_delete, pre_delete_audit_log),
+    (post_delete, post_delete_audit_log),
+    (post_init, post_init_audit_log),
+    (post_save, post_save_audit_log),
+]
+
+
+def audited_models():
+    return [model for model in apps.get_models() if getattr(model, "audit_log", False)]
+
+
+def connect_audit_log_receivers():
+    """Connects the audit log receivers to the models that have `audit_log = True`.
+
+    The receivers are connected per model so that instances of other models don't
+    go through them at all. Must be called after all the models have been loaded.
+    """
+    for model in audited_models():
+        for signal, receiver in RECEIVERS:
+            signal.connect(receiver, sender=model)
+
+
+def disconnect_audit_log_receivers():
+    for model in audited_models():
+        for signal, receiver in RECEIVERS:
+            signal.disconnect(receiver, sender=model)
@@ -0,0 +1,96 @@
+import json
+import logging
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from audit_log.models import LogEntry
+from open_city_profile.logging import enqueue_handlers
+from profiles.audit_log import _put_logs_to_logger, log_entry_message
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the time a request spends writing its audit log entries to the "
+        "logger output: with json.dumps and a file handler, and with the pre-built "
+        "serializer and the queued file handler. The entries are written to a "
+        "temporary file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=60)
+        parser.add_argument("--requests", type=int, default=1000)
+
+    @staticmethod
+    def _log_entries(count):
+        actor_user_id = uuid.uuid4()
+        profile_ids = [uuid.uuid4() for _ in range(count // 10 + 1)]
+        return [
+            LogEntry(
+                timestamp=datetime.now(tz=timezone.utc),
+                service_name="benchmark",
+                client_id="benchmark-client",
+                ip_address="12.23.34.45",
+                actor_user_id=actor_user_id,
+                actor_role="ADMIN",
+                target_user_id=profile_ids[index % len(profile_ids)],
+                target_profile_id=profile_ids[index % len(profile_ids)],
+                target_type="email",
+                operation="READ",
+            )
+            for index in range(count)
+        ]
+
+    @staticmethod
+    def _logger(name, path):
+        logger = logging.getLogger(f"benchmark_audit_log_to_logger.{name}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.handlers = [logging.FileHandler(path)]
+        return logger
+
+    @staticmethod
+    def _measure(requests, write_request):
+        timings = []
+        for _ in range(requests):
+            started_at = time.perf_counter()
+            write_request()
+            timings.append(time.perf_counter() - started_at)
+        timings.sort()
+        return timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+
+    def handle(self, *args, **options):
+        log_entries = self._log_entries(options["entries"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            logger = self._logger("direct", Path(directory) / "direct.log")
+
+            def write_directly():
+                for log_entry in log_entries:
+                    logger.info(json.dumps(log_entry_message(log_entry)))
+
+            direct = self._measure(options["requests"], write_directly)
+
+            queued_logger = self._logger("queued", Path(directory) / "queued.log")
+            listener = enqueue_handlers(queued_logger)
+
+            try:
+                queued = self._measure(
+                    options["requests"],
+                    lambda: _put_logs_to_logger(log_entries, queued_logger),
+                )
+            finally:
+                listener.stop()
+
+        self.stdout.write(f"Entries per request: {options['entries']}")
+        for title, (median, p99) in [
+            ("json.dumps, file handler", direct),
+            ("Serializer, queued file handler", queued),
+        ]:
+            self.stdout.write(
+                f"{title}: median {median * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms"
+            )
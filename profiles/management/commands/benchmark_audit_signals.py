@@ -0,0 +1,90 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from profiles import log_signals
+from profiles.models import Email, Profile
+from services.models import Service, ServiceConnection
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the time spent in a large profile query with the audit log signal "
+        "receivers connected to the audited models only, and connected to all "
+        "models. The test data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    @staticmethod
+    def _create_data(count):
+        service = Service.objects.create(name=f"benchmark-{uuid.uuid4()}")
+        users = User.objects.bulk_create(
+            [
+                User(uuid=uuid.uuid4(), username=f"benchmark-{uuid.uuid4()}")
+                for _ in range(count)
+            ]
+        )
+        profiles = Profile.objects.bulk_create(
+            [
+                Profile(
+                    id=uuid.uuid4(), user=user, first_name="Bench", last_name="Mark"
+                )
+                for user in users
+            ]
+        )
+        Email.objects.bulk_create(
+            [
+                Email(profile=profile, email=f"{profile.pk}@example.com", primary=True)
+                for profile in profiles
+            ]
+        )
+        ServiceConnection.objects.bulk_create(
+            [
+                ServiceConnection(profile=profile, service=service)
+                for profile in profiles
+            ]
+        )
+
+    @staticmethod
+    def _query():
+        return list(
+            Profile.objects.select_related("user").prefetch_related(
+                "emails", "service_connections__service__translations"
+            )
+        )
+
+    def _measure(self, repeat):
+        timings = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            self._query()
+            timings.append(time.perf_counter() - started_at)
+        return min(timings)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._create_data(options["profiles"])
+
+            scoped = self._measure(options["repeat"])
+
+            log_signals.disconnect_audit_log_receivers()
+            for signal, receiver in log_signals.RECEIVERS:
+                signal.connect(receiver)
+            try:
+                unscoped = self._measure(options["repeat"])
+            finally:
+                for signal, receiver in log_signals.RECEIVERS:
+                    signal.disconnect(receiver)
+                log_signals.connect_audit_log_receivers()
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Receivers connected to all models: {unscoped:.3f} s")
+        self.stdout.write(f"Receivers connected to audited models: {scoped:.3f} s")
+        self.stdout.write(f"Saving: {(1 - scoped / unscoped) * 100:.1f} %")
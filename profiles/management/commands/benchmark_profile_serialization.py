@@ -0,0 +1,114 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from profiles.models import (
+    Address,
+    Email,
+    Phone,
+    Profile,
+    SensitiveData,
+    VerifiedPersonalInformation,
+    VerifiedPersonalInformationPermanentAddress,
+    VerifiedPersonalInformationPermanentForeignAddress,
+    VerifiedPersonalInformationTemporaryAddress,
+)
+from services.models import Service, ServiceConnection
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the time spent serializing a fully populated profile for the "
+        "profile data download, and reports the number of database queries made "
+        "by one serialization. The first serialization, which also decrypts the "
+        "encrypted values, is not measured. The test data is created in a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--contacts", type=int, default=3)
+        parser.add_argument("--services", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=1000)
+
+    @staticmethod
+    def _create_profile(contacts, services):
+        profile = Profile.objects.create(
+            first_name="Bench", last_name="Mark", nickname="Benchy"
+        )
+        for index in range(contacts):
+            primary = index == 0
+            Email.objects.create(
+                profile=profile, email=f"bench{index}@example.com", primary=primary
+            )
+            Phone.objects.create(
+                profile=profile, phone=f"+35840000{index:04}", primary=primary
+            )
+            Address.objects.create(
+                profile=profile,
+                address=f"Mannerheimintie {index}",
+                postal_code="00100",
+                city="Helsinki",
+                country_code="FI",
+                primary=primary,
+            )
+        SensitiveData.objects.create(profile=profile, ssn="010190-123A")
+
+        vpi = VerifiedPersonalInformation.objects.create(
+            profile=profile,
+            first_name="Bench",
+            last_name="Mark",
+            given_name="Bench",
+            national_identification_number="010190-123A",
+            municipality_of_residence="Helsinki",
+            municipality_of_residence_number="091",
+        )
+        for address_model in (
+            VerifiedPersonalInformationPermanentAddress,
+            VerifiedPersonalInformationTemporaryAddress,
+        ):
+            address_model.objects.create(
+                verified_personal_information=vpi,
+                street_address="Mannerheimintie 1",
+                postal_code="00100",
+                post_office="Helsinki",
+            )
+        VerifiedPersonalInformationPermanentForeignAddress.objects.create(
+            verified_personal_information=vpi,
+            street_address="Drottninggatan 1",
+            additional_address="Stockholm",
+            country_code="SE",
+        )
+
+        for _ in range(services):
+            service = Service.objects.create(name=f"benchmark-{uuid.uuid4()}")
+            ServiceConnection.objects.create(profile=profile, service=service)
+
+        return profile
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            profile_id = self._create_profile(
+                options["contacts"], options["services"]
+            ).pk
+            profile = Profile.objects.for_serialization().get(pk=profile_id)
+
+            with CaptureQueriesContext(connection) as queries:
+                profile.serialize()
+
+            timings = []
+            for _ in range(options["repeat"]):
+                started_at = time.perf_counter()
+                profile.serialize()
+                timings.append(time.perf_counter() - started_at)
+
+            transaction.set_rollback(True)
+
+        timings.sort()
+        median = timings[len(timings) // 2]
+        self.stdout.write(
+            f"Serializing a profile: median {median * 1000:.3f} ms, "
+            f"{len(queries)} queries"
+        )
@@ -0,0 +1,121 @@
+import sys
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from open_city_profile.oidc import KeycloakTokenExchange
+from profiles.bulk_deletion import (
+    create_checkpoints,
+    retry_failed,
+    run_bulk_deletion,
+)
+from profiles.models import Profile
+from services.enums import ServiceIdp
+from services.models import Service
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes profiles and their data in the connected services using the "
+        "service's own credentials. Progress is recorded per run, so an "
+        "interrupted run can be continued by giving the same --run-id again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("profile_ids", nargs="*", help="Ids of the profiles")
+        parser.add_argument(
+            "--file",
+            help='File containing one profile id per line, or "-" for stdin',
+        )
+        parser.add_argument(
+            "--last-login-before",
+            help="Select the profiles whose user hasn't logged in since DATE "
+            "(YYYY-MM-DD)",
+            metavar="DATE",
+        )
+        parser.add_argument("--run-id", help="Id of the run to create or to continue")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only ask the connected services whether the deletion is possible",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Process again the profiles that failed earlier in the run",
+        )
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def _read_profile_ids(self, options):
+        profile_ids = list(options["profile_ids"])
+
+        if options["file"]:
+            if options["file"] == "-":
+                profile_ids.extend(sys.stdin.read().split())
+            else:
+                with open(options["file"]) as f:
+                    profile_ids.extend(f.read().split())
+
+        try:
+            profile_ids = [uuid.UUID(profile_id) for profile_id in profile_ids]
+        except ValueError as e:
+            raise CommandError(f"Invalid profile id: {e}")
+
+        if options["last_login_before"]:
+            try:
+                date = parse_date(options["last_login_before"])
+            except ValueError:
+                date = None
+            if not date:
+                raise CommandError("Invalid date given for --last-login-before")
+            profile_ids.extend(
+                Profile.objects.filter(user__last_login__date__lt=date).values_list(
+                    "id", flat=True
+                )
+            )
+
+        return profile_ids
+
+    @staticmethod
+    def _keycloak_token_exchange():
+        keycloak_services = Service.objects.filter(idp__contains=[ServiceIdp.KEYCLOAK])
+        if not keycloak_services.exists():
+            return None
+
+        # The client credentials token is fetched and renewed by the bulk deletion
+        return KeycloakTokenExchange()
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--workers and --batch-size must be positive")
+
+        profile_ids = self._read_profile_ids(options)
+
+        run_id = options["run_id"]
+        if not run_id:
+            if not profile_ids:
+                raise CommandError("No profiles given")
+            run_id = uuid.uuid4().hex
+
+        create_checkpoints(run_id, profile_ids)
+        if options["retry_failed"]:
+            retry_failed(run_id)
+
+        self.stdout.write(f"Run id: {run_id}")
+
+        def report_progress(processed, total):
+            self.stdout.write(f"Processed {processed}/{total} profiles")
+
+        summary = run_bulk_deletion(
+            run_id,
+            self._keycloak_token_exchange(),
+            dry_run=options["dry_run"],
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            progress_callback=report_progress,
+        )
+
+        for status, count in summary.items():
+            self.stdout.write(f"{status.label}: {count}")
@@ -0,0 +1,199 @@
+import enum
+import json
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles.audit_log import audit_context
+from profiles.models import Profile, VerifiedPersonalInformation
+from services.models import Service
+
+PROFILE_FIELDS = ("first_name", "last_name", "nickname", "language")
+CONTACT_FIELDS = {
+    "emails": ("email", "email_type", "primary", "verified"),
+    "phones": ("phone", "phone_type", "primary"),
+    "addresses": (
+        "address",
+        "postal_code",
+        "city",
+        "country_code",
+        "address_type",
+        "primary",
+    ),
+}
+VERIFIED_PERSONAL_INFORMATION_FIELDS = (
+    "first_name",
+    "last_name",
+    "given_name",
+    "national_identification_number",
+    "municipality_of_residence",
+    "municipality_of_residence_number",
+)
+VERIFIED_PERSONAL_INFORMATION_ADDRESS_FIELDS = {
+    "permanent_address": ("street_address", "postal_code", "post_office"),
+    "temporary_address": ("street_address", "postal_code", "post_office"),
+    "permanent_foreign_address": (
+        "street_address",
+        "additional_address",
+        "country_code",
+    ),
+}
+
+
+def _allowed_fields(model, allowed_data_fields):
+    return set(model.always_allow_fields).union(
+        *(
+            model.allowed_data_fields_map.get(allowed_data_field, ())
+            for allowed_data_field in allowed_data_fields
+        )
+    )
+
+
+def _value(value):
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
+
+
+def _fields(obj, names):
+    return {name: _value(getattr(obj, name)) for name in names}
+
+
+def _related(obj, name):
+    # A missing one-to-one related object raises an AttributeError
+    return getattr(obj, name, None)
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports every profile connected to a service as JSON Lines, one profile "
+        "per line, restricted to the allowed data fields of the service. The "
+        "profile ids are read with a server-side cursor and the profiles are "
+        "loaded and decrypted in batches, so the memory use doesn't depend on the "
+        "number of profiles. Every batch is audit logged with the service."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("service", help="Name of the service")
+        parser.add_argument("output", help='Path of the output file, or "-" for stdout')
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of profiles loaded at a time. Default is 500.",
+        )
+        parser.add_argument(
+            "--verified-personal-information",
+            action="store_true",
+            help="Include the allowed verified personal information fields",
+        )
+
+    def _profile_queryset(self):
+        select_related = []
+        if self.export_sensitive_data:
+            select_related.append("sensitivedata")
+        if self.vpi_fields is not None:
+            select_related.append("verified_personal_information")
+            select_related.extend(
+                f"verified_personal_information__{name}" for name in self.vpi_addresses
+            )
+
+        return (
+            Profile.objects.order_by("pk")
+            .select_related(*select_related)
+            .prefetch_related(*self.contacts)
+        )
+
+    def _serialize_verified_personal_information(self, vpi):
+        data = _fields(vpi, self.vpi_fields)
+        for name in self.vpi_addresses:
+            address = _related(vpi, name)
+            data[name] = address and _fields(
+                address, VERIFIED_PERSONAL_INFORMATION_ADDRESS_FIELDS[name]
+            )
+        return data
+
+    def _serialize(self, profile):
+        data = {"id": str(profile.pk), **_fields(profile, self.profile_fields)}
+        for name in self.contacts:
+            data[name] = [
+                _fields(contact, CONTACT_FIELDS[name])
+                for contact in getattr(profile, name).all()
+            ]
+        if self.export_sensitive_data:
+            sensitive_data = _related(profile, "sensitivedata")
+            data["sensitivedata"] = sensitive_data and {"ssn": sensitive_data.ssn}
+        if self.vpi_fields is not None:
+            vpi = _related(profile, "verified_personal_information")
+            data["verified_personal_information"] = (
+                vpi and self._serialize_verified_personal_information(vpi)
+            )
+        return data
+
+    def _select_fields(self, allowed_data_fields, include_vpi):
+        allowed = _allowed_fields(Profile, allowed_data_fields)
+        self.profile_fields = [name for name in PROFILE_FIELDS if name in allowed]
+        self.contacts = [name for name in CONTACT_FIELDS if name in allowed]
+        self.export_sensitive_data = "sensitivedata" in allowed
+
+        self.vpi_fields = None
+        self.vpi_addresses = []
+        if include_vpi:
+            allowed = _allowed_fields(VerifiedPersonalInformation, allowed_data_fields)
+            self.vpi_fields = [
+                name for name in VERIFIED_PERSONAL_INFORMATION_FIELDS if name in allowed
+            ]
+            self.vpi_addresses = [
+                name
+                for name in VERIFIED_PERSONAL_INFORMATION_ADDRESS_FIELDS
+                if name in allowed
+            ]
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        try:
+            service = Service.objects.get(name=options["service"])
+        except Service.DoesNotExist:
+            raise CommandError(f"Service not found: {options['service']}")
+
+        allowed_data_fields = list(
+            service.allowed_data_fields.values_list("field_name", flat=True)
+        )
+        self._select_fields(
+            allowed_data_fields, options["verified_personal_information"]
+        )
+        queryset = self._profile_queryset()
+
+        profile_ids = (
+            Profile.objects.filter(service_connections__service=service)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=options["batch_size"])
+        )
+
+        output = (
+            self.stdout
+            if options["output"] == "-"
+            else open(options["output"], "w", encoding="utf-8")
+        )
+        count = 0
+        try:
+            for batch in _batched(profile_ids, options["batch_size"]):
+                with audit_context(service=service):
+                    for profile in queryset.filter(pk__in=batch):
+                        data = self._serialize(profile)
+                        output.write(json.dumps(data, ensure_ascii=False) + "\n")
+                        count += 1
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        self.stderr.write(f"Exported {count} profiles of {service.name}")
@@ -0,0 +1,104 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from profiles.customer_import import (
+    BATCH_SIZE,
+    import_customers,
+    validate_customers,
+)
+from services.models import Service
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports customers from a JSON file as profiles, in the format accepted "
+        "by the profile admin's JSON upload. All the customers are validated "
+        "first, and nothing is imported if any of them is invalid. Every batch is "
+        "committed separately, so the customers imported before a failing batch "
+        "stay imported. The customer_id to profile id mapping of the imported "
+        "customers is written to the output, also when the import fails."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "file", help='JSON file containing a list of customers, or "-" for stdin'
+        )
+        parser.add_argument(
+            "output", help='Path of the mapping file to write, or "-" for stdout'
+        )
+        parser.add_argument(
+            "--service", help="Name of the service to connect the profiles to"
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--validate-only",
+            action="store_true",
+            help="Only validate the customers, without importing them",
+        )
+
+    def _read_customers(self, path):
+        try:
+            if path == "-":
+                return json.load(sys.stdin)
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError as e:
+            raise CommandError(f"Invalid JSON: {e}")
+
+    def _write_result(self, result, path):
+        data = json.dumps(result, cls=DjangoJSONEncoder)
+        if path == "-":
+            self.stdout.write(data)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        service = None
+        if options["service"]:
+            try:
+                service = Service.objects.get(name=options["service"])
+            except Service.DoesNotExist:
+                raise CommandError(f"Service not found: {options['service']}")
+
+        customers = self._read_customers(options["file"])
+        if not isinstance(customers, list):
+            raise CommandError("The file must contain a list of customers")
+
+        errors = validate_customers(customers)
+        for error in errors:
+            messages = "; ".join(
+                f"{field}: {' '.join(field_messages)}"
+                for field, field_messages in error["errors"].items()
+            )
+            self.stderr.write(
+                f"Index {error['index']}, customer_id {error['customer_id']}: "
+                f"{messages}"
+            )
+        if errors:
+            raise CommandError(
+                f"Invalid data in {len(errors)} customers, nothing was imported"
+            )
+        if options["validate_only"]:
+            self.stderr.write(f"All {len(customers)} customers are valid")
+            return
+
+        result = {}
+        try:
+            for batch_result in import_customers(
+                customers, service, batch_size=options["batch_size"]
+            ):
+                result.update(batch_result)
+                self.stderr.write(f"Imported {len(result)}/{len(customers)} customers")
+        except Exception as e:
+            raise CommandError(
+                f"{e}: {e.__cause__}. Imported {len(result)} customers."
+            ) from e
+        finally:
+            self._write_result(result, options["output"])
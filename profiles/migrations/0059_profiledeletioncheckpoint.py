@@ -0,0 +1,50 @@
+# Generated by Django 4.2.17 on 2026-10-19 09:12
+
+import django.utils.timezone
+import enumfields.fields
+from django.db import migrations, models
+
+import profiles.enums
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0058_alter_profile_first_name_alter_profile_last_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfileDeletionCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("run_id", models.CharField(max_length=64)),
+                ("profile_id", models.UUIDField()),
+                (
+                    "status",
+                    enumfields.fields.EnumField(
+                        db_index=True,
+                        default="pending",
+                        enum=profiles.enums.ProfileDeletionStatus,
+                        max_length=32,
+                    ),
+                ),
+                ("errors", models.JSONField(blank=True, default=list)),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+                "unique_together": {("run_id", "profile_id")},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.17 on 2026-10-19 16:05
+
+from django.db import migrations
+
+import profiles.validators
+import utils.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0059_profiledeletioncheckpoint"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="sensitivedata",
+            name="ssn",
+            field=utils.fields.EncryptedCharField(
+                max_length=11,
+                validators=[
+                    profiles.validators.validate_finnish_national_identification_number
+                ],
+            ),
+        ),
+    ]
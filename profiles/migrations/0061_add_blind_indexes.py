@@ -0,0 +1,79 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:20
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations
+
+import profiles.models
+import utils.fields
+
+BATCH_SIZE = 1000
+
+
+def _blind_index(source_field_name, value):
+    """The hash of BlindIndexField as it was when this migration was written. The
+    field's own code isn't used, so that changes to it don't change what this
+    migration writes."""
+    if not value:
+        return None
+    hashed = f"{source_field_name}:{value}{settings.SALT_BLIND_INDEXES}"
+    return "xx" + hashlib.sha256(hashed.encode()).hexdigest()
+
+
+def _fill_blind_index(model, index_name, source_field_name):
+    batch = []
+    for instance in model.objects.only("pk", source_field_name).iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        setattr(
+            instance,
+            index_name,
+            _blind_index(source_field_name, getattr(instance, source_field_name)),
+        )
+        batch.append(instance)
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_update(batch, [index_name])
+            batch = []
+    model.objects.bulk_update(batch, [index_name])
+
+
+def fill_blind_indexes(apps, schema_editor):
+    _fill_blind_index(
+        apps.get_model("profiles", "VerifiedPersonalInformation"),
+        "municipality_of_residence_number_index",
+        "municipality_of_residence_number",
+    )
+    _fill_blind_index(
+        apps.get_model("profiles", "VerifiedPersonalInformationPermanentAddress"),
+        "postal_code_index",
+        "postal_code",
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0060_alter_sensitivedata_ssn"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="verifiedpersonalinformation",
+            name="municipality_of_residence_number_index",
+            field=utils.fields.BlindIndexField(
+                db_index=True,
+                hash_key=profiles.models.get_blind_index_hash_key,
+                source_field_name="municipality_of_residence_number",
+            ),
+        ),
+        migrations.AddField(
+            model_name="verifiedpersonalinformationpermanentaddress",
+            name="postal_code_index",
+            field=utils.fields.BlindIndexField(
+                db_index=True,
+                hash_key=profiles.models.get_blind_index_hash_key,
+                source_field_name="postal_code",
+            ),
+        ),
+        migrations.RunPython(fill_blind_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.17 on 2026-10-19 19:05
+
+import django.db.models.deletion
+import django.utils.timezone
+import enumfields.fields
+from django.conf import settings
+from django.db import migrations, models
+
+import profiles.enums
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("services", "0027_servicetranslation_privacy_policy_url_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("profiles", "0061_add_blind_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerImportJob",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "status",
+                    enumfields.fields.EnumField(
+                        default="running",
+                        enum=profiles.enums.CustomerImportStatus,
+                        max_length=32,
+                    ),
+                ),
+                ("imported_count", models.PositiveIntegerField(default=0)),
+                ("progress", models.PositiveSmallIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("result", models.JSONField(blank=True, default=dict)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "service",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="services.service",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-19 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0062_customerimportjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customerimportjob",
+            name="validation_errors",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
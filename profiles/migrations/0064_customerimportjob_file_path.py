@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-19 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0063_customerimportjob_validation_errors"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customerimportjob",
+            name="file_path",
+            field=models.CharField(blank=True, max_length=1024),
+        ),
+    ]
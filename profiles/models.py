@@ -5,19 +5,26 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
 from django.utils import timezone
-from encrypted_fields import fields
 from enumfields import EnumField
 
 from services.models import Service, ServiceConnection
 from users.models import User
 from utils.fields import (
+    BlindIndexField,
+    EncryptedCharField,
     NullToEmptyCharField,
     NullToEmptyEncryptedCharField,
     NullToEmptyEncryptedSearchField,
 )
 from utils.models import SerializableMixin, UUIDModel
 
-from .enums import AddressType, EmailType, PhoneType
+from .enums import (
+    AddressType,
+    CustomerImportStatus,
+    EmailType,
+    PhoneType,
+    ProfileDeletionStatus,
+)
 from .validators import (
     validate_finnish_municipality_of_residence_number,
     validate_finnish_national_identification_number,
@@ -69,6 +76,27 @@ class AllowedDataFieldsMixin:
         )
 
 
+class ProfileManager(SerializableMixin.SerializableManager):
+    def for_serialization(self):
+        """Returns a queryset that loads all the data of the profiles needed by
+        serialize() with a fixed number of queries, so that serializing the
+        profiles doesn't make any more queries."""
+        return self.select_related(
+            "sensitivedata",
+            "verified_personal_information__permanent_address",
+            "verified_personal_information__temporary_address",
+            "verified_personal_information__permanent_foreign_address",
+        ).prefetch_related(
+            "emails",
+            "phones",
+            "addresses",
+            models.Prefetch(
+                "service_connections",
+                queryset=ServiceConnection.objects.select_related("service"),
+            ),
+        )
+
+
 class Profile(UUIDModel, SerializableMixin, AllowedDataFieldsMixin):
     user = models.OneToOneField(User, on_delete=models.PROTECT, null=True, blank=True)
     first_name = NullToEmptyCharField(max_length=150, blank=True, db_index=True)
@@ -86,6 +114,8 @@ class Profile(UUIDModel, SerializableMixin, AllowedDataFieldsMixin):
         default=settings.CONTACT_METHODS[0][0],
     )
 
+    objects = ProfileManager()
+
     class Meta:
         ordering = ["id"]
 
@@ -124,8 +154,8 @@ class Profile(UUIDModel, SerializableMixin, AllowedDataFieldsMixin):
         "available_login_methods",
     ]
 
-    def resolve_profile(self):
-        return self
+    def resolve_profile_id(self):
+        return self.pk
 
     def get_primary_email(self):
         return Email.objects.get(profile=self, primary=True)
@@ -185,53 +215,27 @@ class Profile(UUIDModel, SerializableMixin, AllowedDataFieldsMixin):
             ]
         }
         And returns dict where key is the customer_id and value is the UUID of created profile object
+
+        The customers are validated first, and `InvalidCustomerDataError` with the
+        validation report is raised if any of them is invalid. The customers are
+        created in bulk, but in a single transaction. See
+        `profiles.customer_import.import_customers` for committing in batches.
         """  # noqa: E501
+        from .customer_import import (
+            BATCH_SIZE,
+            InvalidCustomerDataError,
+            batched,
+            create_customers,
+            validate_customers,
+        )
+
+        errors = validate_customers(data)
+        if errors:
+            raise InvalidCustomerDataError(errors)
+
         result = {}
-        for customer_index, item in enumerate(data):
-            try:
-                profile = Profile.objects.create(
-                    first_name=item.get("first_name", ""),
-                    last_name=item.get("last_name", ""),
-                )
-                ssn = item.get("ssn")
-                if ssn:
-                    SensitiveData.objects.create(ssn=ssn, profile=profile)
-                email = item.get("email", None)
-                if email:
-                    profile.emails.create(
-                        email=email, email_type=EmailType.PERSONAL, primary=True
-                    )
-                address = item.get("address", None)
-                if address:
-                    profile.addresses.create(
-                        address=address.get("address", ""),
-                        postal_code=address.get("postal_code", ""),
-                        city=address.get("city", ""),
-                        country_code="fi",
-                        address_type=AddressType.HOME,
-                        primary=True,
-                    )
-                phones = item.get("phones", ())
-                for index, phone in enumerate(phones):
-                    profile.phones.create(
-                        phone=phone, phone_type=PhoneType.MOBILE, primary=index == 0
-                    )
-                if service:
-                    ServiceConnection.objects.create(
-                        profile=profile, service=service, enabled=False
-                    )
-                result[item["customer_id"]] = profile.pk
-            except Exception as err:
-                msg = (
-                    "Could not import customer_id: {}, index: {}".format(
-                        item["customer_id"], customer_index
-                    )
-                    if "customer_id" in item
-                    else "Could not import unknown customer, index: {}".format(
-                        customer_index
-                    )
-                )
-                raise Exception(msg) from err
+        for batch in batched(enumerate(data), BATCH_SIZE):
+            result.update(create_customers(batch, service))
         return result
 
 
@@ -239,6 +243,10 @@ def get_national_identification_number_hash_key():
     return settings.SALT_NATIONAL_IDENTIFICATION_NUMBER
 
 
+def get_blind_index_hash_key():
+    return settings.SALT_BLIND_INDEXES
+
+
 class VerifiedPersonalInformation(SerializableMixin, AllowedDataFieldsMixin):
     profile = models.OneToOneField(
         Profile, on_delete=models.CASCADE, related_name="verified_personal_information"
@@ -284,6 +292,10 @@ class VerifiedPersonalInformation(SerializableMixin, AllowedDataFieldsMixin):
         help_text="Official municipality of residence in Finland as an official number.",  # noqa: E501
         validators=[validate_finnish_municipality_of_residence_number],
     )
+    municipality_of_residence_number_index = BlindIndexField(
+        hash_key=get_blind_index_hash_key,
+        source_field_name="municipality_of_residence_number",
+    )
 
     serialize_fields = (
         {"name": "first_name"},
@@ -351,11 +363,14 @@ class VerifiedPersonalInformationPermanentAddress(EncryptedAddress):
         on_delete=models.CASCADE,
         related_name=RELATED_NAME,
     )
+    postal_code_index = BlindIndexField(
+        hash_key=get_blind_index_hash_key, source_field_name="postal_code"
+    )
 
     audit_log = True
 
-    def resolve_profile(self):
-        return self.verified_personal_information.profile
+    def resolve_profile_id(self):
+        return self.verified_personal_information.profile_id
 
 
 class VerifiedPersonalInformationTemporaryAddress(EncryptedAddress):
@@ -369,8 +384,8 @@ class VerifiedPersonalInformationTemporaryAddress(EncryptedAddress):
 
     audit_log = True
 
-    def resolve_profile(self):
-        return self.verified_personal_information.profile
+    def resolve_profile_id(self):
+        return self.verified_personal_information.profile_id
 
 
 class VerifiedPersonalInformationPermanentForeignAddress(SerializableMixin):
@@ -411,21 +426,18 @@ class VerifiedPersonalInformationPermanentForeignAddress(SerializableMixin):
     def is_empty(self):
         return not (self.street_address or self.additional_address or self.country_code)
 
-    def resolve_profile(self):
-        return self.verified_personal_information.profile
+    def resolve_profile_id(self):
+        return self.verified_personal_information.profile_id
 
 
 class SensitiveData(SerializableMixin):
     profile = models.OneToOneField(Profile, on_delete=models.CASCADE)
-    ssn = fields.EncryptedCharField(
+    ssn = EncryptedCharField(
         max_length=11, validators=[validate_finnish_national_identification_number]
     )
     serialize_fields = ({"name": "ssn"},)
     audit_log = True
 
-    def resolve_profile(self):
-        return self.profile if self.pk else None
-
 
 class Contact(SerializableMixin):
     primary = models.BooleanField(default=False)
@@ -540,3 +552,69 @@ class TemporaryReadAccessToken(models.Model):
 
     def __str__(self):
         return f"{self.token} ({self.expires_at()})"
+
+
+class ProfileDeletionCheckpoint(models.Model):
+    """Progress of a single profile in a bulk profile deletion run.
+
+    The profile is referenced only by its id, because the checkpoint outlives the
+    profile.
+    """
+
+    run_id = models.CharField(max_length=64)
+    profile_id = models.UUIDField()
+    status = EnumField(
+        ProfileDeletionStatus,
+        max_length=32,
+        default=ProfileDeletionStatus.PENDING,
+        db_index=True,
+    )
+    errors = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("run_id", "profile_id")
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.run_id}: {self.profile_id} ({self.status.value})"
+
+
+class CustomerImportJob(models.Model):
+    """A customer data import uploaded in the admin, run in the background.
+
+    The mapping from the customer ids to the ids of the created profiles is stored
+    when the import finishes. If the import fails, the mapping contains the
+    customers imported before the failing batch. If the data doesn't pass the
+    validation, nothing is imported and the validation report is stored instead.
+
+    A running job is updated at least after every batch. A running job that
+    hasn't been updated in a long time is no longer run and is marked as failed
+    by `fail_stale_import_jobs`.
+    """
+
+    service = models.ForeignKey(
+        Service, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+    status = EnumField(
+        CustomerImportStatus, max_length=32, default=CustomerImportStatus.RUNNING
+    )
+    imported_count = models.PositiveIntegerField(default=0)
+    # Percentage of the uploaded file read so far
+    progress = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    validation_errors = models.JSONField(default=list, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    # The uploaded file, which is removed when the import ends
+    file_path = models.CharField(max_length=1024, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.id} ({self.status.value})"
@@ -313,6 +313,8 @@ class ProfileFilter(FilterSet):
             "last_name",
             "nickname",
             "national_identification_number",
+            "municipality_of_residence_number",
+            "permanent_address_postal_code",
             "emails__email",
             "emails__email_type",
             "emails__primary",
@@ -337,7 +339,16 @@ class ProfileFilter(FilterSet):
     last_name = CharFilter(method="filter_by_name_icontains")
     nickname = CharFilter(lookup_expr="icontains")
     national_identification_number = CharFilter(
-        method="filter_by_nin_exact", label="Searches by full match only."
+        method="filter_by_verified_personal_information_exact",
+        label="Searches by full match only.",
+    )
+    municipality_of_residence_number = CharFilter(
+        method="filter_by_verified_personal_information_exact",
+        label="Searches by full match only.",
+    )
+    permanent_address_postal_code = CharFilter(
+        method="filter_by_verified_personal_information_exact",
+        label="Searches by full match only.",
     )
     emails__email = CharFilter(lookup_expr="icontains")
     emails__email_type = ChoiceFilter(choices=EmailType.choices())
@@ -372,10 +383,18 @@ class ProfileFilter(FilterSet):
 
         return queryset.filter(name_filter)
 
-    def filter_by_nin_exact(self, queryset, name, value):
+    # The lookups of the exact match filters use the hashes of the encrypted values
+    verified_personal_information_lookups = {
+        "national_identification_number": "national_identification_number",
+        "municipality_of_residence_number": "municipality_of_residence_number_index",
+        "permanent_address_postal_code": "permanent_address__postal_code_index",
+    }
+
+    def filter_by_verified_personal_information_exact(self, queryset, name, value):
         if requester_can_view_verified_personal_information(self.request):
+            lookup = self.verified_personal_information_lookups[name]
             return queryset.filter(
-                verified_personal_information__national_identification_number=value
+                **{f"verified_personal_information__{lookup}": value}
             )
         else:
             return queryset.none()
@@ -1803,8 +1822,10 @@ class Query(graphene.ObjectType):
     @staff_required(required_permission="view")
     def resolve_profile(self, info, **kwargs):
         service = info.context.service
-        return Profile.objects.filter(service_connections__service=service).get(
-            pk=from_global_id(kwargs["id"])[1]
+        return (
+            Profile.objects.filter(service_connections__service=service)
+            .select_related("user")
+            .get(pk=from_global_id(kwargs["id"])[1])
         )
 
     @login_and_service_required
@@ -1824,7 +1845,9 @@ class Query(graphene.ObjectType):
     @staff_required(required_permission="view")
     def resolve_profiles(self, info, **kwargs):
         service = info.context.service
-        return Profile.objects.filter(service_connections__service=service)
+        return Profile.objects.filter(
+            service_connections__service=service
+        ).select_related("user")
 
     @login_required
     def resolve_claimable_profile(self, info, **kwargs):
@@ -1833,7 +1856,7 @@ class Query(graphene.ObjectType):
     @login_and_service_required
     def resolve_download_my_profile(self, info, **kwargs):
         try:
-            profile = Profile.objects.get(user=info.context.user)
+            profile = Profile.objects.for_serialization().get(user=info.context.user)
         except Profile.DoesNotExist:
             return None
 
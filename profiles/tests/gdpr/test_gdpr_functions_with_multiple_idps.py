@@ -355,11 +355,9 @@ def test_delete_connected_service_data(requests_mock, setup_services_and_mocks):
     services = setup_services_and_mocks["services"]
     service_connections = setup_services_and_mocks["service_connections"]
 
-    # Test delete functionality only with dry_run as True so that the request counts
-    # are the same regardless of IDP. (If the dry_run is False the
-    # delete_connected_service_data would make GDPR API calls twice with dry_run as
-    # True and with dry_run as False. In that case Keycloak API token would be fetched
-    # twice but Tunnistamo tokens only once)
+    # Test delete functionality only with dry_run as True so that the GDPR API is
+    # called only once. (If the dry_run is False the delete_connected_service_data
+    # would make GDPR API calls twice with dry_run as True and with dry_run as False.)
     delete_connected_service_data(
         profile, AUTHORIZATION_CODE, AUTHORIZATION_CODE_KEYCLOAK, dry_run=True
     )
@@ -369,3 +367,18 @@ def test_delete_connected_service_data(requests_mock, setup_services_and_mocks):
     assert_correct_access_token_calls(services, request_history)
     assert_correct_api_token_calls(services, request_history)
     assert_correct_gdpr_api_calls(services, service_connections, request_history)
+
+
+@pytest.mark.parametrize("setup_services_and_mocks", service_sets, indirect=True)
+def test_delete_connected_service_data_reuses_api_tokens(
+    requests_mock, setup_services_and_mocks
+):
+    services = setup_services_and_mocks["services"]
+
+    delete_connected_service_data(
+        setup_services_and_mocks["profile"],
+        AUTHORIZATION_CODE,
+        AUTHORIZATION_CODE_KEYCLOAK,
+    )
+
+    assert_correct_api_token_calls(services, requests_mock.request_history)
@@ -311,3 +311,77 @@ def test_when_service_fails_to_return_data_then_error_is_returned(
 
     assert executed["data"]["downloadMyProfile"] is None
     assert_match_error_code(executed, "CONNECTED_SERVICE_DATA_QUERY_FAILED_ERROR")
+
+
+def test_when_service_circuit_is_open_then_error_is_returned_without_a_request(
+    user_gql_client,
+    service_1,
+    gdpr_api_tokens,
+    mocker,
+    requests_mock,
+    settings,
+):
+    settings.GDPR_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 2
+    mocker.patch.object(
+        TunnistamoTokenExchange, "fetch_api_tokens", return_value=gdpr_api_tokens
+    )
+
+    profile = ProfileFactory(user=user_gql_client.user)
+    service_connection = ServiceConnectionFactory(profile=profile, service=service_1)
+
+    gdpr_mock = requests_mock.get(service_connection.get_gdpr_url(), status_code=500)
+
+    for _i in range(3):
+        executed = user_gql_client.execute(DOWNLOAD_MY_PROFILE_MUTATION)
+        assert executed["data"]["downloadMyProfile"] is None
+        assert_match_error_code(executed, "CONNECTED_SERVICE_DATA_QUERY_FAILED_ERROR")
+
+    assert gdpr_mock.call_count == 2
+
+
+@pytest.mark.parametrize("with_content_length", [True, False])
+def test_when_service_response_is_too_large_then_error_is_returned(
+    with_content_length,
+    user_gql_client,
+    service_1,
+    gdpr_api_tokens,
+    mocker,
+    requests_mock,
+    settings,
+):
+    settings.GDPR_API_MAX_RESPONSE_SIZE = 100
+    mocker.patch.object(
+        TunnistamoTokenExchange, "fetch_api_tokens", return_value=gdpr_api_tokens
+    )
+
+    profile = ProfileFactory(user=user_gql_client.user)
+    service_connection = ServiceConnectionFactory(profile=profile, service=service_1)
+
+    body = json.dumps(
+        {"key": "SERVICE-1", "children": [{"key": "CUSTOMERID", "value": "123"}] * 10}
+    )
+    headers = {"Content-Length": str(len(body))} if with_content_length else {}
+    requests_mock.get(service_connection.get_gdpr_url(), text=body, headers=headers)
+
+    executed = user_gql_client.execute(DOWNLOAD_MY_PROFILE_MUTATION)
+
+    assert executed["data"]["downloadMyProfile"] is None
+    assert_match_error_code(executed, "CONNECTED_SERVICE_DATA_QUERY_FAILED_ERROR")
+
+
+def test_when_service_response_is_not_json_then_error_is_returned(
+    user_gql_client, service_1, gdpr_api_tokens, mocker, requests_mock
+):
+    mocker.patch.object(
+        TunnistamoTokenExchange, "fetch_api_tokens", return_value=gdpr_api_tokens
+    )
+
+    profile = ProfileFactory(user=user_gql_client.user)
+    service_connection = ServiceConnectionFactory(profile=profile, service=service_1)
+
+    requests_mock.get(service_connection.get_gdpr_url(), text="<html></html>")
+
+    executed = user_gql_client.execute(DOWNLOAD_MY_PROFILE_MUTATION)
+
+    assert executed["data"]["downloadMyProfile"] is None
+    assert_match_error_code(executed, "CONNECTED_SERVICE_DATA_QUERY_FAILED_ERROR")
@@ -1,9 +1,17 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.forms.models import inlineformset_factory
 from django.urls import reverse
+from django.utils import timezone
 
+from .. import customer_import
 from ..admin import EmailFormSet
-from ..enums import EmailType
-from ..models import Email, Profile
+from ..customer_import import run_import_job
+from ..enums import CustomerImportStatus, EmailType
+from ..models import CustomerImportJob, Email, Profile
 from .factories import ProfileFactory
 
 
@@ -71,3 +79,152 @@ def test_admin_profile_change_view_query_count_not_too_big(
 
     with django_assert_max_num_queries(50):
         admin_client.get(view_profile_url)
+
+
+@pytest.fixture
+def run_import_jobs_synchronously(mocker):
+    mocker.patch(
+        "profiles.admin.start_import_job",
+        side_effect=lambda job_id, path: run_import_job(job_id, path, batch_size=1),
+    )
+
+
+def _upload_customers(admin_client, customers, **data):
+    return admin_client.post(
+        reverse("admin:upload-json"),
+        {
+            "json_file": SimpleUploadedFile(
+                "customers.json", json.dumps(customers).encode()
+            ),
+            **data,
+        },
+    )
+
+
+def test_uploaded_customers_are_imported_in_a_job(
+    admin_client, service, run_import_jobs_synchronously
+):
+    customers = [
+        {"customer_id": "1", "first_name": "Jukka", "email": "jukka@example.com"},
+        {"customer_id": "2", "first_name": "Mirja", "phones": ["0412345678"]},
+    ]
+
+    response = _upload_customers(admin_client, customers, service=service.name)
+
+    job = CustomerImportJob.objects.get()
+    job_url = reverse("admin:customer-import-job", args=(job.pk,))
+    assert response.status_code == 302
+    assert response.url == job_url
+    assert job.status == CustomerImportStatus.SUCCEEDED
+    assert (job.imported_count, job.progress) == (2, 100)
+    assert "Succeeded" in admin_client.get(job_url).content.decode()
+
+    response = admin_client.get(
+        reverse("admin:customer-import-job-result", args=(job.pk,))
+    )
+    assert response["Content-Disposition"] == "attachment; filename=export.json"
+    result = json.loads(response.content)
+    assert set(result) == {"1", "2"}
+    for customer in customers:
+        profile = Profile.objects.get(pk=result[customer["customer_id"]])
+        assert profile.first_name == customer["first_name"]
+        assert profile.service_connections.get().service == service
+
+
+def test_failed_import_job_keeps_the_customers_of_the_committed_batches(
+    admin_client, run_import_jobs_synchronously, mocker
+):
+    create_customers = customer_import.create_customers
+
+    def fail_second_batch(batch, service):
+        if batch[0][0] == 1:
+            raise Exception("Could not import customers, indexes: 1-1")
+        return create_customers(batch, service)
+
+    mocker.patch(
+        "profiles.customer_import.create_customers", side_effect=fail_second_batch
+    )
+
+    _upload_customers(admin_client, [{"customer_id": "1"}, {"customer_id": "2"}])
+
+    job = CustomerImportJob.objects.get()
+    assert job.status == CustomerImportStatus.FAILED
+    assert job.error == "Could not import customers, indexes: 1-1"
+    assert job.imported_count == 1
+    assert list(job.result) == ["1"]
+    assert Profile.objects.filter(pk=job.result["1"]).exists()
+
+
+def test_import_job_with_invalid_customers_imports_nothing(
+    admin_client, run_import_jobs_synchronously
+):
+    _upload_customers(
+        admin_client,
+        [
+            {"customer_id": "1", "email": "invalid"},
+            {"customer_id": "2"},
+            {"first_name": "Mirja"},
+        ],
+    )
+
+    job = CustomerImportJob.objects.get()
+    assert job.status == CustomerImportStatus.FAILED
+    assert [
+        (error["index"], error["customer_id"], list(error["errors"]))
+        for error in job.validation_errors
+    ] == [(0, "1", ["email"]), (2, None, ["customer_id"])]
+    assert not Profile.objects.exists()
+
+    job_page = admin_client.get(
+        reverse("admin:customer-import-job", args=(job.pk,))
+    ).content.decode()
+    assert "errors.json" in job_page
+    assert "export.json" not in job_page
+    response = admin_client.get(
+        reverse("admin:customer-import-job-validation-errors", args=(job.pk,))
+    )
+    assert json.loads(response.content) == job.validation_errors
+
+
+def test_result_of_a_running_import_job_is_not_available(admin_client):
+    job = CustomerImportJob.objects.create()
+
+    response = admin_client.get(
+        reverse("admin:customer-import-job-result", args=(job.pk,))
+    )
+
+    assert response.status_code == 404
+
+
+def test_import_job_file_is_removed_when_the_job_is_not_found(tmp_path):
+    path = tmp_path / "customers.json"
+    path.write_text("[]")
+
+    run_import_job(0, str(path))
+
+    assert not path.exists()
+
+
+def test_stale_running_import_jobs_are_failed_and_their_files_removed(
+    admin_client, tmp_path
+):
+    stale_path = tmp_path / "stale.json"
+    stale_path.write_text("[]")
+    running_path = tmp_path / "running.json"
+    running_path.write_text("[]")
+    stale_job = CustomerImportJob.objects.create(
+        updated_at=timezone.now() - timedelta(minutes=11), file_path=str(stale_path)
+    )
+    running_job = CustomerImportJob.objects.create(file_path=str(running_path))
+
+    job_page = admin_client.get(
+        reverse("admin:customer-import-job", args=(stale_job.pk,))
+    ).content.decode()
+
+    assert "The import was interrupted." in job_page
+    stale_job.refresh_from_db()
+    assert stale_job.status == CustomerImportStatus.FAILED
+    assert not stale_path.exists()
+    running_job.refresh_from_db()
+    assert running_job.status == CustomerImportStatus.RUNNING
+    assert running_path.exists()
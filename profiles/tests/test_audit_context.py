@@ -0,0 +1,116 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from audit_log.models import LogEntry
+from profiles.audit_log import audit_context
+from profiles.models import Profile
+
+from .factories import EmailFactory, ProfileFactory
+
+
+@pytest.fixture(autouse=True)
+def enable_audit_log(settings):
+    settings.AUDIT_LOG_TO_DB_ENABLED = True
+
+
+def _read_profile_in_thread(profile_id):
+    try:
+        return list(Profile.objects.get(pk=profile_id).emails.all())
+    finally:
+        connection.close()
+
+
+def _logged(operation="READ"):
+    return {
+        (log_entry.target_profile_id, log_entry.target_type)
+        for log_entry in LogEntry.objects.filter(operation=operation)
+    }
+
+
+def test_nothing_is_logged_outside_an_audit_context(profile):
+    Profile.objects.get(pk=profile.pk)
+
+    assert LogEntry.objects.count() == 0
+
+
+def test_entries_are_written_when_the_context_exits(profile):
+    with audit_context():
+        Profile.objects.get(pk=profile.pk)
+        assert LogEntry.objects.count() == 0
+
+    assert _logged() == {(profile.pk, "base profile")}
+
+
+def test_the_actor_is_the_system_without_a_user(profile):
+    with audit_context():
+        Profile.objects.get(pk=profile.pk)
+
+    log_entry = LogEntry.objects.get()
+    assert log_entry.actor_role == "SYSTEM"
+    assert log_entry.actor_user_id is None
+    assert log_entry.target_user_id == profile.user.uuid
+
+
+def test_the_actor_can_be_given_explicitly(profile, user, service):
+    with audit_context(user=user, service=service, client_id="test-client"):
+        Profile.objects.get(pk=profile.pk)
+
+    log_entry = LogEntry.objects.get()
+    assert log_entry.actor_role == "ADMIN"
+    assert log_entry.actor_user_id == user.uuid
+    assert log_entry.service_name == service.name
+    assert log_entry.client_id == "test-client"
+
+
+def test_nested_context_collects_its_own_entries(profile):
+    other_profile = ProfileFactory()
+
+    with audit_context():
+        Profile.objects.get(pk=profile.pk)
+        with audit_context(user=other_profile.user):
+            Profile.objects.get(pk=other_profile.pk)
+
+        assert _logged() == {(other_profile.pk, "base profile")}
+
+    assert LogEntry.objects.get(target_profile_id=profile.pk).actor_role == "SYSTEM"
+    assert (
+        LogEntry.objects.get(target_profile_id=other_profile.pk).actor_role == "OWNER"
+    )
+
+
+def test_threads_running_in_a_copied_context_share_the_collector(transactional_db):
+    profile = EmailFactory().profile
+
+    with audit_context():
+        thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_read_profile_in_thread, profile.pk),
+        )
+        thread.start()
+        thread.join()
+
+    assert _logged() == {(profile.pk, "base profile"), (profile.pk, "email")}
+
+
+def test_asyncio_tasks_inherit_the_context(transactional_db):
+    profiles = ProfileFactory.create_batch(2)
+
+    async def read_profiles():
+        await asyncio.gather(
+            *(
+                sync_to_async(_read_profile_in_thread, thread_sensitive=False)(
+                    profile.pk
+                )
+                for profile in profiles
+            )
+        )
+
+    with audit_context():
+        asyncio.run(read_profiles())
+
+    assert _logged() == {(profile.pk, "base profile") for profile in profiles}
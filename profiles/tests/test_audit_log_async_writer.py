@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+import pytest
+from prometheus_client import REGISTRY
+
+from audit_log.models import LogEntry
+from profiles.audit_log import AsyncAuditLogWriter, _AuditLogRecord
+
+from .factories import ProfileFactory
+
+
+@pytest.fixture(autouse=True)
+def enable_audit_log(settings):
+    settings.AUDIT_LOG_TO_DB_ENABLED = True
+
+
+def _record(profile, parts=(("READ", "base profile"),)):
+    timestamp = datetime.now(tz=timezone.utc)
+    return _AuditLogRecord(
+        current_user=None,
+        service_name="test-service",
+        client_id="test-client",
+        ip_address="127.0.0.1",
+        audit_loggables={
+            profile.pk: {
+                "parts": {part: timestamp for part in parts},
+                "user_uuid": None,
+            }
+        },
+    )
+
+
+def _dropped(reason):
+    return (
+        REGISTRY.get_sample_value("audit_log_dropped_entries_total", {"reason": reason})
+        or 0
+    )
+
+
+def test_records_are_written_in_the_background(transactional_db):
+    profiles = ProfileFactory.create_batch(3)
+    writer = AsyncAuditLogWriter(max_queue_size=10, batch_size=2, enqueue_timeout=1)
+    writer.start()
+
+    for profile in profiles:
+        writer.put(_record(profile))
+    writer.flush()
+    writer.stop()
+
+    assert LogEntry.objects.count() == 3
+    for profile in profiles:
+        log_entry = LogEntry.objects.get(target_profile_id=profile.pk)
+        assert log_entry.target_user_id == profile.user.uuid
+        assert log_entry.service_name == "test-service"
+        assert log_entry.actor_role == "ANONYMOUS"
+
+
+def test_queued_records_are_written_on_stop(transactional_db):
+    profile = ProfileFactory()
+    writer = AsyncAuditLogWriter(max_queue_size=10, batch_size=10, enqueue_timeout=1)
+    writer.put(_record(profile, parts=[("READ", "base profile"), ("READ", "email")]))
+    assert writer.queue_depth() == 1
+    assert REGISTRY.get_sample_value("audit_log_queue_depth") == 1
+
+    writer.start()
+    writer.stop()
+
+    assert LogEntry.objects.count() == 2
+    assert writer.queue_depth() == 0
+    assert REGISTRY.get_sample_value("audit_log_queue_depth") == 0
+
+
+def test_records_are_dropped_when_the_queue_stays_full(profile):
+    writer = AsyncAuditLogWriter(max_queue_size=1, batch_size=10, enqueue_timeout=0)
+    dropped_before = _dropped("queue_full")
+
+    writer.put(_record(profile))
+    writer.put(_record(profile, parts=[("READ", "base profile"), ("READ", "email")]))
+
+    assert writer.queue_depth() == 1
+    assert _dropped("queue_full") == dropped_before + 2
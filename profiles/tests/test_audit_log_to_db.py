@@ -4,6 +4,9 @@ from string import Template
 from typing import Any, List, Optional
 
 import pytest
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
 from guardian.shortcuts import assign_perm
 
 from audit_log.models import LogEntry
@@ -13,6 +16,7 @@ from open_city_profile.tests.graphql_test_helpers import (
     do_graphql_call,
     do_graphql_call_as_user,
 )
+from profiles.audit_log import AuditLogMiddleware, audit_context
 from profiles.models import (
     Profile,
     VerifiedPersonalInformationPermanentAddress,
@@ -589,6 +593,10 @@ class TestIPAddressLogging:
         request_args = {"headers": {"X-Forwarded-For": header}}
         self.execute_ip_address_test(live_server, profile, "12.23.34.45", request_args)
 
+    def test_invalid_x_forwarded_for_header_is_ignored(self, live_server, profile):
+        request_args = {"headers": {"X-Forwarded-For": "unknown, 1.1.1.1"}}
+        self.execute_ip_address_test(live_server, profile, "127.0.0.1", request_args)
+
     def test_do_not_use_x_forwarded_for_header_if_it_is_denied_in_settings(
         self, live_server, settings, profile
     ):
@@ -601,3 +609,57 @@ class TestIPAddressLogging:
         self, live_server, profile
     ):
         self.execute_ip_address_test(live_server, profile, "127.0.0.1")
+
+
+@pytest.mark.parametrize("actor_role", ["OWNER", "ADMIN"])
+def test_audit_logging_does_not_query_the_logged_data(rf, user, actor_role):
+    vpi = VerifiedPersonalInformationFactory()
+    profile = vpi.profile
+    EmailFactory(profile=profile)
+
+    request = rf.get("/")
+    request.user = profile.user if actor_role == "OWNER" else user
+    queries_in_view = 0
+
+    def view(request):
+        nonlocal queries_in_view
+        loaded = Profile.objects.select_related("user").get(pk=profile.pk)
+        list(loaded.emails.all())
+        assert loaded.verified_personal_information.permanent_address
+        queries_in_view = len(context.captured_queries)
+        return HttpResponse()
+
+    with CaptureQueriesContext(connection) as context:
+        AuditLogMiddleware(view)(request)
+
+    audit_log_queries = [
+        query["sql"] for query in context.captured_queries[queries_in_view:]
+    ]
+    assert audit_log_queries
+    for sql in audit_log_queries:
+        assert "profiles_" not in sql
+        assert "users_" not in sql
+
+    log_entries = list(LogEntry.objects.all())
+    assert {log_entry.target_type for log_entry in log_entries} == {
+        "base profile",
+        "email",
+        "verified personal information",
+        "verified personal information permanent address",
+    }
+    for log_entry in log_entries:
+        assert_common_fields(
+            log_entry,
+            profile,
+            "READ",
+            actor_role=actor_role,
+            target_profile_part=log_entry.target_type,
+        )
+
+
+def test_deleted_profile_target_user_is_resolved_without_the_profile(profile):
+    with audit_context():
+        Profile.objects.get(pk=profile.pk).delete()
+
+    log_entries = list(LogEntry.objects.filter(operation="DELETE"))
+    assert_common_fields(log_entries, profile, "DELETE")
@@ -1,5 +1,6 @@
 import json
 import logging
+import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from string import Template
@@ -8,12 +9,14 @@ from typing import Any, List, Optional
 import pytest
 from guardian.shortcuts import assign_perm
 
+from audit_log.models import LogEntry
 from open_city_profile.tests import to_graphql_name
 from open_city_profile.tests.asserts import assert_almost_equal
 from open_city_profile.tests.graphql_test_helpers import (
     do_graphql_call,
     do_graphql_call_as_user,
 )
+from profiles.audit_log import _serialize_log_entries, log_entry_message
 from profiles.models import (
     Profile,
     VerifiedPersonalInformationPermanentAddress,
@@ -648,3 +651,37 @@ class TestIPAddressLogging:
         self, live_server, profile, cap_audit_log
     ):
         self.execute_ip_address_test(live_server, profile, "127.0.0.1", cap_audit_log)
+
+
+def test_serialized_log_entries_match_the_log_entry_message():
+    timestamp = datetime(2026, 5, 17, 8, 30, 15, 123456, tzinfo=timezone.utc)
+    actor_user_id = uuid.uuid4()
+    log_entries = [
+        LogEntry(
+            timestamp=timestamp,
+            service_name='Palvelu "ä"',
+            client_id="client",
+            ip_address="12.23.34.45",
+            actor_user_id=actor_user_id,
+            actor_role="ADMIN",
+            target_user_id=uuid.uuid4(),
+            target_profile_id=uuid.uuid4(),
+            target_type="base profile",
+            operation=operation,
+        )
+        for operation in ("READ", "UPDATE")
+    ] + [
+        LogEntry(
+            timestamp=timestamp,
+            service_name="",
+            client_id="",
+            ip_address=None,
+            actor_role="ANONYMOUS",
+            target_type="email",
+            operation="READ",
+        )
+    ]
+
+    assert list(_serialize_log_entries(log_entries)) == [
+        json.dumps(log_entry_message(log_entry)) for log_entry in log_entries
+    ]
@@ -0,0 +1,226 @@
+from io import StringIO
+from urllib.parse import parse_qs
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from audit_log.models import LogEntry
+from open_city_profile.consts import SERVICE_GDPR_API_UNKNOWN_ERROR
+from open_city_profile.oidc import KeycloakTokenExchange
+from profiles.enums import ProfileDeletionStatus
+from profiles.models import Profile, ProfileDeletionCheckpoint
+from services.enums import ServiceIdp
+from services.models import ServiceConnection
+from services.tests.factories import ServiceConnectionFactory
+from users.models import User
+
+from .factories import ProfileFactory
+
+KEYCLOAK_BASE_URL = "https://keycloak.example.com/auth"
+KEYCLOAK_REALM = "example-realm"
+KEYCLOAK_TOKEN_ENDPOINT = (
+    f"{KEYCLOAK_BASE_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token"
+)
+
+RUN_ID = "test-run"
+
+
+@pytest.fixture(autouse=True)
+def keycloak_mocks(settings, requests_mock):
+    settings.KEYCLOAK_BASE_URL = KEYCLOAK_BASE_URL
+    settings.KEYCLOAK_REALM = KEYCLOAK_REALM
+    settings.KEYCLOAK_GDPR_CLIENT_ID = "test-gdpr-client"
+    settings.KEYCLOAK_GDPR_CLIENT_SECRET = "testsecret"
+    requests_mock.get(
+        f"{KEYCLOAK_BASE_URL}/realms/{KEYCLOAK_REALM}/.well-known/openid-configuration",
+        json={"token_endpoint": KEYCLOAK_TOKEN_ENDPOINT},
+    )
+
+    def get_token_response(token_request, context):
+        body = parse_qs(token_request.body)
+        if body["grant_type"][0] == "client_credentials":
+            return {"access_token": "client_access_token", "expires_in": 300}
+        return {"access_token": f"{body['audience'][0]}-api-token"}
+
+    requests_mock.post(KEYCLOAK_TOKEN_ENDPOINT, json=get_token_response)
+
+
+@pytest.fixture
+def keycloak_service(service_factory):
+    return service_factory(
+        name="keycloak-service",
+        gdpr_url="https://service.example.com/gdpr/$profile_id",
+        gdpr_query_scope="gdprquery",
+        gdpr_delete_scope="gdprdelete",
+        gdpr_audience="service-api",
+        idp=[ServiceIdp.KEYCLOAK],
+    )
+
+
+@pytest.fixture
+def profiles(keycloak_service, requests_mock):
+    profiles = ProfileFactory.create_batch(3)
+    for profile in profiles:
+        service_connection = ServiceConnectionFactory(
+            profile=profile, service=keycloak_service
+        )
+        requests_mock.delete(service_connection.get_gdpr_url(), status_code=204)
+    return profiles
+
+
+def _statuses(run_id=RUN_ID):
+    return {
+        cp.profile_id: cp.status
+        for cp in ProfileDeletionCheckpoint.objects.filter(run_id=run_id)
+    }
+
+
+def test_deletes_the_given_profiles(profiles, requests_mock):
+    call_command(
+        "bulk_delete_profiles",
+        *[str(p.id) for p in profiles[:2]],
+        "--run-id",
+        RUN_ID,
+        "--batch-size",
+        "1",
+        stdout=StringIO(),
+    )
+
+    assert list(Profile.objects.all()) == [profiles[2]]
+    assert list(User.objects.all()) == [profiles[2].user]
+    assert ServiceConnection.objects.count() == 1
+    assert _statuses() == {
+        profiles[0].id: ProfileDeletionStatus.DELETED,
+        profiles[1].id: ProfileDeletionStatus.DELETED,
+    }
+    delete_requests = [r for r in requests_mock.request_history if r.method == "DELETE"]
+    assert len(delete_requests) == 4
+    assert all(
+        r.headers["Authorization"] == "Bearer service-api-api-token"
+        for r in delete_requests
+    )
+
+
+@pytest.mark.parametrize("renewal_margin,expected_requests", [(0, 1), (300, 3)])
+def test_client_credentials_token_is_renewed_between_batches_when_about_to_expire(
+    profiles, requests_mock, mocker, renewal_margin, expected_requests
+):
+    mocker.patch.object(
+        KeycloakTokenExchange,
+        "client_credentials_token_renewal_margin",
+        renewal_margin,
+    )
+
+    call_command(
+        "bulk_delete_profiles",
+        *[str(p.id) for p in profiles],
+        "--batch-size",
+        "1",
+        stdout=StringIO(),
+    )
+
+    token_requests = [
+        r
+        for r in requests_mock.request_history
+        if r.method == "POST"
+        and parse_qs(r.body)["grant_type"] == ["client_credentials"]
+    ]
+    assert len(token_requests) == expected_requests
+    assert Profile.objects.count() == 0
+
+
+def test_deletions_are_audit_logged_with_the_system_as_actor(settings, profiles):
+    settings.AUDIT_LOG_TO_DB_ENABLED = True
+
+    call_command(
+        "bulk_delete_profiles",
+        str(profiles[0].id),
+        "--run-id",
+        RUN_ID,
+        stdout=StringIO(),
+    )
+
+    log_entries = LogEntry.objects.filter(operation="DELETE")
+    assert {(e.target_profile_id, e.target_type) for e in log_entries} == {
+        (profiles[0].id, "base profile")
+    }
+    assert {e.actor_role for e in LogEntry.objects.all()} == {"SYSTEM"}
+    assert log_entries[0].target_user_id == profiles[0].user.uuid
+
+
+def test_dry_run_deletes_nothing_and_the_run_can_be_continued(profiles):
+    profile_ids = [str(p.id) for p in profiles]
+
+    call_command(
+        "bulk_delete_profiles",
+        *profile_ids,
+        "--run-id",
+        RUN_ID,
+        "--dry-run",
+        stdout=StringIO(),
+    )
+
+    assert Profile.objects.count() == 3
+    assert set(_statuses().values()) == {ProfileDeletionStatus.DRY_RUN_SUCCEEDED}
+
+    call_command("bulk_delete_profiles", "--run-id", RUN_ID, stdout=StringIO())
+
+    assert Profile.objects.count() == 0
+    assert set(_statuses().values()) == {ProfileDeletionStatus.DELETED}
+
+
+def test_failed_profiles_are_recorded_and_can_be_retried(profiles, requests_mock):
+    failing_url = profiles[0].service_connections.first().get_gdpr_url()
+    requests_mock.delete(failing_url, status_code=500)
+
+    call_command(
+        "bulk_delete_profiles",
+        *[str(p.id) for p in profiles],
+        "--run-id",
+        RUN_ID,
+        stdout=StringIO(),
+    )
+
+    assert list(Profile.objects.all()) == [profiles[0]]
+    checkpoint = ProfileDeletionCheckpoint.objects.get(profile_id=profiles[0].id)
+    assert checkpoint.status == ProfileDeletionStatus.FAILED
+    assert checkpoint.errors[0]["service"] == "keycloak-service"
+    assert checkpoint.errors[0]["code"] == SERVICE_GDPR_API_UNKNOWN_ERROR
+
+    requests_mock.delete(failing_url, status_code=204)
+    call_command("bulk_delete_profiles", "--run-id", RUN_ID, stdout=StringIO())
+    assert Profile.objects.count() == 1
+
+    call_command(
+        "bulk_delete_profiles", "--run-id", RUN_ID, "--retry-failed", stdout=StringIO()
+    )
+    assert Profile.objects.count() == 0
+    assert set(_statuses().values()) == {ProfileDeletionStatus.DELETED}
+
+
+def test_profiles_can_be_selected_by_last_login(profiles):
+    profiles[0].user.last_login = "2020-01-01T12:00:00Z"
+    profiles[0].user.save()
+    profiles[1].user.last_login = "2024-01-01T12:00:00Z"
+    profiles[1].user.save()
+
+    call_command(
+        "bulk_delete_profiles",
+        "--last-login-before",
+        "2021-01-01",
+        "--run-id",
+        RUN_ID,
+        stdout=StringIO(),
+    )
+
+    assert _statuses() == {profiles[0].id: ProfileDeletionStatus.DELETED}
+    assert Profile.objects.count() == 2
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["not-a-uuid"], ["--last-login-before", "yesterday"], []],
+)
+def test_invalid_arguments_raise_an_error(args):
+    with pytest.raises(CommandError):
+        call_command("bulk_delete_profiles", *args, stdout=StringIO())
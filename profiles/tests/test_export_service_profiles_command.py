@@ -0,0 +1,105 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from audit_log.models import LogEntry
+from services.tests.factories import AllowedDataFieldFactory, ServiceConnectionFactory
+
+from .factories import (
+    EmailFactory,
+    PhoneFactory,
+    ProfileFactory,
+    VerifiedPersonalInformationFactory,
+)
+
+
+@pytest.fixture
+def connected_profile(service):
+    profile = ProfileFactory(first_name="Erkki", last_name="Esimerkki")
+    ServiceConnectionFactory(profile=profile, service=service)
+    return profile
+
+
+def _allow(service, *field_names):
+    for field_name in field_names:
+        service.allowed_data_fields.add(AllowedDataFieldFactory(field_name=field_name))
+
+
+def _export(service, *args):
+    out = StringIO()
+    call_command(
+        "export_service_profiles",
+        service.name,
+        "-",
+        *args,
+        stdout=out,
+        stderr=StringIO(),
+    )
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_exports_the_allowed_fields_of_the_connected_profiles(
+    service, connected_profile
+):
+    _allow(service, "name", "email")
+    email = EmailFactory(profile=connected_profile)
+    PhoneFactory(profile=connected_profile)
+    ProfileFactory()
+
+    assert _export(service) == [
+        {
+            "id": str(connected_profile.pk),
+            "first_name": "Erkki",
+            "last_name": "Esimerkki",
+            "nickname": connected_profile.nickname,
+            # Always allowed, regardless of the allowed data fields of the service
+            "language": connected_profile.language,
+            "emails": [
+                {
+                    "email": email.email,
+                    "email_type": email.email_type.name,
+                    "primary": email.primary,
+                    "verified": email.verified,
+                }
+            ],
+        }
+    ]
+
+
+def test_verified_personal_information_is_exported_only_when_requested(
+    service, connected_profile
+):
+    _allow(service, "name")
+    vpi = VerifiedPersonalInformationFactory(profile=connected_profile)
+
+    assert "verified_personal_information" not in _export(service)[0]
+
+    (exported,) = _export(service, "--verified-personal-information")
+    assert exported["verified_personal_information"] == {
+        "first_name": vpi.first_name,
+        "last_name": vpi.last_name,
+        "given_name": vpi.given_name,
+    }
+
+
+def test_every_batch_is_audit_logged_with_the_service(settings, service):
+    settings.AUDIT_LOG_TO_DB_ENABLED = True
+    for _ in range(3):
+        ServiceConnectionFactory(service=service)
+
+    exported = _export(service, "--batch-size", "2")
+
+    assert len(exported) == 3
+    assert {
+        str(log_entry.target_profile_id)
+        for log_entry in LogEntry.objects.filter(
+            operation="READ", target_type="base profile", service_name=service.name
+        )
+    } == {profile["id"] for profile in exported}
+
+
+def test_unknown_service_is_an_error():
+    with pytest.raises(CommandError, match="Service not found"):
+        call_command("export_service_profiles", "unknown", "-", stdout=StringIO())
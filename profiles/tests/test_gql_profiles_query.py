@@ -221,10 +221,34 @@ def test_staff_user_can_filter_profiles_by_a_field(
     assert executed["data"] == expected_data
 
 
+@pytest.mark.parametrize(
+    "filter_name,search_value",
+    [
+        (
+            "national_identification_number",
+            lambda vpi: vpi.national_identification_number,
+        ),
+        (
+            "municipality_of_residence_number",
+            lambda vpi: vpi.municipality_of_residence_number,
+        ),
+        (
+            "permanent_address_postal_code",
+            lambda vpi: vpi.permanent_address.postal_code,
+        ),
+    ],
+)
 @pytest.mark.parametrize("amr_claim_value", [None, 0, "authmethod1", "foo"])
 @pytest.mark.parametrize("has_needed_permission", [True, False])
 def test_staff_user_filter_profiles_by_verified_personal_information_permissions(
-    has_needed_permission, amr_claim_value, settings, user_gql_client, group, service
+    has_needed_permission,
+    amr_claim_value,
+    filter_name,
+    search_value,
+    settings,
+    user_gql_client,
+    group,
+    service,
 ):
     settings.VERIFIED_PERSONAL_INFORMATION_ACCESS_AMR_LIST = [
         "authmethod1",
@@ -241,7 +265,7 @@ def test_staff_user_filter_profiles_by_verified_personal_information_permissions
     if has_needed_permission:
         assign_perm("can_view_verified_personal_information", group, service)
 
-    gql_field_name = to_graphql_name("national_identification_number")
+    gql_field_name = to_graphql_name(filter_name)
     query = query_template.substitute(search_arg_name=gql_field_name)
 
     expected_data_no_permission = {
@@ -258,7 +282,7 @@ def test_staff_user_filter_profiles_by_verified_personal_information_permissions
     token_payload = {"amr": amr_claim_value}
     executed = user_gql_client.execute(
         query,
-        variables={"searchString": vpi.national_identification_number},
+        variables={"searchString": search_value(vpi)},
         auth_token_payload=token_payload,
         service=service,
     )
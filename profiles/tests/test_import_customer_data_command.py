@@ -0,0 +1,137 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from audit_log.models import LogEntry
+from profiles import customer_import
+from profiles.models import Profile
+
+
+def _customer(customer_id, **kwargs):
+    return {
+        "customer_id": customer_id,
+        "first_name": "Jukka",
+        "last_name": "Virtanen",
+        "ssn": "010190-001A",
+        "email": f"customer{customer_id}@example.com",
+        "address": {
+            "address": "Mannerheimintie 1 A 11",
+            "postal_code": "00100",
+            "city": "Helsinki",
+        },
+        "phones": ["0412345678", "358 503334411"],
+        **kwargs,
+    }
+
+
+def _import(tmp_path, customers, *args):
+    input_file = tmp_path / "customers.json"
+    input_file.write_text(json.dumps(customers))
+    output_file = tmp_path / "export.json"
+    call_command(
+        "import_customer_data",
+        str(input_file),
+        str(output_file),
+        *args,
+        stderr=StringIO(),
+    )
+    return json.loads(output_file.read_text())
+
+
+def test_imports_the_customers_and_writes_the_mapping(tmp_path, service):
+    result = _import(
+        tmp_path,
+        [_customer("1"), _customer("2", ssn="", address=None, phones=[])],
+        "--service",
+        service.name,
+    )
+
+    assert set(result) == {"1", "2"}
+    profile = Profile.objects.get(pk=result["1"])
+    assert (profile.first_name, profile.last_name) == ("Jukka", "Virtanen")
+    assert profile.sensitivedata.ssn == "010190-001A"
+    assert profile.emails.get().email == "customer1@example.com"
+    assert profile.addresses.get().city == "Helsinki"
+    assert [(phone.phone, phone.primary) for phone in profile.phones.all()] == [
+        ("0412345678", True),
+        ("358 503334411", False),
+    ]
+    assert not Profile.objects.get(pk=result["2"]).phones.exists()
+    for profile in Profile.objects.all():
+        service_connection = profile.service_connections.get()
+        assert service_connection.service == service
+        assert not service_connection.enabled
+
+
+def test_batches_before_a_failing_batch_stay_imported(tmp_path, mocker):
+    create_customers = customer_import.create_customers
+
+    def fail_second_batch(batch, service):
+        if batch[0][0] == 2:
+            raise Exception("Could not import customers, indexes: 2-2")
+        return create_customers(batch, service)
+
+    mocker.patch(
+        "profiles.customer_import.create_customers", side_effect=fail_second_batch
+    )
+
+    with pytest.raises(CommandError, match="indexes: 2-2"):
+        _import(
+            tmp_path,
+            [_customer("1"), _customer("2"), _customer("3")],
+            "--batch-size",
+            "2",
+        )
+
+    result = json.loads((tmp_path / "export.json").read_text())
+    assert set(result) == {"1", "2"}
+    assert {str(pk) for pk in Profile.objects.values_list("pk", flat=True)} == set(
+        result.values()
+    )
+
+
+def test_nothing_is_imported_when_some_customers_are_invalid(tmp_path):
+    customers = [
+        _customer("1", email="invalid"),
+        _customer("2"),
+        _customer("3", ssn="123", address={"postal_code": "1234"}),
+    ]
+    (tmp_path / "customers.json").write_text(json.dumps(customers))
+    stderr = StringIO()
+
+    with pytest.raises(CommandError, match="Invalid data in 2 customers"):
+        call_command(
+            "import_customer_data",
+            str(tmp_path / "customers.json"),
+            str(tmp_path / "export.json"),
+            stderr=stderr,
+        )
+
+    first_error, second_error = stderr.getvalue().splitlines()
+    assert first_error.startswith("Index 0, customer_id 1: email: ")
+    assert second_error.startswith("Index 2, customer_id 3: ssn: ")
+    assert "; address.postal_code: " in second_error
+    assert not Profile.objects.exists()
+
+
+def test_imported_profiles_are_audit_logged(settings, tmp_path):
+    settings.AUDIT_LOG_TO_DB_ENABLED = True
+
+    result = _import(tmp_path, [_customer("1")])
+
+    assert sorted(
+        LogEntry.objects.filter(target_profile_id=result["1"]).values_list(
+            "operation", "target_type", "actor_role"
+        )
+    ) == sorted(
+        ("CREATE", target_type, "SYSTEM")
+        for target_type in (
+            "base profile",
+            "sensitive data",
+            "email",
+            "address",
+            "phone",
+        )
+    )
@@ -0,0 +1,29 @@
+import pytest
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+
+from audit_log.models import LogEntry
+from profiles.models import (
+    Email,
+    Profile,
+    ProfileDeletionCheckpoint,
+    VerifiedPersonalInformationPermanentAddress,
+)
+from services.models import Service, ServiceConnection
+from users.models import User
+
+SIGNALS = [pre_delete, post_delete, post_init, post_save]
+
+
+@pytest.mark.parametrize(
+    "model", [Profile, Email, VerifiedPersonalInformationPermanentAddress]
+)
+def test_audited_models_have_audit_log_receivers(model):
+    assert all(signal.has_listeners(model) for signal in SIGNALS)
+
+
+@pytest.mark.parametrize(
+    "model",
+    [LogEntry, Service, ServiceConnection, User, ProfileDeletionCheckpoint],
+)
+def test_other_models_have_no_post_init_receivers(model):
+    assert not post_init.has_listeners(model)
@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 
 app = "profiles"
@@ -161,3 +163,45 @@ def test_phone_number_to_not_null_migration(execute_migration_test):
         create_data,
         verify_migration,
     )
+
+
+def test_blind_indexes_migration(execute_migration_test):
+    def create_data(apps):
+        Profile = apps.get_model(app, "Profile")
+        VerifiedPersonalInformation = apps.get_model(app, "VerifiedPersonalInformation")
+        VerifiedPersonalInformationPermanentAddress = apps.get_model(
+            app, "VerifiedPersonalInformationPermanentAddress"
+        )
+        vpi = VerifiedPersonalInformation.objects.create(
+            profile=Profile.objects.create(id=uuid.uuid4()),
+            municipality_of_residence_number="091",
+        )
+        VerifiedPersonalInformationPermanentAddress.objects.create(
+            verified_personal_information=vpi, postal_code="00100"
+        )
+        VerifiedPersonalInformation.objects.create(
+            profile=Profile.objects.create(id=uuid.uuid4())
+        )
+
+    def verify_migration(apps):
+        VerifiedPersonalInformation = apps.get_model(app, "VerifiedPersonalInformation")
+        VerifiedPersonalInformationPermanentAddress = apps.get_model(
+            app, "VerifiedPersonalInformationPermanentAddress"
+        )
+        vpi = VerifiedPersonalInformation.objects.get(
+            municipality_of_residence_number_index="091"
+        )
+        address = VerifiedPersonalInformationPermanentAddress.objects.get(
+            postal_code_index="00100"
+        )
+        assert address.verified_personal_information_id == vpi.pk
+        assert VerifiedPersonalInformation.objects.filter(
+            municipality_of_residence_number_index__isnull=True
+        ).exists()
+
+    execute_migration_test(
+        "0060_alter_sensitivedata_ssn",
+        "0061_add_blind_indexes",
+        create_data,
+        verify_migration,
+    )
@@ -7,6 +7,7 @@ from django.test import override_settings
 
 from services.tests.factories import ServiceConnectionFactory
 
+from ..customer_import import InvalidCustomerDataError
 from ..models import Email, Profile, TemporaryReadAccessToken
 from .factories import (
     AddressFactory,
@@ -287,6 +288,46 @@ def test_serialize_profile(profile):
     assert serialized_profile == expected_serialized_profile
 
 
+def test_serialize_profile_without_related_objects(profile):
+    serialized_profile = profile.serialize()
+
+    assert serialized_profile == {
+        "key": "PROFILE",
+        "children": [
+            {"key": "FIRST_NAME", "value": profile.first_name},
+            {"key": "LAST_NAME", "value": profile.last_name},
+            {"key": "NICKNAME", "value": profile.nickname},
+            {"key": "LANGUAGE", "value": profile.language},
+            {"key": "CONTACT_METHOD", "value": profile.contact_method},
+            {"key": "EMAILS", "children": []},
+            {"key": "PHONES", "children": []},
+            {"key": "ADDRESSES", "children": []},
+            {"key": "SERVICE_CONNECTIONS", "children": []},
+        ],
+    }
+
+
+def test_profile_loaded_for_serialization_is_serialized_from_memory(
+    profile, django_assert_num_queries
+):
+    for factory in (EmailFactory, PhoneFactory, AddressFactory):
+        factory(profile=profile, primary=True)
+        factory(profile=profile, primary=False)
+    SensitiveDataFactory(profile=profile)
+    VerifiedPersonalInformationFactory(profile=profile)
+    ServiceConnectionFactory.create_batch(2, profile=profile)
+    expected_serialized_profile = children_lists_to_unordered(profile.serialize())
+
+    with django_assert_num_queries(5):
+        loaded_profile = Profile.objects.for_serialization().get(pk=profile.pk)
+    with django_assert_num_queries(0):
+        serialized_profile = loaded_profile.serialize()
+
+    assert children_lists_to_unordered(serialized_profile) == (
+        expected_serialized_profile
+    )
+
+
 def test_import_customer_data_with_valid_data_set(service):
     data = [
         {
@@ -372,6 +413,24 @@ def test_import_customer_data_with_missing_email():
     assert Profile.objects.count() == 1
 
 
+def test_import_customer_data_reports_all_invalid_customers():
+    data = [
+        {"customer_id": "1", "ssn": "010190-001A"},
+        {"customer_id": "2", "ssn": "invalid"},
+        {"customer_id": "3", "phones": [""], "address": {"postal_code": "001"}},
+    ]
+
+    with pytest.raises(InvalidCustomerDataError) as e:
+        Profile.import_customer_data(data, "")
+
+    assert str(e.value) == "Could not import customer_id: 2, index: 1"
+    assert [(error["index"], set(error["errors"])) for error in e.value.errors] == [
+        (1, {"ssn"}),
+        (2, {"phones", "address.postal_code"}),
+    ]
+    assert Profile.objects.count() == 0
+
+
 def test_validation_should_fail_with_invalid_email():
     e = Email("!dsdsd{}{}{}{}{}{")
     with pytest.raises(ValidationError):
@@ -5,6 +5,7 @@ from django.utils.translation import gettext_lazy as _
 from guardian.admin import GuardedModelAdmin
 from parler.admin import TranslatableAdmin
 
+from . import circuit_breaker
 from .enums import ServiceIdp
 from .models import AllowedDataField, Service, ServiceClientId, ServiceConnection
 
@@ -65,6 +66,7 @@ class ServiceAdmin(TranslatableAdmin, GuardedModelAdmin):
         "_client_ids",
         "idp",
         "_gdpr",
+        "_gdpr_api_health",
     )
     list_filter = (AllowedDataFieldsFilter, IdpFilter)
     search_fields = (
@@ -75,6 +77,7 @@ class ServiceAdmin(TranslatableAdmin, GuardedModelAdmin):
     ordering = ("name",)
 
     inlines = [ServiceClientIdInline]
+    actions = ["reset_gdpr_api_circuit_breaker"]
 
     @admin.display(description=str(Service._meta.verbose_name))
     def indicate_profile_service(self, obj):
@@ -102,6 +105,25 @@ class ServiceAdmin(TranslatableAdmin, GuardedModelAdmin):
             and keycloak_ok
         )
 
+    @admin.display(description=_("GDPR API health"))
+    def _gdpr_api_health(self, obj):
+        if not obj.gdpr_url:
+            return "-"
+
+        health = circuit_breaker.get_health(obj)
+        return format_html(
+            '<span title="{}">{}</span>',
+            _("Failure rate {rate:.0%}, average latency {latency:.2f} s").format(
+                rate=health.failure_rate, latency=health.average_latency
+            ),
+            health.state,
+        )
+
+    @admin.action(description=_("Reset GDPR API circuit breaker"))
+    def reset_gdpr_api_circuit_breaker(self, request, queryset):
+        for service in queryset:
+            circuit_breaker.reset_health(service)
+
     def get_fieldsets(self, request, obj=None):
         fieldsets = [
             (
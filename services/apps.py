@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class ServicesConfig(AppConfig):
     name = "services"
+
+    def ready(self):
+        from open_city_profile.metrics import register_shared_collector
+
+        from .circuit_breaker import CircuitBreakerCollector
+
+        register_shared_collector(CircuitBreakerCollector())
@@ -0,0 +1,297 @@
+"""Health tracking and circuit breaking for the GDPR APIs of the services.
+
+The health of every Service's GDPR API is tracked in the Django cache. The worker
+processes share the same view of it only if the cache is shared, e.g. Redis or
+Memcached. With the default local memory cache every process has a circuit
+breaker of its own. When a GDPR API fails repeatedly, the circuit is opened and
+requests to it fail fast instead of waiting for the request timeout. After a
+cooldown period the circuit becomes half-open and the API is probed in the
+background. A successful probe closes the circuit again.
+"""
+
+import logging
+import string
+import threading
+import time
+import urllib.parse
+import uuid
+from dataclasses import dataclass
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Counter
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_HALF_OPEN = "half_open"
+STATE_OPEN = "open"
+
+_STATE_METRIC_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+_PROBE_TIMEOUT = 5
+_PROBE_UUID = uuid.UUID(int=0)
+# Upper bound for how long a probe can run, after which another probe can start
+_PROBE_LOCK_TIMEOUT = 4 * _PROBE_TIMEOUT
+
+rejected_requests_counter = Counter(
+    "gdpr_api_circuit_breaker_rejected_requests",
+    "Number of GDPR API requests that were not made because the circuit was open",
+    ["service"],
+)
+
+
+@dataclass
+class GdprApiHealth:
+    state: str = STATE_CLOSED
+    consecutive_failures: int = 0
+    request_count: int = 0
+    failure_count: int = 0
+    average_latency: float = 0.0
+    opened_at: float | None = None
+
+    @property
+    def failure_rate(self):
+        if not self.request_count:
+            return 0.0
+        return self.failure_count / self.request_count
+
+
+# The counters are kept in keys of their own and updated with cache.incr, so that
+# concurrent requests don't overwrite each other's updates
+_COUNTERS = ("consecutive_failures", "request_count", "failure_count")
+
+
+def _cache_key(service_id, name="state"):
+    return f"gdpr_api_health:{service_id}:{name}"
+
+
+def _cache_keys(service_id):
+    return {
+        name: _cache_key(service_id, name)
+        for name in ("state", *_COUNTERS, "average_latency")
+    }
+
+
+def _get_health(service_id) -> GdprApiHealth:
+    keys = _cache_keys(service_id)
+    values = cache.get_many(keys.values())
+    health = GdprApiHealth(**values.get(keys.pop("state"), {}))
+    for name, key in keys.items():
+        if key in values:
+            setattr(health, name, values[key])
+    return health
+
+
+def get_health(service) -> GdprApiHealth:
+    return _get_health(service.pk)
+
+
+def _save_state(service_id, health: GdprApiHealth):
+    cache.set(
+        _cache_key(service_id),
+        {"state": health.state, "opened_at": health.opened_at},
+        timeout=None,
+    )
+
+
+def _increment(service_id, name):
+    key = _cache_key(service_id, name)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Deleted by a reset in between
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def _reset_consecutive_failures(service_id):
+    cache.set(_cache_key(service_id, "consecutive_failures"), 0, timeout=None)
+
+
+def reset_health(service):
+    cache.delete_many(_cache_keys(service.pk).values())
+
+
+def _probe_lock_key(service_id):
+    return f"gdpr_api_probe_lock:{service_id}"
+
+
+def _probe_is_due(health):
+    """A probe is due when the reset timeout has passed since the circuit was
+    opened. A half-open circuit is probed again in case its probe was lost, e.g.
+    because the process running it exited."""
+    return (
+        health.state in (STATE_OPEN, STATE_HALF_OPEN)
+        and time.time() - health.opened_at
+        >= settings.GDPR_API_CIRCUIT_BREAKER_RESET_TIMEOUT
+    )
+
+
+def _probe_url(gdpr_url):
+    """Returns the GDPR API URL of a profile that doesn't exist.
+
+    The URL is built from the template like the URLs of real profiles, with a nil
+    UUID as the profile id and the user uuid.
+    """
+    url = string.Template(gdpr_url).safe_substitute(
+        profile_id=_PROBE_UUID, user_uuid=_PROBE_UUID
+    )
+    if url == gdpr_url:
+        url = urllib.parse.urljoin(gdpr_url, str(_PROBE_UUID))
+    return url
+
+
+def probe(service_id, service_name, gdpr_url):
+    """Check if the GDPR API responds at all and close or re-open the circuit.
+
+    The probe request is made to the GDPR API itself, without authorization, so
+    a response such as 401 or 404 is expected. Any response that is not a server
+    error is considered a sign of life. The probe lock taken in `allow_request`
+    is released when done.
+    """
+    try:
+        response = requests.head(_probe_url(gdpr_url), timeout=_PROBE_TIMEOUT)
+        alive = response.status_code < 500
+    except requests.RequestException:
+        alive = False
+
+    health = _get_health(service_id)
+    if alive:
+        logger.info("GDPR API of service %s recovered, closing circuit", service_name)
+        health.state = STATE_CLOSED
+        health.opened_at = None
+        _reset_consecutive_failures(service_id)
+    else:
+        logger.warning("GDPR API of service %s still failing", service_name)
+        health.state = STATE_OPEN
+        health.opened_at = time.time()
+    _save_state(service_id, health)
+    cache.delete(_probe_lock_key(service_id))
+
+
+def _start_probe(service):
+    threading.Thread(
+        target=probe,
+        args=(service.pk, service.name, service.gdpr_url),
+        name=f"gdpr-api-probe-{service.pk}",
+        daemon=True,
+    ).start()
+
+
+def allow_request(service) -> bool:
+    """Return True if a request can be made to the service's GDPR API."""
+    if not settings.GDPR_API_CIRCUIT_BREAKER_ENABLED:
+        return True
+
+    health = get_health(service)
+    if health.state == STATE_CLOSED:
+        return True
+
+    # The lock makes sure that only one request starts the probe, also when
+    # several processes see the probe being due at the same time.
+    if _probe_is_due(health) and cache.add(
+        _probe_lock_key(service.pk), True, timeout=_PROBE_LOCK_TIMEOUT
+    ):
+        health = get_health(service)
+        if _probe_is_due(health):
+            health.state = STATE_HALF_OPEN
+            _save_state(service.pk, health)
+            _start_probe(service)
+        else:
+            cache.delete(_probe_lock_key(service.pk))
+
+    logger.warning(
+        "Circuit for GDPR API of service %s is %s, not making a request",
+        service.name,
+        health.state,
+    )
+    rejected_requests_counter.labels(service=service.name).inc()
+    return False
+
+
+def _record_latency(service_id, request_count, latency):
+    key = _cache_key(service_id, "average_latency")
+    if request_count == 1:
+        average_latency = latency
+    else:
+        # Exponentially weighted moving average. Concurrent updates may overwrite
+        # each other, which only makes the average a little less smooth.
+        average_latency = 0.8 * cache.get(key, latency) + 0.2 * latency
+    cache.set(key, average_latency, timeout=None)
+
+
+def record_success(service, latency: float):
+    request_count = _increment(service.pk, "request_count")
+    _reset_consecutive_failures(service.pk)
+    _record_latency(service.pk, request_count, latency)
+
+
+def record_failure(service, latency: float):
+    request_count = _increment(service.pk, "request_count")
+    _increment(service.pk, "failure_count")
+    consecutive_failures = _increment(service.pk, "consecutive_failures")
+    _record_latency(service.pk, request_count, latency)
+
+    if consecutive_failures < settings.GDPR_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD:
+        return
+
+    health = get_health(service)
+    if health.state == STATE_CLOSED:
+        logger.error(
+            "GDPR API of service %s failed %s times in a row, opening circuit",
+            service.name,
+            consecutive_failures,
+        )
+        health.state = STATE_OPEN
+        health.opened_at = time.time()
+        _save_state(service.pk, health)
+
+
+class CircuitBreakerCollector:
+    """Exposes the circuit states of all services with a GDPR API as metrics.
+
+    The states are read from the cache on collection, so the metric is the same
+    regardless of which worker process serves the metrics request, as long as the
+    cache is shared.
+    """
+
+    def _metric_families(self):
+        state_gauge = GaugeMetricFamily(
+            "gdpr_api_circuit_breaker_state",
+            "Circuit state of the GDPR API (0 = closed, 1 = half open, 2 = open)",
+            labels=["service"],
+        )
+        failure_rate_gauge = GaugeMetricFamily(
+            "gdpr_api_failure_rate",
+            "Ratio of failed GDPR API requests",
+            labels=["service"],
+        )
+        latency_gauge = GaugeMetricFamily(
+            "gdpr_api_average_latency_seconds",
+            "Moving average of GDPR API request latency",
+            labels=["service"],
+        )
+        return state_gauge, failure_rate_gauge, latency_gauge
+
+    def describe(self):
+        """Describes the metrics without reading the services from the database,
+        so that registering the collector doesn't need a database."""
+        return list(self._metric_families())
+
+    def collect(self):
+        from services.models import Service
+
+        state_gauge, failure_rate_gauge, latency_gauge = self._metric_families()
+        for service in Service.objects.exclude(gdpr_url="").only("id", "name"):
+            health = get_health(service)
+            state_gauge.add_metric([service.name], _STATE_METRIC_VALUES[health.state])
+            failure_rate_gauge.add_metric([service.name], health.failure_rate)
+            latency_gauge.add_metric([service.name], health.average_latency)
+
+        yield state_gauge
+        yield failure_rate_gauge
+        yield latency_gauge
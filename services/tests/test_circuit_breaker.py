@@ -0,0 +1,206 @@
+import threading
+import time
+
+import pytest
+import requests
+from django.core.cache import cache
+
+from services import circuit_breaker
+
+GDPR_URL = "https://example.com/gdpr/$profile_id"
+PROBE_URL = "https://example.com/gdpr/00000000-0000-0000-0000-000000000000"
+
+
+@pytest.fixture
+def service(service_factory):
+    return service_factory(gdpr_url=GDPR_URL)
+
+
+@pytest.fixture(autouse=True)
+def circuit_breaker_settings(settings):
+    settings.GDPR_API_CIRCUIT_BREAKER_ENABLED = True
+    settings.GDPR_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 3
+    settings.GDPR_API_CIRCUIT_BREAKER_RESET_TIMEOUT = 60
+
+
+@pytest.fixture
+def start_probe(mocker):
+    return mocker.patch.object(circuit_breaker, "_start_probe")
+
+
+def _fail(service, times):
+    for _i in range(times):
+        circuit_breaker.record_failure(service, 0.1)
+
+
+def test_requests_are_allowed_for_a_new_service(service):
+    assert circuit_breaker.allow_request(service)
+    assert circuit_breaker.get_health(service).state == circuit_breaker.STATE_CLOSED
+
+
+def test_circuit_opens_after_consecutive_failures(service):
+    _fail(service, 2)
+    assert circuit_breaker.allow_request(service)
+
+    _fail(service, 1)
+    assert not circuit_breaker.allow_request(service)
+    assert circuit_breaker.get_health(service).state == circuit_breaker.STATE_OPEN
+
+
+def test_success_resets_consecutive_failures(service):
+    _fail(service, 2)
+    circuit_breaker.record_success(service, 0.1)
+    _fail(service, 2)
+
+    assert circuit_breaker.allow_request(service)
+    health = circuit_breaker.get_health(service)
+    assert health.request_count == 5
+    assert health.failure_rate == pytest.approx(0.8)
+
+
+class _SlowReadCache:
+    """Lets the other threads run between reading and updating the cache."""
+
+    def __getattr__(self, name):
+        return getattr(cache, name)
+
+    def get(self, *args, **kwargs):
+        value = cache.get(*args, **kwargs)
+        time.sleep(0.001)
+        return value
+
+    def get_many(self, *args, **kwargs):
+        values = cache.get_many(*args, **kwargs)
+        time.sleep(0.001)
+        return values
+
+
+def test_concurrent_failures_are_all_counted(service, settings, mocker):
+    settings.GDPR_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 50
+    mocker.patch.object(circuit_breaker, "cache", _SlowReadCache())
+    threads = [threading.Thread(target=_fail, args=(service, 5)) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    health = circuit_breaker.get_health(service)
+    assert (health.consecutive_failures, health.request_count) == (50, 50)
+    assert health.state == circuit_breaker.STATE_OPEN
+
+
+def test_circuit_breaker_can_be_disabled(service, settings):
+    settings.GDPR_API_CIRCUIT_BREAKER_ENABLED = False
+    _fail(service, 3)
+
+    assert circuit_breaker.allow_request(service)
+
+
+def test_open_circuit_is_probed_after_reset_timeout(service, start_probe, mocker):
+    _fail(service, 3)
+    assert not circuit_breaker.allow_request(service)
+    start_probe.assert_not_called()
+
+    opened_at = circuit_breaker.get_health(service).opened_at
+    mocker.patch.object(circuit_breaker.time, "time", return_value=opened_at + 60)
+
+    assert not circuit_breaker.allow_request(service)
+    start_probe.assert_called_once_with(service)
+    assert circuit_breaker.get_health(service).state == circuit_breaker.STATE_HALF_OPEN
+
+    assert not circuit_breaker.allow_request(service)
+    start_probe.assert_called_once()
+
+
+def test_only_one_probe_is_started_while_the_probe_lock_is_held(
+    service, start_probe, mocker
+):
+    _fail(service, 3)
+    opened_at = circuit_breaker.get_health(service).opened_at
+    mocker.patch.object(circuit_breaker.time, "time", return_value=opened_at + 60)
+    cache.add(circuit_breaker._probe_lock_key(service.pk), True)
+
+    assert not circuit_breaker.allow_request(service)
+    start_probe.assert_not_called()
+    assert circuit_breaker.get_health(service).state == circuit_breaker.STATE_OPEN
+
+
+def test_probe_releases_the_probe_lock(service, start_probe, requests_mock, mocker):
+    _fail(service, 3)
+    opened_at = circuit_breaker.get_health(service).opened_at
+    mocker.patch.object(circuit_breaker.time, "time", return_value=opened_at + 60)
+    requests_mock.head(PROBE_URL, status_code=503)
+    assert not circuit_breaker.allow_request(service)
+
+    circuit_breaker.probe(service.pk, service.name, service.gdpr_url)
+    mocker.patch.object(circuit_breaker.time, "time", return_value=opened_at + 120)
+
+    assert not circuit_breaker.allow_request(service)
+    assert start_probe.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "gdpr_url,probe_url",
+    [
+        (GDPR_URL, PROBE_URL),
+        (
+            "https://example.com/gdpr/${user_uuid}/data",
+            "https://example.com/gdpr/00000000-0000-0000-0000-000000000000/data",
+        ),
+        ("https://example.com/gdpr/", PROBE_URL),
+    ],
+)
+def test_probe_requests_the_gdpr_api(gdpr_url, probe_url, service, requests_mock):
+    requests_mock.head(probe_url, status_code=401)
+
+    circuit_breaker.probe(service.pk, service.name, gdpr_url)
+
+    assert requests_mock.last_request.url == probe_url
+    assert circuit_breaker.get_health(service).state == circuit_breaker.STATE_CLOSED
+
+
+@pytest.mark.parametrize(
+    "probe_response,expected_state",
+    [
+        ({"status_code": 404}, circuit_breaker.STATE_CLOSED),
+        ({"status_code": 503}, circuit_breaker.STATE_OPEN),
+        ({"exc": requests.exceptions.ConnectTimeout}, circuit_breaker.STATE_OPEN),
+    ],
+)
+def test_probe_closes_or_reopens_the_circuit(
+    probe_response, expected_state, service, requests_mock
+):
+    _fail(service, 3)
+    requests_mock.head(PROBE_URL, **probe_response)
+
+    circuit_breaker.probe(service.pk, service.name, service.gdpr_url)
+
+    assert circuit_breaker.get_health(service).state == expected_state
+
+
+def test_collector_exposes_circuit_states(service, service_factory):
+    service_factory(gdpr_url="")
+    _fail(service, 3)
+
+    metrics = {
+        metric.name: metric.samples
+        for metric in circuit_breaker.CircuitBreakerCollector().collect()
+    }
+
+    state_samples = metrics["gdpr_api_circuit_breaker_state"]
+    assert len(state_samples) == 1
+    assert state_samples[0].labels == {"service": service.name}
+    assert state_samples[0].value == 2
+
+
+def test_collector_describes_the_metrics_without_database_access(
+    django_assert_num_queries,
+):
+    with django_assert_num_queries(0):
+        described = circuit_breaker.CircuitBreakerCollector().describe()
+
+    assert [metric.name for metric in described] == [
+        "gdpr_api_circuit_breaker_state",
+        "gdpr_api_failure_rate",
+        "gdpr_api_average_latency_seconds",
+    ]
@@ -1,8 +1,12 @@
 import hashlib
 
+from django.core.exceptions import ImproperlyConfigured
 from django.db import models
+from django.db.models.query_utils import DeferredAttribute
 from encrypted_fields import fields
 
+_MISSING = object()
+
 
 class NullToEmptyValueMixin(models.Field):
     def to_python(self, value):
@@ -19,9 +23,90 @@ class NullToEmptyValueMixin(models.Field):
         return value
 
 
+class EncryptedValue:
+    """A value of an encrypted field that hasn't been decrypted yet."""
+
+    __slots__ = ("ciphertext",)
+
+    def __init__(self, ciphertext):
+        self.ciphertext = ciphertext
+
+    def __repr__(self):
+        return "<EncryptedValue>"
+
+
+class LazyDecryptionDescriptor(DeferredAttribute):
+    # A data descriptor, so that reads from the instance come here even when the
+    # value is in the instance's __dict__
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+
+        value = super().__get__(instance, cls)
+        if isinstance(value, EncryptedValue):
+            value = self.field.decrypt_value(value)
+            instance.__dict__[self.field.attname] = value
+
+        return value
+
+
+class LazyDecryptionMixin(models.Field):
+    """Decrypts the value loaded from the database only when it's first read
+
+    Until then the instance holds the value as an EncryptedValue, which is also
+    written back to the database as is if the instance is saved.
+
+    values() and values_list() return the EncryptedValue too, also when reading
+    the field through a relation. The converter can't tell those queries apart
+    from the ones loading model instances. The values must be decrypted with
+    `decrypt_value` before they're compared or serialized.
+    """
+
+    descriptor_class = LazyDecryptionDescriptor
+
+    def decrypt_value(self, value):
+        """Returns the decrypted value of an EncryptedValue, other values as is."""
+        if isinstance(value, EncryptedValue):
+            return self.to_python(self.decrypt(value.ciphertext))
+        return value
+
+    def from_db_value(self, value, expression, connection):
+        if value is not None:
+            return EncryptedValue(bytes(value))
+
+    def pre_save(self, model_instance, add):
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, EncryptedValue):
+            return value
+        return super().pre_save(model_instance, add)
+
+    def get_db_prep_save(self, value, connection):
+        if isinstance(value, EncryptedValue):
+            return connection.Database.Binary(value.ciphertext)
+        return super().get_db_prep_save(value, connection)
+
+
+class LazyDecryptionSearchFieldDescriptor(fields.SearchFieldDescriptor):
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        # Reads the encrypted field through its own descriptor, which decrypts
+        # the value and loads it if it has been deferred
+        decrypted_data = getattr(instance, self.field.encrypted_field_name)
+        setattr(instance, self.field.name, decrypted_data)
+
+        return instance.__dict__[self.field.name]
+
+
 class CallableHashKeyEncryptedSearchField(fields.SearchField):
     """encrypted_fields.fields.SearchField but modified to support callable hash_key"""
 
+    descriptor_class = LazyDecryptionSearchFieldDescriptor
+
     def get_prep_value(self, value):
         if value is None:
             return value
@@ -33,23 +118,92 @@ class CallableHashKeyEncryptedSearchField(fields.SearchField):
             # if we have hashed this previously, don't do it again
             return value
 
-        # Callable hash key custom code start
-        if callable(self.hash_key):
-            hash_key = self.hash_key()
-        else:
-            hash_key = self.hash_key
-        # Callable hash key custom code end
+        return keyed_hash(value, self.hash_key)
+
+
+def keyed_hash(value, hash_key):
+    """Returns the keyed hash of the value in the format used by the search fields.
+    The hash key can be given as a callable."""
+    if callable(hash_key):
+        hash_key = hash_key()
+
+    v = str(value) + hash_key
+    return fields.SEARCH_HASH_PREFIX + hashlib.sha256(v.encode()).hexdigest()
+
+
+class BlindIndexField(models.CharField):
+    """Keyed hash of the value of an encrypted field in the same model
+
+    Allows exact match lookups of the encrypted values with a database index:
+    filtering by this field hashes the searched value the same way. The hash is
+    updated from the source field when the model instance is saved, so
+    update(), bulk_update() and save(update_fields=...) must not change the
+    source field without this field. Empty values are not hashed.
+
+    Unlike with the search fields, the source field stays a regular encrypted
+    field, and the name of the source field is included in the hash, so equal
+    values in different fields have different hashes.
+    """
 
-        v = value + hash_key
-        return fields.SEARCH_HASH_PREFIX + hashlib.sha256(v.encode()).hexdigest()
+    def __init__(self, *args, hash_key=None, source_field_name=None, **kwargs):
+        if hash_key is None or source_field_name is None:
+            raise ImproperlyConfigured(
+                "BlindIndexField requires hash_key and source_field_name"
+            )
+        self.hash_key = hash_key
+        self.source_field_name = source_field_name
+
+        kwargs.setdefault("db_index", True)
+        kwargs["max_length"] = 64 + len(fields.SEARCH_HASH_PREFIX)
+        kwargs["null"] = True
+        kwargs["blank"] = True
+        kwargs["editable"] = False
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        for fixed in ("max_length", "null", "blank", "editable"):
+            kwargs.pop(fixed, None)
+        kwargs["hash_key"] = self.hash_key
+        kwargs["source_field_name"] = self.source_field_name
+        return name, path, args, kwargs
+
+    def get_prep_value(self, value):
+        if value in (None, "") or fields.is_hashed_already(value):
+            return value or None
+
+        return keyed_hash(f"{self.source_field_name}:{value}", self.hash_key)
+
+    def pre_save(self, model_instance, add):
+        source_value = model_instance.__dict__.get(self.source_field_name, _MISSING)
+        if source_value is _MISSING or isinstance(source_value, EncryptedValue):
+            # The source value is deferred or hasn't been read since it was loaded,
+            # so it hasn't changed and there's no need to decrypt it
+            return getattr(model_instance, self.attname)
+
+        hashed_sources = model_instance.__dict__.setdefault("_blind_index_sources", {})
+        if hashed_sources.get(self.attname, _MISSING) == source_value:
+            return getattr(model_instance, self.attname)
+
+        value = self.get_prep_value(source_value)
+        setattr(model_instance, self.attname, value)
+        hashed_sources[self.attname] = source_value
+        return value
 
 
 class NullToEmptyCharField(NullToEmptyValueMixin, models.CharField):
     """CharField with automatic null-to-empty-string functionality"""
 
 
-class NullToEmptyEncryptedCharField(NullToEmptyValueMixin, fields.EncryptedCharField):
-    """EncryptedCharField with automatic null-to-empty-string functionality"""
+class EncryptedCharField(LazyDecryptionMixin, fields.EncryptedCharField):
+    """EncryptedCharField that is decrypted lazily"""
+
+
+class NullToEmptyEncryptedCharField(
+    LazyDecryptionMixin, NullToEmptyValueMixin, fields.EncryptedCharField
+):
+    """Lazily decrypted EncryptedCharField with automatic null-to-empty-string
+    functionality"""
 
 
 class NullToEmptyEncryptedSearchField(
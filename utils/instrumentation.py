@@ -0,0 +1,68 @@
+"""Instrumentation of the outbound HTTP requests.
+
+Every outbound request is timed into a Prometheus histogram and recorded as a
+span in the Sentry trace of the request being served.
+"""
+
+import time
+
+import requests
+import sentry_sdk
+from prometheus_client import Counter, Histogram
+
+OPERATION_QUERY = "query"
+OPERATION_DELETE = "delete"
+OPERATION_DRY_RUN = "dry_run"
+OPERATION_TOKEN_EXCHANGE = "token_exchange"
+OPERATION_ADMIN_API = "admin_api"
+
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+
+request_duration_histogram = Histogram(
+    "outbound_http_request_duration_seconds",
+    "Duration of outbound HTTP requests",
+    ["service", "operation", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+request_timeouts_counter = Counter(
+    "outbound_http_request_timeouts",
+    "Number of outbound HTTP requests that timed out",
+    ["service", "operation"],
+)
+
+
+def instrumented_request(service, operation, send, /, *args, **kwargs):
+    """Calls `send(*args, **kwargs)` and records the request it makes.
+
+    `service` is the name of the called service and `operation` one of the
+    OPERATION_* constants. `send` is a callable, such as `requests.get`, that
+    makes a single HTTP request and usually returns the response. If it returns
+    something else, such as the token from `OAuth2Session.fetch_token`, the
+    status is recorded as "ok". Exceptions raised by `send` are passed on and
+    recorded as "error" or "timeout".
+    """
+    with sentry_sdk.start_span(op="http.client", name=f"{operation} {service}") as span:
+        span.set_tag("service", service)
+        span.set_tag("operation", operation)
+
+        status = STATUS_ERROR
+        started_at = time.monotonic()
+        try:
+            result = send(*args, **kwargs)
+            if isinstance(result, requests.Response):
+                status = str(result.status_code)
+                span.set_http_status(result.status_code)
+            else:
+                status = STATUS_OK
+            return result
+        except requests.Timeout:
+            status = STATUS_TIMEOUT
+            request_timeouts_counter.labels(service=service, operation=operation).inc()
+            span.set_status("deadline_exceeded")
+            raise
+        finally:
+            request_duration_histogram.labels(
+                service=service, operation=operation, status=status
+            ).observe(time.monotonic() - started_at)
@@ -2,6 +2,11 @@ import requests
 from django.utils.functional import cached_property
 
 from utils.auth import BearerAuth
+from utils.instrumentation import (
+    OPERATION_ADMIN_API,
+    OPERATION_TOKEN_EXCHANGE,
+    instrumented_request,
+)
 
 
 class KeycloakError(RuntimeError):
@@ -66,7 +71,13 @@ class KeycloakAdminClient:
         well_known_url = f"{self._server_url}/realms/{self._realm_name}/.well-known/openid-configuration"  # noqa: E501
 
         result = self._handle_request_common_errors(
-            lambda: self._session.get(well_known_url, timeout=self._timeout)
+            lambda: instrumented_request(
+                "keycloak",
+                OPERATION_TOKEN_EXCHANGE,
+                self._session.get,
+                well_known_url,
+                timeout=self._timeout,
+            )
         )
 
         if not result.ok:
@@ -87,8 +98,13 @@ class KeycloakAdminClient:
             }
 
             result = self._handle_request_common_errors(
-                lambda: self._session.post(
-                    token_endpoint_url, data=credentials_request, timeout=self._timeout
+                lambda: instrumented_request(
+                    "keycloak",
+                    OPERATION_TOKEN_EXCHANGE,
+                    self._session.post,
+                    token_endpoint_url,
+                    data=credentials_request,
+                    timeout=self._timeout,
                 )
             )
 
@@ -120,7 +136,15 @@ class KeycloakAdminClient:
         kwargs.setdefault("timeout", self._timeout)
 
         response = self._handle_request_with_auth(
-            lambda auth: self._session.request(method, url, auth=auth, **kwargs)
+            lambda auth: instrumented_request(
+                "keycloak",
+                OPERATION_ADMIN_API,
+                self._session.request,
+                method,
+                url,
+                auth=auth,
+                **kwargs,
+            )
         )
 
         if validator:
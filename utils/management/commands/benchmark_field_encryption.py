@@ -0,0 +1,223 @@
+import secrets
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from profiles.models import (
+    Profile,
+    VerifiedPersonalInformation,
+    VerifiedPersonalInformationPermanentAddress,
+    get_national_identification_number_hash_key,
+)
+from utils.fields import (
+    CallableHashKeyEncryptedSearchField,
+    NullToEmptyEncryptedCharField,
+)
+from utils.reencryption import encrypted_fields, encrypted_models
+
+VPI_FIELDS = (
+    "given_name",
+    "national_identification_number",
+    "municipality_of_residence",
+    "municipality_of_residence_number",
+)
+ADDRESS_FIELDS = ("street_address", "postal_code", "post_office")
+
+
+@contextmanager
+def _encryption_keys(keys):
+    """Uses the given keys in all encrypted fields."""
+
+    def clear_cached_keys():
+        for model in encrypted_models():
+            for field in encrypted_fields(model):
+                field.__dict__.pop("keys", None)
+
+    original_keys = settings.FIELD_ENCRYPTION_KEYS
+    settings.FIELD_ENCRYPTION_KEYS = keys
+    clear_cached_keys()
+    try:
+        yield
+    finally:
+        settings.FIELD_ENCRYPTION_KEYS = original_keys
+        clear_cached_keys()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the throughput of encrypting and decrypting the values of an "
+        "encrypted field, of hashing the values of a search field, and the time "
+        "spent loading and saving verified personal information. The measurements "
+        "are repeated with different numbers of keys in FIELD_ENCRYPTION_KEYS, with "
+        "the values encrypted with the primary key and with the oldest key, which "
+        "is tried last. The test data is created in a transaction that is rolled "
+        "back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--key-counts",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8],
+            help="Numbers of keys to measure with. Default is 1 2 4 8.",
+        )
+        parser.add_argument("--values", type=int, default=10000)
+        parser.add_argument("--profiles", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    @staticmethod
+    def _measure(repeat, function):
+        timings = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started_at)
+        return min(timings)
+
+    def _write_rate(self, title, count, seconds):
+        self.stdout.write(f"  {title}: {count / seconds:,.0f} per second")
+
+    def _benchmark_field(self, keys, options):
+        count = options["values"]
+        plaintexts = [f"Value {index}" for index in range(count)]
+
+        with _encryption_keys(keys[-1:]):
+            field = NullToEmptyEncryptedCharField(max_length=100)
+            oldest_key_ciphertexts = [field.encrypt(value) for value in plaintexts]
+
+        with _encryption_keys(keys):
+            field = NullToEmptyEncryptedCharField(max_length=100)
+            primary_key_ciphertexts = [field.encrypt(value) for value in plaintexts]
+
+            self._write_rate(
+                "Encrypt",
+                count,
+                self._measure(
+                    options["repeat"],
+                    lambda: [field.encrypt(value) for value in plaintexts],
+                ),
+            )
+            for title, ciphertexts in [
+                ("Decrypt, primary key", primary_key_ciphertexts),
+                ("Decrypt, oldest key", oldest_key_ciphertexts),
+            ]:
+                self._write_rate(
+                    title,
+                    count,
+                    self._measure(
+                        options["repeat"],
+                        lambda ciphertexts=ciphertexts: [
+                            field.decrypt(value) for value in ciphertexts
+                        ],
+                    ),
+                )
+
+    def _benchmark_search_field(self, options):
+        count = options["values"]
+        values = [f"{index:06}-{index % 10000:04}" for index in range(count)]
+        field = CallableHashKeyEncryptedSearchField(
+            hash_key=get_national_identification_number_hash_key,
+            encrypted_field_name="insignificant",
+        )
+
+        self._write_rate(
+            "Search field hash",
+            count,
+            self._measure(
+                options["repeat"],
+                lambda: [field.get_prep_value(value) for value in values],
+            ),
+        )
+
+    @staticmethod
+    def _create_profiles(count):
+        profiles = Profile.objects.bulk_create(
+            [Profile(id=uuid.uuid4()) for _ in range(count)]
+        )
+        vpis = VerifiedPersonalInformation.objects.bulk_create(
+            [
+                VerifiedPersonalInformation(
+                    profile=profile,
+                    first_name="Bench",
+                    last_name="Mark",
+                    given_name="Bench",
+                    national_identification_number=f"010190-{index % 1000:03}A",
+                    municipality_of_residence="Helsinki",
+                    municipality_of_residence_number="091",
+                )
+                for index, profile in enumerate(profiles)
+            ]
+        )
+        VerifiedPersonalInformationPermanentAddress.objects.bulk_create(
+            [
+                VerifiedPersonalInformationPermanentAddress(
+                    verified_personal_information=vpi,
+                    street_address="Mannerheimintie 1",
+                    postal_code="00100",
+                    post_office="Helsinki",
+                )
+                for vpi in vpis
+            ]
+        )
+        return [vpi.pk for vpi in vpis]
+
+    @staticmethod
+    def _load(vpi_ids):
+        vpis = list(
+            VerifiedPersonalInformation.objects.filter(pk__in=vpi_ids).select_related(
+                "permanent_address"
+            )
+        )
+        for vpi in vpis:
+            for name in VPI_FIELDS:
+                getattr(vpi, name)
+            for name in ADDRESS_FIELDS:
+                getattr(vpi.permanent_address, name)
+        return vpis
+
+    def _benchmark_models(self, keys, options):
+        with transaction.atomic():
+            with _encryption_keys(keys[-1:]):
+                vpi_ids = self._create_profiles(options["profiles"])
+
+            with _encryption_keys(keys):
+                load = self._measure(options["repeat"], lambda: self._load(vpi_ids))
+
+                def save():
+                    for vpi in self._load(vpi_ids):
+                        vpi.save()
+                        vpi.permanent_address.save()
+
+                # Every save re-encrypts the values with the primary key, so the
+                # saves are measured once, together with loading the data
+                save = self._measure(1, save)
+
+            transaction.set_rollback(True)
+
+        count = options["profiles"]
+        self.stdout.write(
+            f"  Verified personal information load: {load * 1000:.1f} ms "
+            f"for {count} profiles"
+        )
+        self.stdout.write(
+            f"  Verified personal information load and save: {save * 1000:.1f} ms "
+            f"for {count} profiles"
+        )
+
+    def handle(self, *args, **options):
+        if min(options["key_counts"]) < 1:
+            raise CommandError("--key-counts must be positive")
+
+        self.stdout.write("Independent of the keys:")
+        self._benchmark_search_field(options)
+
+        for key_count in options["key_counts"]:
+            keys = [secrets.token_hex(32) for _ in range(key_count)]
+            self.stdout.write(f"Keys: {key_count}")
+            self._benchmark_field(keys, options)
+            self._benchmark_models(keys, options)
@@ -0,0 +1,138 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.reencryption import (
+    Throttle,
+    plan_chunks,
+    primary_key_fingerprint,
+    run_reencryption,
+)
+
+PROGRESS_INTERVAL = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encrypts the values of all encrypted fields that aren't encrypted with "
+        "the primary key, the first one in FIELD_ENCRYPTION_KEYS. The rows are "
+        "processed in primary key ranges in worker processes, while the "
+        "application keeps running. The completed ranges can be recorded in a "
+        "checkpoint file, so that an interrupted run continues where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Size of the primary key range of one chunk. Default is 1000.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Record the completed chunks in FILE and skip the chunks that "
+            "are already recorded there",
+            metavar="FILE",
+        )
+        parser.add_argument(
+            "--max-rows-per-second",
+            type=float,
+            default=0,
+            help="Limit the rate of the processed rows. Default is no limit.",
+        )
+        parser.add_argument(
+            "--max-active-queries",
+            type=int,
+            default=0,
+            help="Wait before every chunk while the database has more active "
+            "queries than this. Default is no limit.",
+        )
+
+    @staticmethod
+    def _read_checkpoint(path, checkpoint):
+        if not os.path.exists(path):
+            return checkpoint
+        with open(path) as f:
+            stored = json.load(f)
+        if stored["key"] != checkpoint["key"]:
+            # The previous run used a different primary key, so it needs to be
+            # done again
+            return checkpoint
+        if stored["chunk_size"] != checkpoint["chunk_size"]:
+            raise CommandError(
+                f"The checkpoint was recorded with --chunk-size "
+                f"{stored['chunk_size']}"
+            )
+        return stored
+
+    @staticmethod
+    def _write_checkpoint(path, checkpoint):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _chunk_id(chunk):
+        return f"{chunk.model_label}:{chunk.start}"
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--workers and --chunk-size must be positive")
+        if not settings.FIELD_ENCRYPTION_KEYS:
+            raise CommandError("FIELD_ENCRYPTION_KEYS is not set")
+
+        checkpoint_path = options["checkpoint"]
+        checkpoint = {
+            "key": primary_key_fingerprint(),
+            "chunk_size": options["chunk_size"],
+            "done": [],
+        }
+        if checkpoint_path:
+            checkpoint = self._read_checkpoint(checkpoint_path, checkpoint)
+        done = set(checkpoint["done"])
+
+        chunks = [
+            chunk
+            for chunk in plan_chunks(options["chunk_size"])
+            if self._chunk_id(chunk) not in done
+        ]
+        self.stdout.write(f"{len(chunks)} chunks to process, {len(done)} done earlier")
+
+        throttle = Throttle(
+            max_rows_per_second=options["max_rows_per_second"],
+            max_active_queries=options["max_active_queries"],
+        )
+        processed = rows = reencrypted = 0
+        reported_at = time.monotonic()
+
+        for chunk, row_count, updated_count in run_reencryption(
+            chunks, throttle, workers=options["workers"]
+        ):
+            processed += 1
+            rows += row_count
+            reencrypted += updated_count
+
+            if checkpoint_path:
+                checkpoint["done"].append(self._chunk_id(chunk))
+                self._write_checkpoint(checkpoint_path, checkpoint)
+
+            if time.monotonic() - reported_at >= PROGRESS_INTERVAL:
+                reported_at = time.monotonic()
+                self.stdout.write(
+                    f"Processed {processed}/{len(chunks)} chunks, {rows} rows, "
+                    f"re-encrypted {reencrypted} rows"
+                )
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(
+            f"Done: processed {processed} chunks, {rows} rows, "
+            f"re-encrypted {reencrypted} rows"
+        )
@@ -3,6 +3,10 @@ import uuid
 from django.db import models
 from django.db.models.fields.reverse_related import OneToOneRel
 
+_SERIALIZE_VALUE = "value"
+_SERIALIZE_RELATED_MANAGER = "related_manager"
+_SERIALIZE_ONE_TO_ONE = "one_to_one"
+
 
 class UUIDModel(models.Model):
     id = models.UUIDField(primary_key=True, editable=False)
@@ -79,9 +83,10 @@ class SerializableMixin(models.Model):
 
     class SerializableManager(models.Manager):
         def serialize(self):
+            # all() of a related manager uses the prefetched objects if there are any
             return [
                 obj.serialize() if hasattr(obj, "serialize") else []
-                for obj in self.get_queryset().all()
+                for obj in self.all()
             ]
 
     class Meta:
@@ -89,45 +94,55 @@ class SerializableMixin(models.Model):
 
     objects = SerializableManager()
 
-    def _resolve_field(self, model, field):
-        def _resolve_value(data, field):
-            if "accessor" in field:
-                # call the accessor with value as an argument
-                return field["accessor"](getattr(data, field.get("name")))
+    @classmethod
+    def _get_serialization_plan(cls):
+        """Returns the serialization plan of the model class, which is built from
+        serialize_fields when it's first needed. Every step of the plan is a
+        tuple of the kind of the step, the attribute name, the key and the
+        accessor."""
+        plan = cls.__dict__.get("_serialization_plan")
+        if plan is not None:
+            return plan
+
+        related_types = {item.name: type(item) for item in cls._meta.related_objects}
+        plan = []
+        for field in cls.serialize_fields:
+            name = field["name"]
+            if name not in related_types:
+                kind = _SERIALIZE_VALUE
+            elif related_types[name] == OneToOneRel:
+                kind = _SERIALIZE_ONE_TO_ONE
             else:
-                # no accessor, return the value
-                return getattr(data, field.get("name"))
-
-        related_types = {item.name: type(item) for item in model._meta.related_objects}
-        if field.get("name") in related_types.keys():
-            value = (
-                getattr(model, field.get("name")).serialize()
-                if hasattr(model, field.get("name"))
-                and hasattr(getattr(model, field.get("name")), "serialize")
-                else None
-            )
-            # field is a related object, let's serialize more
-            if related_types[field.get("name")] == OneToOneRel:
+                kind = _SERIALIZE_RELATED_MANAGER
+            plan.append((kind, name, name.upper(), field.get("accessor")))
+
+        cls._serialization_plan = tuple(plan)
+        return cls._serialization_plan
+
+    def serialize(self):
+        children = []
+        for kind, name, key, accessor in self._get_serialization_plan():
+            if kind == _SERIALIZE_VALUE:
+                # concrete field, let's just add the value
+                value = getattr(self, name)
+                if accessor is not None:
+                    value = accessor(value)
+                children.append({"key": key, "value": value})
+                continue
+
+            # field is a related object, let's serialize more. A missing
+            # one-to-one related object raises an AttributeError.
+            try:
+                serialize = getattr(getattr(self, name), "serialize", None)
+            except AttributeError:
+                serialize = None
+            value = serialize() if serialize is not None else None
+
+            if kind == _SERIALIZE_ONE_TO_ONE:
                 # do not wrap one-to-one relations into list
-                return value
+                if value is not None:
+                    children.append(value)
             else:
-                return {
-                    "key": field.get("name").upper(),
-                    "children": value,
-                }
-        else:
-            # concrete field, let's just add the value
-            return {
-                "key": field.get("name").upper(),
-                "value": _resolve_value(model, field),
-            }
+                children.append({"key": key, "children": value})
 
-    def serialize(self):
-        return {
-            "key": self._meta.model_name.upper(),
-            "children": [
-                self._resolve_field(self, field)
-                for field in self.serialize_fields
-                if self._resolve_field(self, field) is not None
-            ],
-        }
+        return {"key": self._meta.model_name.upper(), "children": children}
@@ -0,0 +1,190 @@
+"""Re-encrypting the encrypted fields with the primary encryption key.
+
+After a new key is added to the front of `FIELD_ENCRYPTION_KEYS`, the existing
+values stay encrypted with the older keys, and every read of such a value tries
+the keys in order until one of them works. Re-encrypting the values with the
+primary key, the first one in the list, makes the reads fast again and allows
+removing the old keys afterwards.
+
+The rows are processed in chunks of primary key ranges. Every chunk is handled in
+its own short transaction which locks only the rows of the chunk, so the
+application can keep running meanwhile. Values that are already encrypted with
+the primary key are left as they are, which makes running the re-encryption
+again safe at any point.
+"""
+
+import dataclasses
+import functools
+import hashlib
+import multiprocessing
+import time
+from dataclasses import dataclass
+
+from Crypto.Cipher import AES
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Max, Min
+
+from .fields import EncryptedValue, LazyDecryptionMixin
+
+
+@dataclass(frozen=True)
+class Chunk:
+    model_label: str
+    start: int
+    end: int
+
+
+def encrypted_fields(model):
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if isinstance(field, LazyDecryptionMixin)
+    ]
+
+
+def encrypted_models():
+    """Returns the models which have encrypted fields."""
+    return [model for model in apps.get_models() if encrypted_fields(model)]
+
+
+def primary_key_fingerprint():
+    """Returns an identifier of the primary key, which doesn't reveal the key."""
+    key = settings.FIELD_ENCRYPTION_KEYS[0]
+    return hashlib.sha256(bytes.fromhex(key)).hexdigest()[:16]
+
+
+def plan_chunks(chunk_size):
+    """Splits the primary key range of every encrypted model into chunks."""
+    chunks = []
+    for model in encrypted_models():
+        bounds = model.objects.aggregate(first=Min("pk"), last=Max("pk"))
+        if bounds["first"] is None:
+            continue
+        for start in range(bounds["first"], bounds["last"] + 1, chunk_size):
+            chunks.append(Chunk(model._meta.label, start, start + chunk_size))
+    return chunks
+
+
+def _is_encrypted_with_primary_key(field, ciphertext):
+    cipher = AES.new(bytes.fromhex(field.keys[0]), AES.MODE_GCM, nonce=ciphertext[:16])
+    try:
+        cipher.decrypt_and_verify(ciphertext[32:], ciphertext[16:32])
+    except ValueError:
+        return False
+    return True
+
+
+def reencrypt_chunk(chunk):
+    """Re-encrypts the values of the chunk that aren't encrypted with the primary
+    key. Returns the number of the rows in the chunk and the number of the
+    updated rows."""
+    model = apps.get_model(chunk.model_label)
+    fields = encrypted_fields(model)
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    assignments = ", ".join(
+        f"{connection.ops.quote_name(field.column)} = %s" for field in fields
+    )
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+
+    with transaction.atomic():
+        rows = (
+            model.objects.select_for_update()
+            .filter(pk__gte=chunk.start, pk__lt=chunk.end)
+            .values_list("pk", *(field.attname for field in fields))
+        )
+
+        updated = []
+        row_count = 0
+        for pk, *values in rows:
+            row_count += 1
+            ciphertexts = [
+                value.ciphertext if isinstance(value, EncryptedValue) else None
+                for value in values
+            ]
+            reencrypted = [
+                field.encrypt(field.decrypt(ciphertext))
+                if ciphertext is not None
+                and not _is_encrypted_with_primary_key(field, ciphertext)
+                else ciphertext
+                for field, ciphertext in zip(fields, ciphertexts)
+            ]
+            if reencrypted != ciphertexts:
+                updated.append([*reencrypted, pk])
+
+        if updated:
+            # The values are written as they are, without going through the
+            # fields, which would encrypt them again
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {table} SET {assignments} WHERE {pk_column} = %s",
+                    updated,
+                )
+
+    return row_count, len(updated)
+
+
+def active_query_count():
+    """Returns the number of the queries running in the database, this one
+    excluded."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE state = 'active' AND datname = current_database() "
+            "AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+@dataclass
+class Throttle:
+    """Slows down the processing to the given rate of rows per second, and waits
+    while the database is busier than the given number of active queries. Zero
+    disables either limit."""
+
+    max_rows_per_second: float = 0
+    max_active_queries: int = 0
+    poll_interval: float = 1.0
+
+    def wait_for_database(self):
+        if not self.max_active_queries:
+            return
+        while active_query_count() > self.max_active_queries:
+            time.sleep(self.poll_interval)
+
+    def pace(self, row_count, started_at):
+        if not self.max_rows_per_second:
+            return
+        remaining = started_at + row_count / self.max_rows_per_second - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+def _reencrypt_chunk_throttled(chunk, throttle):
+    throttle.wait_for_database()
+    started_at = time.monotonic()
+    row_count, updated_count = reencrypt_chunk(chunk)
+    throttle.pace(row_count, started_at)
+    return chunk, row_count, updated_count
+
+
+def run_reencryption(chunks, throttle, workers=1):
+    """Re-encrypts the chunks in `workers` processes, and yields every chunk
+    together with its row counts when it's done. The rate limit of the throttle
+    is shared between the workers."""
+    if workers == 1:
+        for chunk in chunks:
+            yield _reencrypt_chunk_throttled(chunk, throttle)
+        return
+
+    throttle = dataclasses.replace(
+        throttle, max_rows_per_second=throttle.max_rows_per_second / workers
+    )
+    # The forked workers must not share the database connections of this process
+    connections.close_all()
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        yield from pool.imap_unordered(
+            functools.partial(_reencrypt_chunk_throttled, throttle=throttle), chunks
+        )
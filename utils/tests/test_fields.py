@@ -1,6 +1,12 @@
 from encrypted_fields.fields import SearchField
 
-from utils.fields import CallableHashKeyEncryptedSearchField
+import utils.fields
+from profiles.models import Profile, SensitiveData, VerifiedPersonalInformation
+from profiles.tests.factories import (
+    SensitiveDataFactory,
+    VerifiedPersonalInformationFactory,
+)
+from utils.fields import CallableHashKeyEncryptedSearchField, EncryptedValue
 
 
 def test_callable_hash_key():
@@ -26,3 +32,122 @@ def test_callable_hash_key():
     ]
 
     assert len(set(return_values)) == 1, f"Values should be the same {return_values}"
+
+
+def test_encrypted_fields_are_decrypted_on_first_read():
+    created = VerifiedPersonalInformationFactory()
+
+    vpi = VerifiedPersonalInformation.objects.get(pk=created.pk)
+    assert isinstance(vpi.__dict__["given_name"], EncryptedValue)
+
+    assert vpi.given_name == created.given_name
+    assert vpi.__dict__["given_name"] == created.given_name
+    assert isinstance(vpi.__dict__["municipality_of_residence"], EncryptedValue)
+
+
+def test_values_of_encrypted_fields_are_decrypted_explicitly():
+    created = VerifiedPersonalInformationFactory()
+    field = VerifiedPersonalInformation._meta.get_field("given_name")
+
+    value = VerifiedPersonalInformation.objects.values_list(
+        "given_name", flat=True
+    ).get(pk=created.pk)
+    related_value = Profile.objects.values(
+        "verified_personal_information__given_name"
+    ).get(pk=created.profile_id)["verified_personal_information__given_name"]
+
+    assert isinstance(value, EncryptedValue)
+    assert field.decrypt_value(value) == created.given_name
+    assert field.decrypt_value(related_value) == created.given_name
+    assert field.decrypt_value(created.given_name) == created.given_name
+
+
+def test_unread_encrypted_fields_are_saved_unchanged():
+    created = SensitiveDataFactory()
+    sensitive_data = SensitiveData.objects.get(pk=created.pk)
+    ciphertext = sensitive_data.__dict__["ssn"].ciphertext
+
+    sensitive_data.save()
+
+    sensitive_data = SensitiveData.objects.get(pk=created.pk)
+    assert sensitive_data.__dict__["ssn"].ciphertext == ciphertext
+    assert sensitive_data.ssn == created.ssn
+
+
+def test_search_field_reads_the_lazily_decrypted_value():
+    created = VerifiedPersonalInformationFactory()
+
+    vpi = VerifiedPersonalInformation.objects.get(
+        national_identification_number=created.national_identification_number
+    )
+
+    assert vpi.national_identification_number == created.national_identification_number
+
+
+def test_blind_index_is_updated_on_save():
+    vpi = VerifiedPersonalInformationFactory(municipality_of_residence_number="091")
+    VerifiedPersonalInformationFactory(municipality_of_residence_number="092")
+
+    assert (
+        VerifiedPersonalInformation.objects.get(
+            municipality_of_residence_number_index="091"
+        )
+        == vpi
+    )
+
+    vpi.municipality_of_residence_number = "049"
+    vpi.save()
+
+    assert not VerifiedPersonalInformation.objects.filter(
+        municipality_of_residence_number_index="091"
+    ).exists()
+    assert (
+        VerifiedPersonalInformation.objects.get(
+            municipality_of_residence_number_index="049"
+        )
+        == vpi
+    )
+
+
+def test_blind_index_is_not_rehashed_when_the_source_is_unchanged(mocker):
+    vpi = VerifiedPersonalInformationFactory(municipality_of_residence_number="091")
+    index = vpi.municipality_of_residence_number_index
+    vpi = VerifiedPersonalInformation.objects.get(pk=vpi.pk)
+    source_field = VerifiedPersonalInformation._meta.get_field(
+        "municipality_of_residence_number"
+    )
+    decrypt = mocker.spy(source_field, "decrypt_value")
+    hash_value = mocker.spy(utils.fields, "keyed_hash")
+
+    vpi.save()
+    assert vpi.municipality_of_residence_number == "091"
+    vpi.save()
+
+    decrypt.assert_called_once()
+    assert [
+        call.args[0]
+        for call in hash_value.call_args_list
+        if call.args[0].startswith("municipality_of_residence_number:")
+    ] == ["municipality_of_residence_number:091"]
+    vpi.refresh_from_db()
+    assert vpi.municipality_of_residence_number_index == index
+
+
+def test_blind_index_of_an_empty_value_is_null():
+    vpi = VerifiedPersonalInformationFactory(municipality_of_residence_number="")
+
+    vpi.refresh_from_db()
+    assert vpi.municipality_of_residence_number_index is None
+
+
+def test_blind_indexes_of_different_fields_differ():
+    vpi = VerifiedPersonalInformationFactory(municipality_of_residence_number="00100")
+    vpi.permanent_address.postal_code = "00100"
+    vpi.permanent_address.save()
+
+    vpi.refresh_from_db()
+    vpi.permanent_address.refresh_from_db()
+    assert (
+        vpi.municipality_of_residence_number_index
+        != vpi.permanent_address.postal_code_index
+    )
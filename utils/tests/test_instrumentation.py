@@ -0,0 +1,74 @@
+import pytest
+import requests
+from prometheus_client import REGISTRY
+
+from utils.instrumentation import instrumented_request
+
+URL = "https://service.example.com/gdpr"
+
+
+def _duration_count(status, service="test-service", operation="query"):
+    return (
+        REGISTRY.get_sample_value(
+            "outbound_http_request_duration_seconds_count",
+            {"service": service, "operation": operation, "status": status},
+        )
+        or 0
+    )
+
+
+def _timeout_count(service="test-service", operation="query"):
+    return (
+        REGISTRY.get_sample_value(
+            "outbound_http_request_timeouts_total",
+            {"service": service, "operation": operation},
+        )
+        or 0
+    )
+
+
+@pytest.mark.parametrize("status_code", [200, 404, 503])
+def test_response_status_code_is_recorded(requests_mock, status_code):
+    requests_mock.get(URL, status_code=status_code)
+    count_before = _duration_count(str(status_code))
+
+    response = instrumented_request(
+        "test-service", "query", requests.get, URL, timeout=5
+    )
+
+    assert response.status_code == status_code
+    assert requests_mock.last_request.timeout == 5
+    assert _duration_count(str(status_code)) == count_before + 1
+
+
+def test_timeout_is_recorded_and_raised(requests_mock):
+    requests_mock.get(URL, exc=requests.ConnectTimeout)
+    count_before = _duration_count("timeout")
+    timeouts_before = _timeout_count()
+
+    with pytest.raises(requests.Timeout):
+        instrumented_request("test-service", "query", requests.get, URL)
+
+    assert _duration_count("timeout") == count_before + 1
+    assert _timeout_count() == timeouts_before + 1
+
+
+def test_other_errors_are_recorded_and_raised(requests_mock):
+    requests_mock.get(URL, exc=requests.ConnectionError)
+    count_before = _duration_count("error")
+
+    with pytest.raises(requests.ConnectionError):
+        instrumented_request("test-service", "query", requests.get, URL)
+
+    assert _duration_count("error") == count_before + 1
+
+
+def test_non_response_results_are_recorded_as_ok():
+    count_before = _duration_count("ok", operation="token_exchange")
+
+    result = instrumented_request(
+        "test-service", "token_exchange", lambda: {"access_token": "token"}
+    )
+
+    assert result == {"access_token": "token"}
+    assert _duration_count("ok", operation="token_exchange") == count_before + 1
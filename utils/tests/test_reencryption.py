@@ -0,0 +1,113 @@
+import json
+import secrets
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from profiles.models import SensitiveData, VerifiedPersonalInformation
+from profiles.tests.factories import (
+    SensitiveDataFactory,
+    VerifiedPersonalInformationFactory,
+)
+from utils.fields import EncryptedValue
+from utils.reencryption import (
+    _is_encrypted_with_primary_key,
+    encrypted_fields,
+    encrypted_models,
+    primary_key_fingerprint,
+)
+
+
+def _clear_cached_keys():
+    for model in encrypted_models():
+        for field in encrypted_fields(model):
+            field.__dict__.pop("keys", None)
+
+
+@pytest.fixture
+def rotate_keys(settings):
+    def rotate():
+        settings.FIELD_ENCRYPTION_KEYS = [
+            secrets.token_hex(32),
+            *settings.FIELD_ENCRYPTION_KEYS,
+        ]
+        _clear_cached_keys()
+
+    yield rotate
+    _clear_cached_keys()
+
+
+def _ciphertexts(model):
+    fields = encrypted_fields(model)
+    return [
+        (field, value.ciphertext)
+        for row in model.objects.values_list(*(field.attname for field in fields))
+        for field, value in zip(fields, row)
+        if isinstance(value, EncryptedValue)
+    ]
+
+
+def _reencrypt(**options):
+    out = StringIO()
+    call_command("reencrypt_encrypted_fields", workers=1, stdout=out, **options)
+    return out.getvalue()
+
+
+def test_values_are_reencrypted_with_the_primary_key(rotate_keys):
+    vpi = VerifiedPersonalInformationFactory()
+    sensitive_data = SensitiveDataFactory()
+    rotate_keys()
+
+    assert not any(
+        _is_encrypted_with_primary_key(field, ciphertext)
+        for field, ciphertext in _ciphertexts(SensitiveData)
+    )
+
+    output = _reencrypt(chunk_size=2)
+
+    for model in encrypted_models():
+        for field, ciphertext in _ciphertexts(model):
+            assert _is_encrypted_with_primary_key(field, ciphertext)
+    assert SensitiveData.objects.get().ssn == sensitive_data.ssn
+    reloaded_vpi = VerifiedPersonalInformation.objects.get()
+    assert reloaded_vpi.first_name == vpi.first_name
+    assert reloaded_vpi.permanent_address.postal_code == (
+        vpi.permanent_address.postal_code
+    )
+    assert "re-encrypted 5 rows" in output
+
+
+def test_values_encrypted_with_the_primary_key_are_left_as_they_are(rotate_keys):
+    SensitiveDataFactory()
+    rotate_keys()
+    _reencrypt()
+    ciphertexts = _ciphertexts(SensitiveData)
+
+    output = _reencrypt()
+
+    assert _ciphertexts(SensitiveData) == ciphertexts
+    assert "re-encrypted 0 rows" in output
+
+
+def test_chunks_recorded_in_the_checkpoint_are_skipped(rotate_keys, tmp_path):
+    sensitive_data = SensitiveDataFactory()
+    rotate_keys()
+    checkpoint_path = tmp_path / "checkpoint.json"
+    _reencrypt(checkpoint=str(checkpoint_path))
+    assert not checkpoint_path.exists()
+
+    rotate_keys()
+    checkpoint = {
+        "key": primary_key_fingerprint(),
+        "chunk_size": 1000,
+        "done": [f"profiles.SensitiveData:{sensitive_data.pk}"],
+    }
+    checkpoint_path.write_text(json.dumps(checkpoint))
+
+    _reencrypt(checkpoint=str(checkpoint_path))
+
+    assert not any(
+        _is_encrypted_with_primary_key(field, ciphertext)
+        for field, ciphertext in _ciphertexts(SensitiveData)
+    )